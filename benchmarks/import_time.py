@@ -0,0 +1,66 @@
+"""
+Benchmark: wall time of `import ftrace` in a fresh interpreter.
+
+    python benchmarks/import_time.py [-n REPEAT] [-o results.csv]
+
+With `-o`, results are appended to CSV (one row per run) so they can be
+tracked over time.
+"""
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import sys, time
+start = time.time()
+import ftrace
+elapsed = time.time() - start
+parsers = [name for name in sys.modules if name.startswith('ftrace.parsers.')
+           and sys.modules[name] is not None and name != 'ftrace.parsers.register']
+components = [name for name in sys.modules if name.startswith('ftrace.components.')
+              and sys.modules[name] is not None]
+print elapsed, len(parsers), len(components)
+"""
+
+def measure():
+    """Returns (seconds, parser modules, component modules) for one import"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='')
+    output = subprocess.check_output([sys.executable, '-c', SNIPPET], env=env)
+    elapsed, parsers, components = output.split()
+    return float(elapsed), int(parsers), int(components)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Import-time benchmark')
+    parser.add_argument('-n', '--repeat', dest='repeat', type=int, default=10,
+                        help='Number of (fresh interpreter) imports')
+    parser.add_argument('-o', '--output', dest='output',
+                        help='CSV file to append results to')
+    args = parser.parse_args()
+
+    measure() # warm up (compiles .pyc, fills OS cache)
+    results = [measure() for _ in xrange(args.repeat)]
+    timings = sorted(elapsed for elapsed, _, _ in results)
+    _, parsers, components = results[-1]
+    best, median = timings[0], timings[len(timings) // 2]
+
+    print "import ftrace: best {:.1f}ms, median {:.1f}ms ({} runs)".format(
+        best * 1e3, median * 1e3, args.repeat)
+    print "modules imported: {} parsers, {} components".format(parsers, components)
+
+    if args.output:
+        write_header = not os.path.exists(args.output)
+        with open(args.output, 'ab') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(['date', 'python', 'best_ms', 'median_ms',
+                                 'parsers', 'components'])
+            writer.writerow([time.strftime('%Y-%m-%d %H:%M:%S'),
+                             sys.version.split()[0], '{:.1f}'.format(best * 1e3),
+                             '{:.1f}'.format(median * 1e3), parsers, components])
@@ -0,0 +1,48 @@
+"""
+Microbenchmark: payload parsers with split-based fast path vs. without
+(regex, or generic split for tracing_mark_write).
+
+    python benchmarks/parsers.py [-n NUMBER]
+"""
+import argparse
+import os
+import sys
+import timeit
+from importlib import import_module
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ftrace.parsers import PARSERS
+
+PAYLOADS = {
+    'sched_switch': 'prev_comm=swapper/7 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=snapshot-test-2 next_pid=2243 next_prio=120',
+    'sched_wakeup': 'comm=tfm_b6bcf800 pid=1714 prio=35 success=1 target_cpu=000',
+    'cpu_frequency': 'state=1190400 cpu_id=0',
+    'cpu_idle': 'state=4294967295 cpu_id=0',
+    'tracing_mark_write': 'B|1428|Choreographer#doFrame',
+    'clock_set_rate': 'krait1_pri_mux_clk state=300000000 cpu_id=0',
+    'block_rq_issue': '179,0 WS 4096 () 6455304 + 8 [mmcqd/0]',
+    'block_rq_insert': '179,0 WS 4096 () 6455304 + 8 [mmcqd/0]',
+    'block_rq_complete': '179,0 WS () 6455304 + 8 [0]',
+}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Payload parser microbenchmark')
+    parser.add_argument('-n', '--number', dest='number', type=int, default=100000,
+                        help='Number of payloads parsed per timing')
+    args = parser.parse_args()
+
+    print "{:<20} {:>12} {:>12} {:>8}".format('tracepoint', 'slow (us)', 'fast (us)', 'speedup')
+    for tracepoint, payload in sorted(PAYLOADS.iteritems()):
+        module = import_module('ftrace.parsers.' + tracepoint)
+        slow_parser = getattr(module, '_parse_regex', None) or module._parse_split
+        fast_parser = PARSERS[tracepoint]
+        assert slow_parser(payload) == fast_parser(payload)
+        timings = []
+        for func in (slow_parser, fast_parser):
+            timer = timeit.Timer(lambda: func(payload))
+            timings.append(min(timer.repeat(repeat=3, number=args.number)) / args.number)
+        print "{:<20} {:>12.2f} {:>12.2f} {:>7.1f}x".format(
+            tracepoint, timings[0] * 1e6, timings[1] * 1e6, timings[0] / timings[1])
@@ -0,0 +1,83 @@
+"""
+Benchmark: EventList.slice over a large (sorted) event list, for each
+`closed` option. Slicing should be O(log n) (plus size of slice) i.e.
+independent of list size.
+
+    python benchmarks/slicing.py [-e EVENTS] [-n NUMBER] [-w WINDOW] [-o results.csv]
+
+With `-o`, results are appended to CSV (one row per run) so they can be
+tracked over time.
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ftrace.event import EventList
+from ftrace.interval import Interval
+
+# Just what slicing needs (full events would need GBs at 10M).
+Sample = namedtuple('Sample', ['timestamp'])
+
+# Time (s) between events.
+SPACING = 1e-6
+CLOSED = (None, 'left', 'right')
+
+def build(num_events):
+    """Returns EventList of `num_events` evenly spaced samples"""
+    return EventList.from_iterable((Sample(idx * SPACING) for idx in xrange(num_events)),
+                                   presorted=True)
+
+def measure(events, number, window, closed):
+    """Returns (seconds, events sliced) for `number` random slices"""
+    rng = random.Random(0)
+    # start on event timestamps, so boundary (open/closed) cases are hit.
+    starts = [rng.randrange(len(events)) * SPACING for _ in xrange(number)]
+    start_time, sliced = time.time(), 0
+    for start in starts:
+        sliced += len(events.slice(Interval(start, start + window), closed=closed))
+    return time.time() - start_time, sliced
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='EventList slicing benchmark')
+    parser.add_argument('-e', '--events', dest='events', type=int, default=10000000,
+                        help='Number of events in list')
+    parser.add_argument('-n', '--number', dest='number', type=int, default=10000,
+                        help='Number of slices per timing')
+    parser.add_argument('-w', '--window', dest='window', type=float, default=1e-3,
+                        help='Duration (s) of each slice')
+    parser.add_argument('-o', '--output', dest='output',
+                        help='CSV file to append results to')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    events = build(args.events)
+    print "built {} events in {:.1f}s".format(len(events), time.time() - start_time)
+
+    rows = []
+    for closed in CLOSED:
+        elapsed, sliced = measure(events, args.number, args.window, closed)
+        rows.append((closed, elapsed, sliced))
+        print "closed={!s:<6} {} slices: {:.3f}s ({:.1f}us/slice, {:.0f} events/slice)".format(
+            closed, args.number, elapsed, elapsed / args.number * 1e6,
+            float(sliced) / args.number)
+
+    if args.output:
+        write_header = not os.path.exists(args.output)
+        with open(args.output, 'ab') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(['date', 'python', 'events', 'slices', 'window',
+                                 'closed', 'seconds'])
+            for closed, elapsed, _ in rows:
+                writer.writerow([time.strftime('%Y-%m-%d %H:%M:%S'),
+                                 sys.version.split()[0], args.events, args.number,
+                                 args.window, closed, '{:.3f}'.format(elapsed)])
@@ -28,7 +28,12 @@ from . event import Event, EventList
 from . interval import Interval, IntervalList
 from . task import Task
 from . event import Event
-from . components import *
 from . ftrace import Ftrace
+from . components import api_attributes
+from . utils.lazy import lazy_attributes
+
+# Component modules and classes (e.g. `ftrace.clock.ClockState`, `ftrace.CPU`),
+# imported on first access.
+lazy_attributes(__name__, api_attributes())
 
 __all__ = ['Ftrace', 'Interval', 'Task', 'EventList', 'IntervalList']
\ No newline at end of file
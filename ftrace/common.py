@@ -23,6 +23,7 @@ import sys
 import types
 import math
 import functools
+from collections import Counter, defaultdict
 from  .third_party.enum.enum import Enum, unique
 from itertools import ifilter
 from .utils.decorators import memoize
@@ -181,6 +182,8 @@ class FtraceErrorBase(Exception):
     msg = None
 
     def __init__(self, *args, **kwargs):
+        if args and 'msg' not in kwargs: # e.g. ParserError(e.message)
+            kwargs['msg'] = args[0]
         self.args = args
         self.kwargs = kwargs
         self.message = str(self)
@@ -204,4 +207,40 @@ class ParserError(FtraceErrorBase):
     Raised on error with parsing file.
     """
 
-    msg = """Event cannot be parsed. {msg}"""
\ No newline at end of file
+    msg = """Event cannot be parsed. {msg}"""
+
+
+class ParseErrors(object):
+    """
+    Quarantine of payloads that failed to parse: number of failures and
+    (bounded) sample of (payload, error) per tracepoint.
+    """
+
+    def __init__(self, max_samples=10):
+        self.max_samples = max_samples
+        self.counts = Counter()
+        self.samples = defaultdict(list)
+
+    def __repr__(self):
+        return "ParseErrors(total={}, by_tracepoint={})".format(
+            len(self), dict(self.counts))
+
+    def __len__(self):
+        return sum(self.counts.itervalues())
+
+    def __nonzero__(self):
+        return bool(self.counts)
+
+    def add(self, tracepoint, payload, error=None):
+        """Record failure to parse payload for tracepoint"""
+        self.counts[tracepoint] += 1
+        samples = self.samples[tracepoint]
+        if len(samples) < self.max_samples:
+            samples.append((payload, str(error) if error is not None else None))
+
+    def update(self, other):
+        """Merge failures recorded in other (e.g. by worker process)"""
+        self.counts.update(other.counts)
+        for tracepoint, samples in other.samples.iteritems():
+            room = self.max_samples - len(self.samples[tracepoint])
+            self.samples[tracepoint].extend(samples[:max(room, 0)])
\ No newline at end of file
@@ -1,10 +1,42 @@
-from .cpu import CPU
-from .gpu import GPU
-from .clock import Clock
-from .cluster import Cluster
-from .android import Android
-from .disk import Disk
-from .camera import Camera
-from .audio import Audio
-from .thermal import Thermal
-from .bus import Bus
\ No newline at end of file
+from ftrace.utils.lazy import lazy_attributes
+
+# Api module (relative to this package) by name. Modules are only imported
+# (and apis registered) on first access of `trace.<name>`.
+API_MODULES = {
+    'cpu': '.cpu',
+    'gpu': '.gpu',
+    'clock': '.clock',
+    'cluster': '.cluster',
+    'android': '.android',
+    'disk': '.disk',
+    'camera': '.camera',
+    'audio': '.audio',
+    'thermal': '.thermal',
+    'bus': '.bus',
+}
+
+# Api class in each module, exposed (lazily) as `ftrace.components.<Class>`
+# and `ftrace.<Class>`, as are modules e.g. `ftrace.clock.ClockState`.
+API_CLASSES = {
+    'cpu': 'CPU',
+    'gpu': 'GPU',
+    'clock': 'Clock',
+    'cluster': 'Cluster',
+    'android': 'Android',
+    'disk': 'Disk',
+    'camera': 'Camera',
+    'audio': 'Audio',
+    'thermal': 'Thermal',
+    'bus': 'Bus',
+}
+
+def api_attributes():
+    """Returns lazy attributes (see `lazy_attributes`) for api modules/classes"""
+    attrs = {}
+    for name, module in API_MODULES.iteritems():
+        module = __name__ + module
+        attrs[name] = (module, None)
+        attrs[API_CLASSES[name]] = (module, API_CLASSES[name])
+    return attrs
+
+lazy_attributes(__name__, api_attributes())
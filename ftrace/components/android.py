@@ -29,8 +29,8 @@ from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.event import EventList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
-from ftrace.utils.decorators import requires, coroutine, memoize
+from ftrace.composites import sorted_items, build_lists
+from ftrace.utils.decorators import requires, coroutine, cached
 from ftrace.atrace import AtraceTag
 from ftrace.common import filter_by_task
 from six import string_types
@@ -51,7 +51,7 @@ InputLatency = namedtuple('InputLatency', ['interval', 'latency'])
 Rendering = namedtuple('Rendering', ['interval'])
 
 
-@register_api('android')
+@register_api('android', depends_on=('cpu',))
 class Android(FTraceComponent):
     """
     Class with APIs to process android trace events
@@ -88,6 +88,7 @@ class Android(FTraceComponent):
         self._tmw_intervals_by_name = defaultdict(IntervalList)
 
     def _initialize(self):
+        self.__dict__.pop('_input_latencies', None)
         self._parse_tmw_events()
 
     @property
@@ -96,7 +97,7 @@ class Android(FTraceComponent):
         return set(self._tmw_intervals_by_name.keys())
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def event_intervals(self, name=None, task=None,
                         interval=None, match_exact=True):
         """Returns event intervals for specified `name` and `task`
@@ -142,7 +143,7 @@ class Android(FTraceComponent):
         return rendering_intervals
     
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def render_frame_intervals(self, task=None, interval=None):
         """
         Returns intervals a frame from render thread was processed.
@@ -151,7 +152,7 @@ class Android(FTraceComponent):
                                     interval=interval, match_exact=False)
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def ui_frame_intervals(self, task=None, interval=None):
         """
         Returns intervals a frame from UI thread was processed.
@@ -160,7 +161,7 @@ class Android(FTraceComponent):
                                     interval=interval, match_exact=False)
                                     
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def frame_intervals(self, task=None, interval=None):
         """
         Returns intervals a frame from both UI & Render threads were processed.
@@ -170,7 +171,7 @@ class Android(FTraceComponent):
                                     interval=interval, match_exact=False)
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def present_duration(self, interval=None):
         """
         """
@@ -186,7 +187,7 @@ class Android(FTraceComponent):
 
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def framerate(self, interval=None):
         """
         Since SurfaceFlinger(SF) in Android updates the frame-buffer only
@@ -208,8 +209,11 @@ class Android(FTraceComponent):
             vsync_events = self.event_intervals(name='VSYNC', interval=interval)
 
         for vsync_event_a, vsync_event_b in zip(vsync_events, vsync_events[1:]) :               
-            frames_presented = len(self.event_intervals('postFramebuffer', 
-                                                        interval=vsync_event_a.interval))
+            # frames posted (begun) in this vsync, not ones spanning into it.
+            vsync_start = vsync_event_a.interval.start
+            frames_presented = len([post for post in
+                self.event_intervals('postFramebuffer', interval=vsync_event_a.interval)
+                if post.event.timestamp >= vsync_start])
             # Below required to skip interval when we had nothing to do.
             # As this event 'toggles' every VSYNC when SurfaceFlinger has work
             # to do. If nothing is done (i.e. no 'postFramebuffer' events)
@@ -221,7 +225,7 @@ class Android(FTraceComponent):
         return round(total_frames/present_time, 1) if present_time != 0.0 else float('nan')
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def jank_intervals(self, interval=None):
         """
         Returns list of intervals when a jank (missed frame) occurred.
@@ -230,7 +234,7 @@ class Android(FTraceComponent):
         return IntervalList(filter(lambda x:x.value==1, missedFrames))
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def num_janks(self, interval=None):
         """
         Returns number of janks (missed frame) within interval.
@@ -238,7 +242,7 @@ class Android(FTraceComponent):
         return len(self.jank_intervals(interval=interval))
         
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def jankrate(self, interval=None):
         """
         Returns number of janks (missed frame) per second within interval.
@@ -282,7 +286,7 @@ class Android(FTraceComponent):
 
     """
     @requires('tracing_mark_write', 'sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def input_latencies(self, irq_name, interval=None):
         """
         Returns input-to-display latencies seen in trace.
@@ -296,7 +300,7 @@ class Android(FTraceComponent):
                         slice(interval=interval)
     
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def input_events(self, task=None, interval=None):
         all_inputs = self.event_intervals(name='aq:pending:', 
                              task=task,  
@@ -311,6 +315,7 @@ class Android(FTraceComponent):
         Returns list of all input events
         """
         self._input_latencies = IntervalList()
+        seen_starts = set()
         all_tasks = self._trace.cpu.task_intervals()
         all_aq_events = self.input_events()
         touch_irqs = IntervalList(filter_by_task(
@@ -389,7 +394,8 @@ class Android(FTraceComponent):
                                                           
                     if pfb_events:
                         end_ts = pfb_events[0].interval.end
-                if start_ts != end_ts and end_ts > start_ts and start_ts not in self._input_latencies._start_timestamps:
+                if start_ts != end_ts and end_ts > start_ts and start_ts not in seen_starts:
+                    seen_starts.add(start_ts)
                     input_interval = Interval(start=start_ts, end=end_ts)
                     self._input_latencies.append(InputLatency(interval=input_interval,
                                             latency=input_interval.duration))
@@ -409,7 +415,7 @@ class Android(FTraceComponent):
     Typically GLSurfaces are used post-welcome screen.
     """
 
-    @memoize
+    @cached
     def _launched_app_events(self, interval=None):
         """
         Upon launch, applications goes through 3 states:
@@ -424,7 +430,7 @@ class Android(FTraceComponent):
         bindApplications = self.event_intervals(name='bindApplication')
         return bindApplications.slice(interval=interval)
 
-    @memoize
+    @cached
     def launched_app_events(self, interval=None):
         """
         First `bindApplication` indicates first (actual) app-launch.
@@ -433,7 +439,7 @@ class Android(FTraceComponent):
         """
         return self._launched_app_events(interval=interval)
 
-    @memoize
+    @cached
     def _start_launch_time(self, launched_event):
         """
         Start time estimated as first time we ever saw (i.e. scheduled on CPU)
@@ -445,7 +451,7 @@ class Android(FTraceComponent):
                 interval=interval)[0].interval.start
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def _end_launch_time(self, launched_event, next_launched_event=None):
         """
         End time estimated as last `performTraversals`(screen update) that caused
@@ -485,7 +491,7 @@ class Android(FTraceComponent):
 
 
     @requires('tracing_mark_write', 'sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def app_launch_latencies(self, task=None):
         """Return launch latency seen in trace"""
         launch_latencies = []
@@ -513,38 +519,25 @@ class Android(FTraceComponent):
         """
         last_timestamp = self._trace.interval.start
         last_event = None
-        counter_events_by_pid = defaultdict(EventList)
-
-        try:
-            while True:
-                event = (yield)
-                pid = event.task.pid
-                tag = event.data.atrace_tag
-                if tag is AtraceTag.CONTEXT_BEGIN:
-                    counter_events_by_pid[pid].append(event)
-                elif tag is AtraceTag.CONTEXT_END and counter_events_by_pid[pid]:
-                    last_event = counter_events_by_pid[pid].pop()
-                    last_timestamp = last_event.timestamp
-                    last_pid, last_name = \
-                        last_event.data.pid, last_event.data.section_name
-                    interval = Interval(last_timestamp, event.timestamp)
-                    context = Context(pid=last_pid, name=last_name,
-                                      interval=interval, event=last_event)
-                    self._tmw_intervals_by_name[last_name].append(context)
-                else:
-                    log.warn("Missing start marker {event}".format(event=event))
-
-        except GeneratorExit:
-            # close things off
-            for pid, event_list in counter_events_by_pid.iteritems():
-                for event in event_list:
-                    last_timestamp = event.timestamp
-                    interval = Interval(last_timestamp, self._trace.duration)
-                    if event.data.atrace_tag is not AtraceTag.CONTEXT_END:
-                        pid, name = event.data.pid, event.data.section_name
-                        context = Context(pid=pid, name=name, interval=interval, event=event)
-                        self._tmw_intervals_by_name[name].append(context)
-
+        counter_events_by_pid = self._open_contexts
+
+        while True:
+            event = (yield)
+            pid = event.task.pid
+            tag = event.data.atrace_tag
+            if tag is AtraceTag.CONTEXT_BEGIN:
+                counter_events_by_pid[pid].append(event)
+            elif tag is AtraceTag.CONTEXT_END and counter_events_by_pid[pid]:
+                last_event = counter_events_by_pid[pid].pop()
+                last_timestamp = last_event.timestamp
+                last_pid, last_name = \
+                    last_event.data.pid, last_event.data.section_name
+                interval = Interval(last_timestamp, event.timestamp)
+                context = Context(pid=last_pid, name=last_name,
+                                  interval=interval, event=last_event)
+                self._tmw_intervals_by_name[last_name].append(context)
+            else:
+                log.warn("Missing start marker {event}".format(event=event))
 
     @coroutine
     def _async_event_handler(self):
@@ -553,38 +546,24 @@ class Android(FTraceComponent):
         """
         last_timestamp = self._trace.interval.start
         last_event = None
-        # Stack them like Jason (JSON) 'PID', then 'cookie'
-        counter_events_by_cookie = defaultdict(EventList)
-        counter_events_by_pid = defaultdict(lambda : counter_events_by_cookie)
-
-        try:
-            while True:
-                event = (yield)
-                pid, cookie = event.data.pid, event.data.cookie
-                tag = event.data.atrace_tag
-                event_list = counter_events_by_pid[pid][cookie]
-                if tag is AtraceTag.ASYNC_BEGIN:
-                    event_list.append(event)
-                elif tag is AtraceTag.ASYNC_END and event_list:
-                    last_event = event_list.pop()
-                    last_timestamp = last_event.timestamp
-                    interval = Interval(last_timestamp, event.timestamp)
-                    context = Context(pid=pid, name=last_event.data.section_name,
-                                  interval=interval, event=last_event)
-                    self._tmw_intervals_by_name[context.name].append(context)
-                else:
-                    log.warn("Missing start marker {event}".format(event=event))
-
-        except GeneratorExit:
-            # close things off
-            for pid, by_name in counter_events_by_pid.iteritems():
-                for cookie, event_list in by_name.iteritems():
-                    for event in event_list:
-                        last_timestamp = event.timestamp
-                        interval = Interval(last_timestamp, self._trace.duration)
-                        context = Context(pid=pid, name=event.data.section_name,
-                                          interval=interval, event=event)
-                        self._tmw_intervals_by_name[context.name].append(context)
+        counter_events_by_pid = self._open_async_events
+
+        while True:
+            event = (yield)
+            pid, cookie = event.data.pid, event.data.cookie
+            tag = event.data.atrace_tag
+            event_list = counter_events_by_pid[pid][cookie]
+            if tag is AtraceTag.ASYNC_BEGIN:
+                event_list.append(event)
+            elif tag is AtraceTag.ASYNC_END and event_list:
+                last_event = event_list.pop()
+                last_timestamp = last_event.timestamp
+                interval = Interval(last_timestamp, event.timestamp)
+                context = Context(pid=pid, name=last_event.data.section_name,
+                              interval=interval, event=last_event)
+                self._tmw_intervals_by_name[context.name].append(context)
+            else:
+                log.warn("Missing start marker {event}".format(event=event))
 
     @coroutine
     def _counter_handler(self):
@@ -593,44 +572,88 @@ class Android(FTraceComponent):
         last_timestamp = self._trace.interval.start
         last_value = -1.0
         last_event = None
-        # Stack them like Jason (JSON) 'PID', then 'Counter name'
-        counter_events_by_name = defaultdict(EventList)
-        counter_events_by_pid = defaultdict(lambda : counter_events_by_name)
-        try:
-            while True:
-                event = (yield)
-                pid = event.data.pid
-                counter_name = event.data.counter_name
-                event_list = counter_events_by_pid[pid][counter_name]
-                if event_list:
-                    last_event = event_list.pop()
-                    last_timestamp = last_event.timestamp
-                    last_value = last_event.data.value
-                event_list.append(event)
-                interval = Interval(last_timestamp, event.timestamp)
-                counter = Counter(pid=pid, name=counter_name, event=last_event,
-                              value=last_value, interval=interval)
-                self._tmw_intervals_by_name[counter.name].append(counter)
-
-        except GeneratorExit:
-            # close things off
-            for pid, by_name in counter_events_by_pid.iteritems():
-                for counter_name, event_list in by_name.iteritems():
-                    for event in event_list:
-                        last_timestamp = event.timestamp
-                        last_value = event.data.value
-                        interval = Interval(last_timestamp, self._trace.duration)
-                        counter = Counter(pid=pid, name=counter_name, event=event,
-                                          value=last_value, interval=interval)
-                        self._tmw_intervals_by_name[counter.name].append(counter)
+        counter_events_by_pid = self._last_counter_events
+
+        while True:
+            event = (yield)
+            pid = event.data.pid
+            counter_name = event.data.counter_name
+            event_list = counter_events_by_pid[pid][counter_name]
+            if event_list:
+                last_event = event_list.pop()
+                last_timestamp = last_event.timestamp
+                last_value = last_event.data.value
+            event_list.append(event)
+            interval = Interval(last_timestamp, event.timestamp)
+            counter = Counter(pid=pid, name=counter_name, event=last_event,
+                          value=last_value, interval=interval)
+            self._tmw_intervals_by_name[counter.name].append(counter)
+
+    def _close_tmw_events(self):
+        """
+        Close off contexts, async events and counters still open at end of
+        trace. Returns list of these (provisional) intervals, which are
+        replaced on next update.
+        """
+        provisional = []
+        for pid, event_list in self._open_contexts.iteritems():
+            for event in event_list:
+                last_timestamp = event.timestamp
+                interval = Interval(last_timestamp, self._trace.duration)
+                if event.data.atrace_tag is not AtraceTag.CONTEXT_END:
+                    pid, name = event.data.pid, event.data.section_name
+                    context = Context(pid=pid, name=name, interval=interval, event=event)
+                    provisional.append(context)
+
+        for pid, by_name in self._open_async_events.iteritems():
+            for cookie, event_list in by_name.iteritems():
+                for event in event_list:
+                    last_timestamp = event.timestamp
+                    interval = Interval(last_timestamp, self._trace.duration)
+                    context = Context(pid=pid, name=event.data.section_name,
+                                      interval=interval, event=event)
+                    provisional.append(context)
+
+        for pid, by_name in self._last_counter_events.iteritems():
+            for counter_name, event_list in by_name.iteritems():
+                for event in event_list:
+                    last_timestamp = event.timestamp
+                    last_value = event.data.value
+                    interval = Interval(last_timestamp, self._trace.duration)
+                    counter = Counter(pid=pid, name=counter_name, event=event,
+                                      value=last_value, interval=interval)
+                    provisional.append(counter)
+
+        for item in provisional:
+            self._tmw_intervals_by_name[item.name].append(item)
+        return provisional
+
+    def _consume_tmw_events(self, events):
+        """Send tracing_mark_write events to handler (by atrace tag)"""
+        for event in events:
+            try:
+                handler_func = self.__event_handlers[event.data.atrace_tag]
+            except AttributeError:
+                log.warn("Unsupported event: {event}".format(event=event))
+                continue
+            handler_func.send(event)
 
     def _parse_tmw_events(self):
         """Parse tracing_mark_write intervals"""
+        self._tmw_intervals_by_name = defaultdict(list)
+        # Open B/E stacks (by pid), async events (by pid, then cookie) and
+        # last counter value (by pid, then name) carried across updates.
+        self._open_contexts = defaultdict(EventList)
+        counter_events_by_cookie = defaultdict(EventList)
+        self._open_async_events = defaultdict(lambda : counter_events_by_cookie)
+        counter_events_by_name = defaultdict(EventList)
+        self._last_counter_events = defaultdict(lambda : counter_events_by_name)
+
         context_handler = self._context_handler()
         async_event_handler = self._async_event_handler()
         counter_handler = self._counter_handler()
 
-        _ATRACE_TAG_HANDLERS = {
+        self.__event_handlers = {
             AtraceTag.CONTEXT_BEGIN : context_handler,
             AtraceTag.CONTEXT_END : context_handler,
             AtraceTag.ASYNC_BEGIN : async_event_handler,
@@ -638,24 +661,32 @@ class Android(FTraceComponent):
             AtraceTag.COUNTER : counter_handler,
         }
 
-        def tmw_events_gen():
-            filter_func = lambda event: event.tracepoint == 'tracing_mark_write'
-            for event in filter(filter_func, self._events):
-                yield event
+        self._consume_tmw_events(self._trace.events_for('tracing_mark_write'))
+        self._provisional_intervals = self._close_tmw_events()
 
-        for event in tmw_events_gen():
-            try:
-                handler_func = self.__event_handlers[event.data.atrace_tag]
-            except KeyError:
-                handler_func = \
-                    self.__event_handlers[event.data.atrace_tag] = \
-                        _ATRACE_TAG_HANDLERS[event.data.atrace_tag]
-               # handler_func.next() # prime the coroutine
-            except AttributeError:
-                log.warn("Unsupported event: {event}".format(event=event))
-                continue
-            handler_func.send(event)
+        self._tmw_intervals_by_name = build_lists(self._tmw_intervals_by_name,
+                                                  cls=IntervalList)
+
+    def _update(self, events):
+        """
+        Consume newly appended tracing_mark_write events, carrying on with
+        open contexts and counters. Provisional intervals (closed at end of
+        trace) are replaced.
+        """
+        for item in self._provisional_intervals:
+            self._tmw_intervals_by_name[item.name].remove(item)
+        self._consume_tmw_events(event for event in events
+                                 if event.tracepoint == 'tracing_mark_write')
+        self._provisional_intervals = self._close_tmw_events()
+        self.__dict__.pop('_input_latencies', None)
 
-        # shut down the coroutines (..and we are done!)
-        for handler_func in self.__event_handlers.itervalues():
-            handler_func.close()
\ No newline at end of file
+    def _evict(self, timestamp):
+        """
+        Drop intervals ended by `timestamp`. Open contexts and counters
+        (provisional intervals) are kept.
+        """
+        for name, intervals in self._tmw_intervals_by_name.items():
+            intervals.evict(timestamp)
+            if not intervals:
+                del self._tmw_intervals_by_name[name]
+        self.__dict__.pop('_input_latencies', None)
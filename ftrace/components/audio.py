@@ -28,7 +28,7 @@ except ImportError:
 from collections import namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.utils.decorators import requires, memoize
+from ftrace.utils.decorators import requires, cached
 from ftrace.common import filter_by_task, percentile
 from ftrace.audio import GlitchType
 
@@ -38,7 +38,7 @@ log = Logger('Audio')
 AudioJitter = namedtuple('AudioJitter', ['interval', 'latency'])
 AudioLatency = namedtuple('AudioLatency', ['glitch_type', 'interval', 'latency'])
 
-@register_api('audio')
+@register_api('audio', depends_on=('cpu', 'android'))
 class Audio(FTraceComponent):
     """
     Class with APIs to process android trace events
@@ -77,7 +77,7 @@ class Audio(FTraceComponent):
 
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def num_frames_written(self, interval=None):
         """
         Returns number of frames written within specified interval.
@@ -85,7 +85,7 @@ class Audio(FTraceComponent):
         raise NotImplementedError
         
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def num_write_errors(self, interval=None):
         """
         Returns number of write errors within specified interval.
@@ -93,7 +93,7 @@ class Audio(FTraceComponent):
         raise NotImplementedError
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def num_glitches(self, interval=None, buffer_size_frames=None):
         """
         Returns number of audio glitches within specified interval.
@@ -105,7 +105,7 @@ class Audio(FTraceComponent):
     
     
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def num_overruns(self, interval=None, buffer_size_frames=None):
         """
         Returns number of overruns within specified interval.
@@ -118,7 +118,7 @@ class Audio(FTraceComponent):
 
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def num_underruns(self, interval=None, buffer_size_frames=None):
         """
         Returns number of underruns within specified interval.
@@ -130,7 +130,7 @@ class Audio(FTraceComponent):
     
     
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def audio_glitches(self, interval=None, buffer_size_frames=None):
         """
         Returns number of underruns within specified interval.
@@ -161,7 +161,7 @@ class Audio(FTraceComponent):
         return audio_glitches
         
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def frame_write_intervals(self, interval=None):
         """
         Returns list of intervals frames were written within specified interval.
@@ -169,7 +169,7 @@ class Audio(FTraceComponent):
         raise NotImplementedError
     
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def jitter_intervals(self, interval=None, buffer_size_frames=None):
         """
         Returns list of intervals of audio jitter within specified interval.
@@ -204,13 +204,15 @@ class Audio(FTraceComponent):
         # Find audio jitter intervals
         # This is delta (in seconds) between expected OSL callback arrival time
         # and actual arrival time. We want this interval reasonably small.
-        self._cbk_jitters = IntervalList()
+        cbk_jitters = []
         for cbk_a, cbk_b in zip(self._OSL_cbks, self._OSL_cbks[1:]):
             expected_cbk_arrival_time = \
                 cbk_a.interval.start  + self.buffer_size_seconds
             delta = cbk_b.interval.start - expected_cbk_arrival_time
             interval = Interval(cbk_a.interval.start, cbk_b.interval.start)
-            self._cbk_jitters.append(AudioJitter(interval=interval, latency=delta))
+            cbk_jitters.append(AudioJitter(interval=interval, latency=delta))
+
+        self._cbk_jitters = IntervalList.from_iterable(cbk_jitters, presorted=True)
         
         if self.buffer_size_frames is None:
             # Estimate buffer sizes (frames)
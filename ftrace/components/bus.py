@@ -24,11 +24,10 @@ except ImportError:
     from logging import Logger
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
-from ftrace.event import EventList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
+from ftrace.composites import sorted_items, group_by, build_lists
 from ftrace.common import ConstantBase
-from ftrace.utils.decorators import requires, memoize
+from ftrace.utils.decorators import requires, cached
 
 log = Logger('Bus')
 
@@ -49,7 +48,7 @@ class BusState(ConstantBase):
     IDLE = ()
     UNKNOWN = ()
 
-@register_api('bus')
+@register_api('bus', depends_on=('clock',))
 class Bus(FTraceComponent):
     """
     Class with APIs to process all Bus related events.
@@ -72,7 +71,7 @@ class Bus(FTraceComponent):
         return set(self._bur_events_by_dev.keys())
 
     @requires('bus_update_request')
-    @memoize
+    @cached
     def bus_request_intervals(self, device=None, state=None, interval=None):
         """Return device interval for specified cpu & interval
         """
@@ -96,12 +95,12 @@ class Bus(FTraceComponent):
         
         
     @requires('bus_update_request', 'clock_set_rate')
-    @memoize
+    @cached
     def bimc_aggregate_requests(self, interval=None):
         """
         Returns alll votes between BIMC clock changes.
         """
-        rv = IntervalList()
+        rv = []
         votes = {}
         max_voter, max_vote = '', 0
         for bimc_interval in \
@@ -117,11 +116,11 @@ class Bus(FTraceComponent):
             rv.append(AggBusRequestInterval(votes=votes, max_voter=max_voter,
                                             interval=bimc_interval.interval))
             
-        return rv
+        return IntervalList.from_iterable(rv, presorted=True)
         
     def _bur_events_handler(self):
         """Handler function for bus update request events"""
-        self._bur_intervals_by_dev = defaultdict(IntervalList)
+        bur_intervals_by_dev = defaultdict(list)
         for device, events in self._bur_events_by_dev.iteritems():
             last_event = None
             for bur_event in events:
@@ -140,13 +139,13 @@ class Bus(FTraceComponent):
                                              instantaneous_bw_GBps=(bur_event.data.ib/1e9),
                                              interval=interval,
                                             )
-                self._bur_intervals_by_dev[device].append(bur_interval)
+                bur_intervals_by_dev[device].append(bur_interval)
                 last_event = bur_event
 
             # again, we need some closure.
             if last_event:
                 state=BusState.BUSY if last_event.data.active else BusState.IDLE
-                self._bur_intervals_by_dev[device].append(BusRequestInterval(
+                bur_intervals_by_dev[device].append(BusRequestInterval(
                                                     device=device,
                                                     state=state,
                                                     master_slave=(last_event.data.src, last_event.data.dest),
@@ -159,16 +158,11 @@ class Bus(FTraceComponent):
                                                 )
                                             )
 
+        self._bur_intervals_by_dev = build_lists(bur_intervals_by_dev,
+                                                 cls=IntervalList)
         return self._bur_intervals_by_dev
 
     def _parse_bus_update_requests(self):
         """Parse MSM bus update requests intervals"""
-        self._bur_events_by_dev = defaultdict(EventList)
-
-        def bur_events_gen():
-            filter_func = lambda event: event.tracepoint =='bus_update_request'
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in bur_events_gen():
-            self._bur_events_by_dev[event.data.name].append(event)
\ No newline at end of file
+        self._bur_events_by_dev = group_by(self._trace.events_for('bus_update_request'),
+                                           key=lambda event: event.data.name)
\ No newline at end of file
@@ -28,14 +28,14 @@ except ImportError:
 from collections import namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.utils.decorators import requires, memoize
+from ftrace.utils.decorators import requires, cached
 
 log = Logger('Camera')
 
 # For camera latency
 CameraLatency = namedtuple('CameraLatency', ['op', 'interval', 'latency'])
 
-@register_api('camera')
+@register_api('camera', depends_on=('android',))
 class Camera(FTraceComponent):
     """
     Class with APIs to process android trace events
@@ -80,7 +80,7 @@ class Camera(FTraceComponent):
         pass
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def open_camera_intervals(self, interval=None):
         """
         Returns list of intervals to open camera device.
@@ -108,7 +108,7 @@ class Camera(FTraceComponent):
 
 
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def store_image_intervals(self, interval=None):
         """
         Returns list of intervals to store image intervals.
@@ -137,7 +137,7 @@ class Camera(FTraceComponent):
 
     """
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def shutter_lag_intervals(self, interval=None):
         """
         Returns list of intervals for shutter lag.
@@ -159,7 +159,7 @@ class Camera(FTraceComponent):
         """
         Returns list of all input events
         """
-        self._shutter_lag_latencies = IntervalList()
+        shutter_lag_latencies = []
         deliver_inputs = self._trace.android.event_intervals("deliverInputEvent")
 
         def _still_capture_intervals():
@@ -184,12 +184,14 @@ class Camera(FTraceComponent):
                 if si_events:
                     end_ts = si_events[0].interval.end
                 shutter_lag_interval = Interval(start=start_ts, end=end_ts)
-                self._shutter_lag_latencies.append(
+                shutter_lag_latencies.append(
                     CameraLatency("Shutter Lag",
                                   interval=shutter_lag_interval,
                                   latency=shutter_lag_interval.duration))
 
-            return self._shutter_lag_latencies
+        self._shutter_lag_latencies = \
+            IntervalList.from_iterable(shutter_lag_latencies)
+        return self._shutter_lag_latencies
 
     #---------------------------------------------------------------------------
     """
@@ -211,7 +213,7 @@ class Camera(FTraceComponent):
 
     """
     @requires('tracing_mark_write')
-    @memoize
+    @cached
     def switch_device_intervals(self, interval=None):
         """
         Returns list of intervals for shutter lag.
@@ -230,7 +232,7 @@ class Camera(FTraceComponent):
         """
         Returns list of all input events
         """
-        self._switch_latencies = IntervalList()
+        switch_latencies = []
         deliver_inputs = self._trace.android.event_intervals("deliverInputEvent")
 
         def _preview_intervals():
@@ -265,9 +267,10 @@ class Camera(FTraceComponent):
                 if si_events:
                     end_ts = si_events[0].interval.end
                 shutter_lag_interval = Interval(start=start_ts, end=end_ts)
-                self._switch_latencies.append(
+                switch_latencies.append(
                     CameraLatency("Camera Switch",
                                   interval=shutter_lag_interval,
                                   latency=shutter_lag_interval.duration))
 
+        self._switch_latencies = IntervalList.from_iterable(switch_latencies)
         return self._switch_latencies
\ No newline at end of file
@@ -26,7 +26,7 @@ except ImportError:
     from logging import getLogger as Logger
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
-from ftrace.event import EventList
+from ftrace.composites import group_by, build_lists
 from ftrace.ftrace import register_api, FTraceComponent
 from ftrace.utils.decorators import requires
 from ftrace.common import ConstantBase
@@ -105,7 +105,7 @@ class Clock(FTraceComponent):
 
     def _clk_events_handler(self):
         """Handler function for clock enable/disable events"""
-        self._clk_intervals_by_clock = defaultdict(IntervalList)
+        clk_intervals_by_clock = defaultdict(list)
         for clock, events in self._clk_events_by_clock.iteritems():
             last_timestamp = self._trace.interval.start
             for clk_event in events:
@@ -115,7 +115,7 @@ class Clock(FTraceComponent):
                     else ClockState.ENABLED
                 interval = Interval(last_timestamp, clk_event.timestamp)
                 clk_interval = ClkInterval(clock, state, interval)
-                self._clk_intervals_by_clock[clock].append(clk_interval)
+                clk_intervals_by_clock[clock].append(clk_interval)
                 last_timestamp = clk_event.timestamp
             # again, we need some closure.
             if events:
@@ -130,19 +130,21 @@ class Clock(FTraceComponent):
                         self._trace.duration
                     )
                 )
-            self._clk_intervals_by_clock[clock].append(end_interval)
+            clk_intervals_by_clock[clock].append(end_interval)
 
+        self._clk_intervals_by_clock = build_lists(clk_intervals_by_clock,
+                                                   cls=IntervalList)
         return self._clk_intervals_by_clock
         
     def _freq_events_handler(self):
         """Handler function for clock frequency events"""
-        self._freq_intervals_by_clock = defaultdict(IntervalList)
+        freq_intervals_by_clock = defaultdict(list)
         for clock, events in self._freq_events_by_clock.iteritems():
             last_rate, last_timestamp = -1.0, self._trace.interval.start
             for freq_event in events:
                 interval = Interval(last_timestamp, freq_event.timestamp)
                 freq_interval = FreqInterval(clock, last_rate, interval)
-                self._freq_intervals_by_clock[clock].append(freq_interval)
+                freq_intervals_by_clock[clock].append(freq_interval)
                 last_rate = freq_event.data.state
                 last_timestamp = freq_event.timestamp
             # again, we need some closure.
@@ -153,31 +155,21 @@ class Clock(FTraceComponent):
                         self._trace.duration
                     )
             )
-            self._freq_intervals_by_clock[clock].append(end_interval)
+            freq_intervals_by_clock[clock].append(end_interval)
 
+        self._freq_intervals_by_clock = build_lists(freq_intervals_by_clock,
+                                                    cls=IntervalList)
         return self._freq_intervals_by_clock
 
 
     def _parse_clock_enable_disable_events(self):
         """Parse clock frequency intervals"""
-        self._clk_events_by_clock = defaultdict(EventList)
         self._clock_enable_disable_tracepoints = set(['clock_disable', 'clock_enable'])
-        def clock_enable_disable_events_gen():
-            filter_func = lambda event: event.tracepoint in self._clock_enable_disable_tracepoints
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in clock_enable_disable_events_gen():
-            self._clk_events_by_clock[event.data.clk].append(event)
+        self._clk_events_by_clock = group_by(
+            self._trace.events_for(self._clock_enable_disable_tracepoints),
+                                             key=lambda event: event.data.clk)
 
     def _parse_clock_events(self):
         """Parse clock frequency intervals"""
-        self._freq_events_by_clock = defaultdict(EventList)
-
-        def clock_events_gen():
-            filter_func = lambda event: event.tracepoint == 'clock_set_rate'
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in clock_events_gen():
-            self._freq_events_by_clock[event.data.clk].append(event)
\ No newline at end of file
+        self._freq_events_by_clock = group_by(self._trace.events_for('clock_set_rate'),
+                                              key=lambda event: event.data.clk)
\ No newline at end of file
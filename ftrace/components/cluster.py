@@ -24,11 +24,10 @@ except ImportError:
     from logging import Logger
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
-from ftrace.event import EventList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
+from ftrace.composites import sorted_items, group_by, build_lists
 from ftrace.common import ConstantBase
-from ftrace.utils.decorators import requires, memoize
+from ftrace.utils.decorators import requires, cached
 
 log = Logger('Cluster')
 
@@ -65,13 +64,13 @@ class Cluster(FTraceComponent):
         return set(self._cluster_idle_events_by_cluster.keys())
 
     @requires('cluster_enter', 'cluster_exit')
-    @memoize
+    @cached
     def idle_time(self, cluster, interval=None):
         """Return Idle time for specified cluster [including in LPM state]"""
         return self._trace.duration - self.active_time(cluster=cluster, interval=interval)
 
     @requires('cluster_enter', 'cluster_exit')
-    @memoize
+    @cached
     def lpm_time(self, cluster, interval=None):
         """Return time for specified cluster when in LPM.
         This is an approximation as we can exit LPM if cluster was in LPM
@@ -87,7 +86,7 @@ class Cluster(FTraceComponent):
             return float('nan')
 
     @requires('cluster_enter', 'cluster_exit')
-    @memoize
+    @cached
     def active_time(self, cluster, interval=None):
         """Return Idle time for specified cluster when its not offline.
         todo: filter by task
@@ -102,7 +101,7 @@ class Cluster(FTraceComponent):
             return float('nan')
 
     @requires('cluster_enter', 'cluster_exit')
-    @memoize
+    @cached
     def busy_intervals(self, cluster=None, interval=None):
         """Return Busy interval for specified cluster & interval
         when cluster is not IDLE (in LPM) state
@@ -115,7 +114,7 @@ class Cluster(FTraceComponent):
             return IntervalList()
 
     @requires('cluster_enter', 'cluster_exit')
-    @memoize
+    @cached
     def lpm_intervals(self, cluster=None, interval=None):
         """Return Idle interval for specified cpu & interval
         when cluster is IDLE (in LPM) state
@@ -129,7 +128,7 @@ class Cluster(FTraceComponent):
 
 
     @requires('cluster_enter', 'cluster_exit')
-    @memoize
+    @cached
     def cluster_intervals(self, cluster, interval=None):
         """Return interval for specified cluster & interval
         """
@@ -147,7 +146,7 @@ class Cluster(FTraceComponent):
 
     def _cluster_idle_events_handler(self):
         """Handler function for Cluster Idle events"""
-        self._cluster_idle_intervals_by_cluster = defaultdict(IntervalList)
+        cluster_idle_intervals_by_cluster = defaultdict(list)
         for cluster, events in self._cluster_idle_events_by_cluster.iteritems():
             last_event = None
             for cluster_idle in events:
@@ -160,7 +159,7 @@ class Cluster(FTraceComponent):
                                                  idx=cluster_idle.data.idx,
                                                  interval=interval,
                                                 )
-                    self._cluster_idle_intervals_by_cluster[cluster].append(idle_interval)
+                    cluster_idle_intervals_by_cluster[cluster].append(idle_interval)
                 elif tp == 'cluster_enter':
                     interval = Interval(last_event.timestamp if last_event else self._trace.interval.start,
                                         cluster_idle.timestamp)
@@ -169,7 +168,7 @@ class Cluster(FTraceComponent):
                                                  idx=-1,
                                                  interval=interval,
                                                 )
-                    self._cluster_idle_intervals_by_cluster[cluster].append(idle_interval)
+                    cluster_idle_intervals_by_cluster[cluster].append(idle_interval)
 
                 last_event = cluster_idle
 
@@ -181,7 +180,7 @@ class Cluster(FTraceComponent):
                 else:
                     state = BusyState.IDLE
                     idx = last_event.data.idx
-                self._cluster_idle_intervals_by_cluster[cluster].append(IdleInterval(
+                cluster_idle_intervals_by_cluster[cluster].append(IdleInterval(
                                                     cluster=cluster,
                                                     state=state,
                                                     idx=idx,
@@ -192,18 +191,13 @@ class Cluster(FTraceComponent):
                                                 )
                                             )
 
+        self._cluster_idle_intervals_by_cluster = \
+            build_lists(cluster_idle_intervals_by_cluster, cls=IntervalList)
         return self._cluster_idle_intervals_by_cluster
 
 
     def _parse_cluster_idle_events(self):
         """Parse Cluster idle intervals"""
-        self._cluster_idle_events_by_cluster = defaultdict(EventList)
-
-        def cluster_idle_events_gen():
-            filter_func = lambda event: event.tracepoint in ('cluster_enter',
-                            'cluster_exit')
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in cluster_idle_events_gen():
-            self._cluster_idle_events_by_cluster[event.data.name].append(event)
\ No newline at end of file
+        cluster_idle_events = self._trace.events_for(['cluster_enter', 'cluster_exit'])
+        self._cluster_idle_events_by_cluster = group_by(cluster_idle_events,
+            key=lambda event: event.data.name)
\ No newline at end of file
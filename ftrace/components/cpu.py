@@ -24,12 +24,12 @@ except ImportError:
     from logging import Logger
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
-from ftrace.event import EventList
-from ftrace.task import Task, TaskState
+from ftrace.event import EventList, decode
+from ftrace.task import TaskState
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
+from ftrace.composites import sorted_items, group_by, build_lists
 from ftrace.common import ConstantBase, FtraceError
-from ftrace.utils.decorators import requires, memoize
+from ftrace.utils.decorators import requires, cached
 
 log = Logger('CPU')
 
@@ -69,12 +69,13 @@ class CPU(FTraceComponent):
     def _initialize(self):
         """
         """
+        self._invalidate_intervals()
         self._parse_rq_events()
         self._parse_freq_events()
         self._parse_cpu_idle_events()
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def seen_tasks(self, cpu=None):
         """Return iterable (list or set) of all tasks seen"""
         if cpu is not None:
@@ -86,14 +87,14 @@ class CPU(FTraceComponent):
         return tasks
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def idle_time(self, cpu, interval=None):
         """Return Idle time for specified cpu [including in LPM state]"""
         duration = interval.duration if interval else self._trace.duration
         return duration - self.busy_time(cpu=cpu, interval=interval)
 
     @requires('cpu_idle')
-    @memoize
+    @cached
     def lpm_time(self, cpu, interval=None):
         """Return time for specified cpu when in LPM.
         This is an approximation as we can exit LPM if CPU was in LPM
@@ -109,7 +110,7 @@ class CPU(FTraceComponent):
             return float('nan')
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def task_time(self, task, cpu=None, interval=None):
         """Returns time for specified task for given cpu/interval (if any)"""
         try:
@@ -121,7 +122,7 @@ class CPU(FTraceComponent):
             return float('nan')
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def busy_time(self, cpu, interval=None):
         """Return Idle time for specified cpu when its not offline.
         todo: filter by task
@@ -144,7 +145,7 @@ class CPU(FTraceComponent):
         return sum(it.interval.duration for it in iterable)
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def runqueue_depth_time(self, cpu, rq_depth, interval=None):
         """Returns total time when rq_depth is `rq_depth`"""
         filter_func = lambda rqi: rqi.runnable == rq_depth
@@ -152,7 +153,7 @@ class CPU(FTraceComponent):
         return sum(it.interval.duration for it in iterable)
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def idle_intervals(self, cpu=None, interval=None):
         """Return Idle interval for specified cpu & interval
         when CPU is active before entering LPM state i.e. idle loop
@@ -173,7 +174,7 @@ class CPU(FTraceComponent):
 
 
     @requires('cpu_idle')
-    @memoize
+    @cached
     def lpm_intervals(self, cpu, interval=None):
         """Return lpm interval for specified cpu & interval
         when CPU is in LPM state.
@@ -191,7 +192,7 @@ class CPU(FTraceComponent):
         return IntervalList(intervals.slice(interval=interval))
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def simultaneously_busy_intervals(self, interval=None):
         """Returns IntervalList with for simultaneously busy cores"""
         try:
@@ -200,7 +201,7 @@ class CPU(FTraceComponent):
             return IntervalList(self._sim_busy_interval_handler().slice(interval=interval))
 
     @requires('cpu_frequency')
-    @memoize
+    @cached
     def frequency_intervals(self, cpu, interval=None):
         """Returns freq intervals for specified task on cpu"""
         try:
@@ -209,7 +210,7 @@ class CPU(FTraceComponent):
             return IntervalList(self._freq_events_handler()[cpu].slice(interval=interval))
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def busy_intervals(self, cpu, task=None, interval=None):
         """Returns busy intervals for specified task (if any) on cpu (if any)
         over the specified interval (if any) when TaskState = RUNNING
@@ -224,7 +225,7 @@ class CPU(FTraceComponent):
         return IntervalList(filter(filter_func, task_intervals))
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def task_intervals(self, cpu=None, task=None, interval=None):
         """Returns task intervals for specified task (if any) on cpu (if any)
         over the specified interval (if any).
@@ -245,7 +246,7 @@ class CPU(FTraceComponent):
             raise FtraceError(msg=e.message)
 
     @requires('sched_switch', 'sched_wakeup')
-    @memoize
+    @cached
     def runqueue_depth_intervals(self, cpu, interval=None):
         """
         Returns interval of RQ-depth by CPU.
@@ -279,14 +280,14 @@ class CPU(FTraceComponent):
         self._rq_intervals_by_cpu = defaultdict(IntervalList)
 
         for cpu in self._trace.seen_cpus:
-            for rq_interval in rq_gen(cpu):
-                self._rq_intervals_by_cpu[cpu].append(rq_interval)
+            self._rq_intervals_by_cpu[cpu] = \
+                IntervalList.from_iterable(rq_gen(cpu), presorted=True)
 
         return self._rq_intervals_by_cpu
 
     def _freq_events_handler(self):
         """Handler function for CPU frequency events"""
-        self._freq_intervals_by_cpu = defaultdict(IntervalList)
+        freq_intervals_by_cpu = defaultdict(list)
         if not 'cpu_frequency_switch_start' in self.freq_tracepoints:
             for cpu, events in self._freq_events_by_cpu.iteritems():
                 for freq_a, freq_b in zip(events, events[1:]):
@@ -295,9 +296,9 @@ class CPU(FTraceComponent):
                                                frequency=freq_a.data.state,
                                                interval=interval,
                                                )
-                    self._freq_intervals_by_cpu[cpu].append(freq_interval)
+                    freq_intervals_by_cpu[cpu].append(freq_interval)
                 # again, we need some closure.
-                self._freq_intervals_by_cpu[cpu].append(FreqInterval(
+                freq_intervals_by_cpu[cpu].append(FreqInterval(
                                                         cpu=cpu,
                                                         frequency=freq_b.data.state,
                                                         interval=Interval(
@@ -316,10 +317,10 @@ class CPU(FTraceComponent):
                                                frequency=freq.data.start,
                                                interval=interval,
                                                )
-                    self._freq_intervals_by_cpu[cpu].append(freq_interval)
+                    freq_intervals_by_cpu[cpu].append(freq_interval)
                     last_timestamp = freq.timestamp
                 # closure
-                self._freq_intervals_by_cpu[cpu].append(FreqInterval(
+                freq_intervals_by_cpu[cpu].append(FreqInterval(
                                                         cpu=cpu,
                                                         frequency=freq.data.end,
                                                         interval=Interval(
@@ -329,11 +330,13 @@ class CPU(FTraceComponent):
                                                     )
                                                 )
 
+        self._freq_intervals_by_cpu = build_lists(freq_intervals_by_cpu,
+                                                  cls=IntervalList)
         return self._freq_intervals_by_cpu
 
     def _cpu_idle_events_handler(self):
         """Handler function for CPU Idle events"""
-        self._cpu_idle_intervals_by_cpu = defaultdict(IntervalList)
+        cpu_idle_intervals_by_cpu = defaultdict(list)
         if 'cpu_idle' in self.idle_tracepoints:
             for cpu, events in self._cpu_idle_events_by_cpu.iteritems():
                 last_event = None
@@ -346,12 +349,12 @@ class CPU(FTraceComponent):
                                                      state=last_event.data.state,
                                                      interval=interval,
                                                     )
-                        self._cpu_idle_intervals_by_cpu[cpu].append(idle_interval)
+                        cpu_idle_intervals_by_cpu[cpu].append(idle_interval)
                     last_event = cpu_idle_a
 
                 # again, we need some closure.
                 if last_event and last_event.data.state != 4294967295L:
-                    self._cpu_idle_intervals_by_cpu[cpu].append(IdleInterval(
+                    cpu_idle_intervals_by_cpu[cpu].append(IdleInterval(
                                                         cpu=cpu,
                                                         state=last_event.data.state,
                                                         interval=Interval(
@@ -373,14 +376,14 @@ class CPU(FTraceComponent):
                                                      state=cpu_idle_a.data.idx,
                                                      interval=interval,
                                                     )
-                        self._cpu_idle_intervals_by_cpu[cpu].append(idle_interval)
+                        cpu_idle_intervals_by_cpu[cpu].append(idle_interval)
                     else: # enter LPM
                         last_timestamp = cpu_idle_a.timestamp
                     last_event = cpu_idle_a
 
                 # again, we need some closure.
                 if last_event and last_event.tracepoint != 'cpu_idle_exit':
-                    self._cpu_idle_intervals_by_cpu[cpu].append(IdleInterval(
+                    cpu_idle_intervals_by_cpu[cpu].append(IdleInterval(
                                                         cpu=cpu,
                                                         state=last_event.data.idx,
                                                         interval=Interval(
@@ -390,6 +393,8 @@ class CPU(FTraceComponent):
                                                     )
                                                 )
 
+        self._cpu_idle_intervals_by_cpu = build_lists(cpu_idle_intervals_by_cpu,
+                                                      cls=IntervalList)
         return self._cpu_idle_intervals_by_cpu
 
     def _sim_busy_interval_handler(self):
@@ -422,82 +427,186 @@ class CPU(FTraceComponent):
         self._sim_busy_intervals = IntervalList(sim_busy_gen())
         return self._sim_busy_intervals
 
+    def _freq_tracepoints(self):
+        tracepoints = set(['cpu_frequency_switch_start'])
+        if not tracepoints.intersection(self._trace.tracepoints):
+            tracepoints = set(['cpu_frequency'])
+        return tracepoints
+
+    def _idle_tracepoints(self):
+        tracepoints = set(['cpu_idle_enter', 'cpu_idle_exit'])
+        if not tracepoints.intersection(self._trace.tracepoints):
+            tracepoints = set(['cpu_idle'])
+        return tracepoints
+
+    def _idle_cpu(self, event):
+        return event.data.cpu_id if event.tracepoint == 'cpu_idle' else event.cpu
+
+    def _invalidate_intervals(self):
+        """Drop intervals derived (on first access) from parsed events"""
+        for attr in ('_rq_intervals_by_cpu', '_freq_intervals_by_cpu',
+                     '_cpu_idle_intervals_by_cpu', '_sim_busy_intervals'):
+            self.__dict__.pop(attr, None)
+
+    def _update(self, events):
+        """
+        Consume newly appended events: run-queue state carries on from the
+        last event parsed, provisional (closure) task intervals are replaced
+        and freq/idle events are appended.
+        """
+        if self._freq_tracepoints() != self.freq_tracepoints or \
+            self._idle_tracepoints() != self.idle_tracepoints:
+            self._initialized = False # tracepoints to use changed
+            return
+
+        self._update_rq_events(events)
+        for event in decode([event for event in events
+                             if event.tracepoint in self.freq_tracepoints]):
+            self._freq_events_by_cpu[event.data.cpu_id].append(event)
+        for event in decode([event for event in events
+                             if event.tracepoint in self.idle_tracepoints]):
+            self._cpu_idle_events_by_cpu[self._idle_cpu(event)].append(event)
+        self._invalidate_intervals()
+
+    def _evict(self, timestamp):
+        """
+        Drop intervals and events before `timestamp`, keeping those in
+        effect at timestamp (e.g. frequency, rq-depth, busy state per cpu).
+        """
+        for task_intervals in self._task_intervals_by_cpu.itervalues():
+            task_intervals.evict(timestamp)
+        for events_by_cpu in (self._rq_events_by_cpu, self._freq_events_by_cpu,
+                              self._cpu_idle_events_by_cpu):
+            for events in events_by_cpu.itervalues():
+                events.evict(timestamp, keep_current=True)
+
+        # last state change (before timestamp) per cpu is in effect.
+        state_changes = self._state_changes.slice(
+            Interval(self._trace.interval.start, timestamp), closed='left')
+        current_changes = dict((state_change.cpu, state_change)
+                               for state_change in state_changes)
+        self._state_changes.evict(timestamp)
+        for state_change in current_changes.itervalues():
+            self._state_changes.append(state_change)
+        self._invalidate_intervals()
+
     def _parse_freq_events(self):
         """Parse CPU frequency intervals"""
-        self._freq_events_by_cpu = defaultdict(EventList)
-        self.freq_tracepoints = set(['cpu_frequency_switch_start'])
-        if not self.freq_tracepoints.intersection(self._trace.tracepoints):
-            self.freq_tracepoints = set(['cpu_frequency'])
+        self.freq_tracepoints = self._freq_tracepoints()
 
-        def freq_events_gen():
-            filter_func = lambda event: event.tracepoint in self.freq_tracepoints
-            for event in filter(filter_func, self._events):
-                yield event
+        freq_events = decode(list(self._trace.events_for(self.freq_tracepoints)))
 
-        for event in freq_events_gen():
-            self._freq_events_by_cpu[event.data.cpu_id].append(event)
+        self._freq_events_by_cpu = group_by(freq_events,
+                                            key=lambda event: event.data.cpu_id)
 
     def _parse_cpu_idle_events(self):
         """Parse CPU idle intervals"""
-        self._cpu_idle_events_by_cpu = defaultdict(EventList)
-        self.idle_tracepoints = set(['cpu_idle_enter', 'cpu_idle_exit'])
-        if not self.idle_tracepoints.intersection(self._trace.tracepoints):
-            self.idle_tracepoints = set(['cpu_idle'])
-        def cpu_idle_events_gen():
-            # Best to use different tracepoint.
-            filter_func = lambda event: event.tracepoint in self.idle_tracepoints
-            for event in filter(filter_func, self._events):
-                    yield event
+        # Best to use different tracepoint.
+        self.idle_tracepoints = self._idle_tracepoints()
+        cpu_idle_events = decode(list(self._trace.events_for(self.idle_tracepoints)))
 
-        if 'cpu_idle' in self.idle_tracepoints:
-            for event in cpu_idle_events_gen():
-                self._cpu_idle_events_by_cpu[event.data.cpu_id].append(event)
-        else:
-            for event in cpu_idle_events_gen():
-                self._cpu_idle_events_by_cpu[event.cpu].append(event)
+        self._cpu_idle_events_by_cpu = group_by(cpu_idle_events, key=self._idle_cpu)
 
-    def _parse_rq_events(self):
-        """Parses CPU run-queue events"""
-        self._task_intervals_by_cpu = defaultdict(IntervalList)
-        self._rq_events_by_cpu = defaultdict(EventList)
-        self._state_changes = EventList()
+    def _reset_rq_state(self):
+        """Reset run-queue state carried from one event to the next"""
         self._tasks_by_cpu = defaultdict(set)
+        self._runnable_tasks = defaultdict(set)
+        self._update_running = defaultdict(lambda: False)
+        self._last_seen_timestamps = defaultdict(lambda: defaultdict(lambda: self._trace.interval.start))
+        self._last_seen_state = defaultdict(lambda: defaultdict(lambda: TaskState.UNKNOWN))
+        self._last_state = defaultdict(lambda: BusyState.UNKNOWN)
+        self._last_rq_depth = defaultdict(lambda: self._trace.interval.start)
+        self._next_task_by_cpu = defaultdict(lambda: None)
 
-        def sched_events_gen():
-            filter_func = lambda event: event.tracepoint in ['sched_switch', 'sched_wakeup']
-            for event in filter(filter_func, self._events):
-                yield event
+    def _parse_rq_events(self):
+        """Parses CPU run-queue events"""
+        self._reset_rq_state()
+        task_intervals_by_cpu, rq_events_by_cpu, state_changes = \
+            self._consume_rq_events(self._trace.events_for(['sched_switch', 'sched_wakeup']))
+
+        self._provisional_task_intervals = self._close_rq_events()
+        for cpu, task_interval in self._provisional_task_intervals.iteritems():
+            task_intervals_by_cpu[cpu].append(task_interval)
+
+        self._task_intervals_by_cpu = build_lists(task_intervals_by_cpu,
+                                                  cls=IntervalList)
+        self._rq_events_by_cpu = build_lists(rq_events_by_cpu, presorted=True)
+        self._state_changes = EventList.from_iterable(state_changes, presorted=True)
+
+    def _update_rq_events(self, events):
+        """Consume newly appended run-queue events (see `_parse_rq_events`)"""
+        for cpu, task_interval in self._provisional_task_intervals.iteritems():
+            self._task_intervals_by_cpu[cpu].remove(task_interval)
+
+        task_intervals_by_cpu, rq_events_by_cpu, state_changes = \
+            self._consume_rq_events(event for event in events
+                if event.tracepoint in ('sched_switch', 'sched_wakeup'))
+
+        self._provisional_task_intervals = self._close_rq_events()
+        for cpu, task_interval in self._provisional_task_intervals.iteritems():
+            task_intervals_by_cpu[cpu].append(task_interval)
+
+        for cpu, task_intervals in task_intervals_by_cpu.iteritems():
+            for task_interval in task_intervals:
+                self._task_intervals_by_cpu[cpu].append(task_interval)
+        for cpu, rq_events in rq_events_by_cpu.iteritems():
+            self._rq_events_by_cpu[cpu].extend(rq_events)
+        self._state_changes.extend(state_changes)
 
-        runnable_tasks = defaultdict(set)
-        update_running = defaultdict(lambda: False)
-        last_seen_timestamps = defaultdict(lambda: defaultdict(lambda: self._trace.interval.start))
-        last_seen_state = defaultdict(lambda: defaultdict(lambda: TaskState.UNKNOWN))
-        last_state = defaultdict(lambda: BusyState.UNKNOWN)
-        last_rq_depth = defaultdict(lambda: self._trace.interval.start)
-        next_task_by_cpu = defaultdict(lambda: None)
+    def _close_rq_events(self):
+        """
+        Returns dict of (provisional) task intervals of tasks running at
+        end of trace, by cpu. These are replaced on next update.
+        """
+        task_intervals = {}
+        for cpu, task in self._next_task_by_cpu.iteritems():
+            if task:
+                task_interval = TaskInterval(task=task, cpu=cpu, # what's cpu.
+                                    interval=Interval(self._last_seen_timestamps[cpu][task], self._trace.duration),
+                                    state=self._last_seen_state[cpu][task],
+                                )
+                task_intervals[cpu] = task_interval
+        return task_intervals
 
-        for event in sched_events_gen():
+    def _consume_rq_events(self, events):
+        """
+        Consume sched events, carrying run-queue state (see `_reset_rq_state`).
+        Returns (task intervals by cpu, rq changes by cpu, state changes) seen.
+        """
+        task_intervals_by_cpu = defaultdict(list)
+        rq_events_by_cpu = defaultdict(list)
+        state_changes = []
+
+        runnable_tasks = self._runnable_tasks
+        update_running = self._update_running
+        last_seen_timestamps = self._last_seen_timestamps
+        last_seen_state = self._last_seen_state
+        last_state = self._last_state
+        last_rq_depth = self._last_rq_depth
+        next_task_by_cpu = self._next_task_by_cpu
+        get_task = self._trace.tasks.get
+
+        for event in events:
             tracepoint, timestamp, data = event.tracepoint, event.timestamp, event.data
             
             if tracepoint == 'sched_switch':
                 cpu = event.cpu
-                prev_task = Task(name=data.prev_comm, pid=data.prev_pid, prio=data.prev_prio)
+                prev_task = get_task(data.prev_comm, data.prev_pid, data.prev_prio)
                 # Getting descheduled (fix: note correct state in task_intervals)
                 prev_task_state = TaskState.RUNNING # last_seen_state[cpu][prev_task]
                 prev_task_interval = TaskInterval(task=prev_task, cpu=cpu,
                     interval=Interval(last_seen_timestamps[cpu][prev_task], timestamp),
                     state=prev_task_state)
 
-                next_task = Task(name=data.next_comm, pid=data.next_pid, 
-                                 prio=data.next_prio)
+                next_task = get_task(data.next_comm, data.next_pid, data.next_prio)
                 next_task_by_cpu[cpu] = next_task
                 
                 next_task_interval = TaskInterval(task=next_task, cpu=cpu, 
                     interval=Interval(last_seen_timestamps[cpu][next_task], timestamp), 
                     state=last_seen_state[cpu][next_task])
 
-                self._task_intervals_by_cpu[cpu].append(prev_task_interval)
-                self._task_intervals_by_cpu[cpu].append(next_task_interval)
+                task_intervals_by_cpu[cpu].append(prev_task_interval)
+                task_intervals_by_cpu[cpu].append(next_task_interval)
                 
                 adjusted_runstate = data.prev_state
                 if adjusted_runstate in (TaskState.RUNNING, TaskState.RUNNABLE):
@@ -519,7 +628,7 @@ class CPU(FTraceComponent):
                     state_change = StateChange(cpu=cpu,
                                                timestamp=timestamp,
                                                state=current_state)
-                    self._state_changes.append(state_change)
+                    state_changes.append(state_change)
                     last_state[cpu] = current_state
                     update_running[cpu] = True
 
@@ -545,7 +654,7 @@ class CPU(FTraceComponent):
                 # When a task wakeup occurs, its placed on run-queue (RQ)
                 # but may not be RUNNING right-away (depending on priority)
                 # during this time & if anything is runnable
-                task = Task(name=data.comm, pid=data.pid, prio=data.prio)
+                task = get_task(data.comm, data.pid, data.prio)
                 # woken-up task can run right-away if nothing is on queue.
                 # we handle this later.
                 
@@ -562,7 +671,7 @@ class CPU(FTraceComponent):
                     prev_task_interval = TaskInterval(task=task, cpu=last_seen_cpu,
                         interval=Interval(last_seen_timestamps[last_seen_cpu][task], timestamp),
                         state=prev_task_state)
-                    self._task_intervals_by_cpu[last_seen_cpu].append(prev_task_interval)
+                    task_intervals_by_cpu[last_seen_cpu].append(prev_task_interval)
                     last_seen_timestamps[last_seen_cpu][task] = timestamp
                 else:
                     pass #oh no, likely first time queued or traced
@@ -584,15 +693,8 @@ class CPU(FTraceComponent):
                 running = 1 if last_state[cpu] == BusyState.BUSY else 0
                 rq_changes = RunQueueChange(cpu=cpu, timestamp=timestamp,
                     runnable=num_runnable, running=running)
-                self._rq_events_by_cpu[cpu].append(rq_changes)
+                rq_events_by_cpu[cpu].append(rq_changes)
 
             last_rq_depth[cpu] = num_runnable
 
-        # closure
-        for cpu, task in next_task_by_cpu.iteritems():
-            if task:
-                task_interval = TaskInterval(task=task, cpu=cpu, # what's cpu.
-                                    interval=Interval(last_seen_timestamps[cpu][task], self._trace.duration),
-                                    state=last_seen_state[cpu][task],
-                                )
-                self._task_intervals_by_cpu[cpu].append(task_interval)
+        return task_intervals_by_cpu, rq_events_by_cpu, state_changes
@@ -28,8 +28,8 @@ except ImportError:
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
-from ftrace.utils.decorators import requires, coroutine, memoize
+from ftrace.composites import sorted_items, build_lists
+from ftrace.utils.decorators import requires, coroutine, cached
 from ftrace.io import DiskCommand
 
 log = Logger('Disk')
@@ -76,7 +76,7 @@ class Disk(FTraceComponent):
 ##            return -1.
 
     @requires(*BLOCK_TRACEPOINTS)
-    @memoize
+    @cached
     def total_io_requests(self, op=None, interval=None, by='issue'):
         try:
             request_intervals = self.io_request_intervals(op=op, interval=interval)
@@ -87,7 +87,7 @@ class Disk(FTraceComponent):
             return float('nan')
 
     @requires(*BLOCK_TRACEPOINTS)
-    @memoize
+    @cached
     def io_request_intervals(self, op=None, interval=None, by='issue'):
         """Returns event intervals for specified `op`
 
@@ -120,105 +120,135 @@ class Disk(FTraceComponent):
         """
         last_timestamp = self._trace.interval.start
         last_event = None
-        block_issue_events_by_sector = defaultdict(list)
-        block_insert_events_by_sector = defaultdict(list)
-
-        try:
-            while True:
-                event = (yield)
-                tracepoint = event.tracepoint
-                sector = event.data.sector
-                if tracepoint == 'block_rq_issue':
-                    block_issue_events_by_sector[sector].append(event)
-                elif tracepoint == 'block_rq_insert':
-                    block_insert_events_by_sector[sector].append(event)
-                elif tracepoint == 'block_rq_complete':
-                    # TODO: [CHUK] validate this, currently assuming
-                    # each block i/o request per sector is serially queued.
-                    # This is true for simple trace I have but maynot always hold.
-                    if block_issue_events_by_sector[sector]:
-                        last_event = block_issue_events_by_sector[sector].pop()
-                        last_timestamp = last_event.timestamp
-                        io_type=event.data.rwbs.io_type
-                        device = (event.data.dev_major, event.data.dev_minor)
-                        interval = Interval(last_timestamp, event.timestamp)
-                        block_io = IOInterval(io_type=io_type,
-                                             task=last_event.task,
-                                             device=device,
-                                             sector=sector,
-                                             errors=event.data.errors,
-                                             numSectors=event.data.nr_sector,
-                                             interval=interval,
-                                             commands=event.data.rwbs.commands)
-                        self._io_issue_intervals_by_op[io_type].append(block_io)
-
-                    if block_insert_events_by_sector[sector]:
-                        last_event = block_insert_events_by_sector[sector].pop()
-                        last_timestamp = last_event.timestamp
-                        io_type=event.data.rwbs.io_type
-                        device = (event.data.dev_major, event.data.dev_minor)
-                        interval = Interval(last_timestamp, event.timestamp)
-                        block_io = IOInterval(io_type=io_type,
-                                             task=last_event.task,
-                                             device=device,
-                                             sector=sector,
-                                             errors=event.data.errors,
-                                             numSectors=event.data.nr_sector,
-                                             interval=interval,
-                                             commands=event.data.rwbs.commands)
-                        self._io_insert_intervals_by_op[io_type].append(block_io)
-                else:
-                    log.warn("Missing issue marker {event}".format(event=event))
-
-        except GeneratorExit:
-            # close things off
-            def closure(dict_to_use, dest_dict):
-                for sector, event_list in dict_to_use.iteritems():
-                    for event in event_list:
-                        last_timestamp = event.timestamp
-                        io_type=event.data.rwbs.io_type
-                        device = (event.data.dev_major, event.data.dev_minor)
-                        interval = Interval(last_timestamp, self._trace.duration)
-                        block_io = IOInterval(io_type=io_type,
-                                             task=event.task,
-                                             device=device,
-                                             sector=sector,
-                                             errors=event.data.errors,
-                                             numSectors=event.data.nr_sector,
-                                             interval=interval,
-                                             commands=event.data.rwbs.commands)
-                        dest_dict[io_type].append(block_io)
-
-            closure(block_issue_events_by_sector, self._io_issue_intervals_by_op)
-            closure(block_insert_events_by_sector, self._io_insert_intervals_by_op)
+        block_issue_events_by_sector = self._pending_issue_events
+        block_insert_events_by_sector = self._pending_insert_events
+
+        while True:
+            event = (yield)
+            tracepoint = event.tracepoint
+            sector = event.data.sector
+            if tracepoint == 'block_rq_issue':
+                block_issue_events_by_sector[sector].append(event)
+            elif tracepoint == 'block_rq_insert':
+                block_insert_events_by_sector[sector].append(event)
+            elif tracepoint == 'block_rq_complete':
+                # TODO: [CHUK] validate this, currently assuming
+                # each block i/o request per sector is serially queued.
+                # This is true for simple trace I have but maynot always hold.
+                if block_issue_events_by_sector[sector]:
+                    last_event = block_issue_events_by_sector[sector].pop()
+                    last_timestamp = last_event.timestamp
+                    io_type=event.data.rwbs.io_type
+                    device = (event.data.dev_major, event.data.dev_minor)
+                    interval = Interval(last_timestamp, event.timestamp)
+                    block_io = IOInterval(io_type=io_type,
+                                         task=last_event.task,
+                                         device=device,
+                                         sector=sector,
+                                         errors=event.data.errors,
+                                         numSectors=event.data.nr_sector,
+                                         interval=interval,
+                                         commands=event.data.rwbs.commands)
+                    self._io_issue_intervals_by_op[io_type].append(block_io)
+
+                if block_insert_events_by_sector[sector]:
+                    last_event = block_insert_events_by_sector[sector].pop()
+                    last_timestamp = last_event.timestamp
+                    io_type=event.data.rwbs.io_type
+                    device = (event.data.dev_major, event.data.dev_minor)
+                    interval = Interval(last_timestamp, event.timestamp)
+                    block_io = IOInterval(io_type=io_type,
+                                         task=last_event.task,
+                                         device=device,
+                                         sector=sector,
+                                         errors=event.data.errors,
+                                         numSectors=event.data.nr_sector,
+                                         interval=interval,
+                                         commands=event.data.rwbs.commands)
+                    self._io_insert_intervals_by_op[io_type].append(block_io)
+            else:
+                log.warn("Missing issue marker {event}".format(event=event))
+
+    def _close_io_events(self):
+        """
+        Close off block requests still pending at end of trace. Returns
+        list of (intervals attribute, provisional interval), replaced on
+        next update.
+        """
+        provisional = []
+        def closure(dict_to_use, dest_attr):
+            for sector, event_list in dict_to_use.iteritems():
+                for event in event_list:
+                    last_timestamp = event.timestamp
+                    io_type=event.data.rwbs.io_type
+                    device = (event.data.dev_major, event.data.dev_minor)
+                    interval = Interval(last_timestamp, self._trace.duration)
+                    block_io = IOInterval(io_type=io_type,
+                                         task=event.task,
+                                         device=device,
+                                         sector=sector,
+                                         errors=event.data.errors,
+                                         numSectors=event.data.nr_sector,
+                                         interval=interval,
+                                         commands=event.data.rwbs.commands)
+                    getattr(self, dest_attr)[io_type].append(block_io)
+                    provisional.append((dest_attr, block_io))
+
+        closure(self._pending_issue_events, '_io_issue_intervals_by_op')
+        closure(self._pending_insert_events, '_io_insert_intervals_by_op')
+        return provisional
+
+    def _consume_io_events(self, events):
+        """Send block events to handler (by tracepoint)"""
+        for event in events:
+            handler_func = self.__event_handlers[event.tracepoint]
+            if isinstance(event.data, str):
+                pass
+            if DiskCommand.FLUSH not in event.data.rwbs.commands:
+                # CHUK: for now, discard FLUSH commands.
+                handler_func.send(event)
 
     def _parse_io_events(self):
         """Parse block i/o intervals"""
+        self._io_insert_intervals_by_op = defaultdict(list)
+        self._io_issue_intervals_by_op = defaultdict(list)
+        # Pending (issued/inserted) requests by sector, carried across updates.
+        self._pending_issue_events = defaultdict(list)
+        self._pending_insert_events = defaultdict(list)
         block_handler = self._block_handler()
 
-        _IO_HANDLERS = {
+        self.__event_handlers = {
             'block_rq_complete' : block_handler,
             'block_rq_issue' : block_handler,
         }
 
-        def io_events_gen():
-            filter_func = lambda event: event.tracepoint in BLOCK_TRACEPOINTS
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in io_events_gen():
-            try:
-                handler_func = self.__event_handlers[event.tracepoint]
-            except KeyError:
-                handler_func = \
-                    self.__event_handlers[event.tracepoint] = \
-                        _IO_HANDLERS[event.tracepoint]
-            if isinstance(event.data, str):
-                pass
-            if DiskCommand.FLUSH not in event.data.rwbs.commands:
-                # CHUK: for now, discard FLUSH commands.
-                handler_func.send(event)
+        self._consume_io_events(self._trace.events_for(BLOCK_TRACEPOINTS))
+        self._provisional_intervals = self._close_io_events()
+
+        self._io_insert_intervals_by_op = \
+            build_lists(self._io_insert_intervals_by_op, cls=IntervalList)
+        self._io_issue_intervals_by_op = \
+            build_lists(self._io_issue_intervals_by_op, cls=IntervalList)
 
-        # shut down the coroutines (..and we are done!)
-        for handler_func in self.__event_handlers.itervalues():
-            handler_func.close()
\ No newline at end of file
+    def _update(self, events):
+        """
+        Consume newly appended block events, carrying on with pending
+        requests. Provisional intervals (closed at end of trace) are replaced.
+        """
+        for dest_attr, block_io in self._provisional_intervals:
+            getattr(self, dest_attr)[block_io.io_type].remove(block_io)
+        self._consume_io_events(event for event in events
+                                if event.tracepoint in BLOCK_TRACEPOINTS)
+        self._provisional_intervals = self._close_io_events()
+
+    def _evict(self, timestamp):
+        """
+        Drop i/o intervals ended by `timestamp`. Pending requests
+        (provisional intervals) are kept.
+        """
+        for intervals_by_op in (self._io_insert_intervals_by_op,
+                                self._io_issue_intervals_by_op):
+            for op, intervals in intervals_by_op.items():
+                intervals.evict(timestamp)
+                if not intervals:
+                    del intervals_by_op[op]
@@ -24,11 +24,10 @@ except ImportError:
     from logging import Logger
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
-from ftrace.event import EventList
 from ftrace.ftrace import register_api, FTraceComponent
-from ftrace.composites import sorted_items
+from ftrace.composites import sorted_items, group_by, build_lists
 from ftrace.common import ConstantBase, is_list_like
-from ftrace.utils.decorators import requires, memoize
+from ftrace.utils.decorators import requires, cached
 
 log = Logger('CPU')
 
@@ -101,19 +100,20 @@ class GPU(FTraceComponent):
     def _initialize(self):
         """
         """
+        self._invalidate_intervals()
         self._parse_freq_events()
         self._parse_bus_events()
         self._parse_pwr_state_events()
 
     @requires('kgsl_pwr_set_state')
-    @memoize
+    @cached
     def idle_time(self, device=None, interval=None):
         """Return Idle time for specified device [including in LPM & INIT/AWARE state]"""
         duration = interval.duration if interval else self._trace.duration 
         return duration - self.busy_time(device=device, interval=interval)
 
     @requires('kgsl_pwr_set_state')
-    @memoize
+    @cached
     def lpm_time(self, device=None, state=None, interval=None):
         """Return time for specified cpu when in LPM.
         This is an approximation as we can exit LPM if GPU was in LPM
@@ -129,7 +129,7 @@ class GPU(FTraceComponent):
             return float('nan')
 
     @requires('kgsl_pwr_set_state')
-    @memoize
+    @cached
     def busy_time(self, device=None, interval=None):
         """
         Return Busy (ACTIVE) time for specified gpu device.
@@ -144,7 +144,7 @@ class GPU(FTraceComponent):
             return float('nan')
             
     @requires('kgsl_pwr_set_state')
-    @memoize
+    @cached
     def idle_intervals(self, device=None, state=None, interval=None):
         """
         Returns busy (pwr state) intervals for specified state (if any)
@@ -154,7 +154,7 @@ class GPU(FTraceComponent):
             state=state or BusyState.IDLE(), interval=interval)
 
     @requires('kgsl_pwr_set_state')
-    @memoize
+    @cached
     def busy_intervals(self, device=None, state=None, interval=None):
         """
         Returns pwr state intervals for specified state (if any)
@@ -164,7 +164,7 @@ class GPU(FTraceComponent):
             state=state or BusyState.BUSY(), interval=interval)
 
     @requires('kgsl_pwr_set_state')
-    @memoize
+    @cached
     def pwrstate_intervals(self, device=None, state=None, interval=None):
         """
         Returns pwr state intervals for specified state (if any)
@@ -192,7 +192,7 @@ class GPU(FTraceComponent):
             return IntervalList()
 
     @requires('kgsl_buslevel')
-    @memoize
+    @cached
     def buslevel_intervals(self, device=None, interval=None):
         """
         """
@@ -214,7 +214,7 @@ class GPU(FTraceComponent):
             return IntervalList()
 
     @requires('kgsl_pwrlevel')
-    @memoize
+    @cached
     def frequency_intervals(self, device=None, interval=None):
         """Returns freq intervals for specified interval on device"""
         try:
@@ -236,7 +236,7 @@ class GPU(FTraceComponent):
 
     def _pwrlevel_events_handler(self):
         """Handler function for GPU Pwr Level events"""
-        self._pwrlevel_intervals_by_device = defaultdict(IntervalList)
+        pwrlevel_intervals_by_device = defaultdict(list)
         for device, events in self._pwrlevel_events_by_device.iteritems():
             for pwr_a, pwr_b in zip(events, events[1:]):
                 interval = Interval(pwr_a.timestamp, pwr_b.timestamp)
@@ -245,10 +245,10 @@ class GPU(FTraceComponent):
                    pwrlevel=pwr_a.data.pwrlevel,
                    interval=interval,
                    )
-                self._pwrlevel_intervals_by_device[device].append(freq_interval)
+                pwrlevel_intervals_by_device[device].append(freq_interval)
             # again, we need some closure.
             if events:
-                self._pwrlevel_intervals_by_device[device].append(FreqInterval(
+                pwrlevel_intervals_by_device[device].append(FreqInterval(
                                                         device=device,
                                                         frequency=pwr_b.data.freq,
                                                         pwrlevel=pwr_b.data.pwrlevel,
@@ -258,11 +258,14 @@ class GPU(FTraceComponent):
                                                         )
                                                     )
                                                 )
-            return self._pwrlevel_intervals_by_device
+
+        self._pwrlevel_intervals_by_device = build_lists(pwrlevel_intervals_by_device,
+            cls=IntervalList)
+        return self._pwrlevel_intervals_by_device
 
     def _pwrstate_events_handler(self):
         """Handler function for GPU Pwr State events"""
-        self._pwrstate_intervals_by_device = defaultdict(IntervalList)
+        pwrstate_intervals_by_device = defaultdict(list)
         for device, events in self._pwrstate_events_by_device.iteritems():
             for pwr_a, pwr_b in zip(events, events[1:]):
                 interval = Interval(pwr_a.timestamp, pwr_b.timestamp)
@@ -271,11 +274,11 @@ class GPU(FTraceComponent):
                    state=state,
                    interval=interval,
                    )
-                self._pwrstate_intervals_by_device[device].append(idle_interval)
+                pwrstate_intervals_by_device[device].append(idle_interval)
             # again, we need some closure.
             if events:
                 state = BusyState.map(pwr_b.data.state) or BusyState.UNKNOWN
-                self._pwrstate_intervals_by_device[device].append(IdleInterval(
+                pwrstate_intervals_by_device[device].append(IdleInterval(
                                                         device=device,
                                                         state=state,
                                                         interval=Interval(
@@ -284,12 +287,15 @@ class GPU(FTraceComponent):
                                                         )
                                                     )
                                                 )
-            return self._pwrstate_intervals_by_device
+
+        self._pwrstate_intervals_by_device = build_lists(pwrstate_intervals_by_device,
+            cls=IntervalList)
+        return self._pwrstate_intervals_by_device
 
 
     def _buslevel_events_handler(self):
         """Handler function for GPU Bus Level events"""
-        self._buslevel_intervals_by_device = defaultdict(IntervalList)
+        buslevel_intervals_by_device = defaultdict(list)
         for device, events in self._buslevel_events_by_device.iteritems():
             for bus_a, bus_b in zip(events, events[1:]):
                 interval = Interval(bus_a.timestamp, bus_b.timestamp)
@@ -298,10 +304,10 @@ class GPU(FTraceComponent):
                    bus=bus_a.data.bus,
                    interval=interval,
                    )
-                self._buslevel_intervals_by_device[device].append(bus_interval)
+                buslevel_intervals_by_device[device].append(bus_interval)
             # again, we need some closure.
             if events:
-                self._buslevel_intervals_by_device[device].append(BusLevelInterval(
+                buslevel_intervals_by_device[device].append(BusLevelInterval(
                                                         device=device,
                                                         pwrlevel=bus_b.data.pwrlevel,
                                                         bus=bus_b.data.bus,
@@ -311,47 +317,59 @@ class GPU(FTraceComponent):
                                                         )
                                                     )
                                                 )
-            return self._buslevel_intervals_by_device
+
+        self._buslevel_intervals_by_device = build_lists(buslevel_intervals_by_device,
+            cls=IntervalList)
+        return self._buslevel_intervals_by_device
 
     def _parse_bus_events(self):
         """
         Parses GPU bus level events
         """
-        self._buslevel_events_by_device = defaultdict(EventList)
-
-        def buslevel_events_gen():
-            filter_func = lambda event: event.tracepoint == 'kgsl_buslevel'
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in buslevel_events_gen():
-            self._buslevel_events_by_device[event.data.d_name].append(event)
+        self._buslevel_events_by_device = group_by(self._trace.events_for('kgsl_buslevel'),
+            key=lambda event: event.data.d_name)
 
     def _parse_pwr_state_events(self):
         """
         Parses GPU pwr state events
         """
-        self._pwrstate_events_by_device = defaultdict(EventList)
-
-        def pwrstate_events_gen():
-            filter_func = lambda event: event.tracepoint in 'kgsl_pwr_set_state'
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in pwrstate_events_gen():
-            self._pwrstate_events_by_device[event.data.d_name].append(event)
+        self._pwrstate_events_by_device = group_by(self._trace.events_for('kgsl_pwr_set_state'),
+            key=lambda event: event.data.d_name)
 
 
     def _parse_freq_events(self):
         """
         Parses GPU pwr level (freq + pwrlevel) events
         """
-        self._pwrlevel_events_by_device = defaultdict(EventList)
-
-        def pwrlevel_events_gen():
-            filter_func = lambda event: event.tracepoint in 'kgsl_pwrlevel'
-            for event in filter(filter_func, self._events):
-                    yield event
-
-        for event in pwrlevel_events_gen():
-            self._pwrlevel_events_by_device[event.data.d_name].append(event)
\ No newline at end of file
+        self._pwrlevel_events_by_device = group_by(self._trace.events_for('kgsl_pwrlevel'),
+            key=lambda event: event.data.d_name)
+
+    def _events_by_device(self):
+        """Returns dict of parsed events (by device), by tracepoint"""
+        return {
+            'kgsl_buslevel': self._buslevel_events_by_device,
+            'kgsl_pwr_set_state': self._pwrstate_events_by_device,
+            'kgsl_pwrlevel': self._pwrlevel_events_by_device,
+        }
+
+    def _invalidate_intervals(self):
+        """Drop intervals derived (on first access) from parsed events"""
+        for attr in ('_buslevel_intervals_by_device', '_pwrstate_intervals_by_device',
+                     '_pwrlevel_intervals_by_device'):
+            self.__dict__.pop(attr, None)
+
+    def _update(self, events):
+        """Append newly appended kgsl events, intervals are derived on next access"""
+        events_by_tracepoint = self._events_by_device()
+        for event in events:
+            events_by_device = events_by_tracepoint.get(event.tracepoint)
+            if events_by_device is not None:
+                events_by_device[event.data.d_name].append(event)
+        self._invalidate_intervals()
+
+    def _evict(self, timestamp):
+        """Drop events before `timestamp`, keeping state in effect at timestamp"""
+        for events_by_device in self._events_by_device().itervalues():
+            for events in events_by_device.itervalues():
+                events.evict(timestamp, keep_current=True)
+        self._invalidate_intervals()
@@ -26,7 +26,7 @@ except ImportError:
     from logging import getLogger as Logger
 from collections import defaultdict, namedtuple
 from ftrace.interval import Interval, IntervalList
-from ftrace.event import EventList
+from ftrace.composites import group_by, build_lists
 from ftrace.ftrace import register_api, FTraceComponent
 from ftrace.utils.decorators import requires
 
@@ -70,7 +70,7 @@ class Thermal(FTraceComponent):
 
     def _thermal_events_handler(self):
         """Handler function for thermal events"""
-        self._thermal_intervals_by_tsens = defaultdict(IntervalList)
+        thermal_intervals_by_tsens = defaultdict(list)
         for tsens, events in self._thermal_events_by_tsens.iteritems():
             last_temp, last_timestamp, last_threshold = -1.0, 0.0, False
             current_threshold = False
@@ -88,7 +88,7 @@ class Thermal(FTraceComponent):
 
                     thermal_interval = ThermalInterval(tsens, last_temp,
                                                        interval, last_threshold)
-                    self._thermal_intervals_by_tsens[tsens].append(thermal_interval)
+                    thermal_intervals_by_tsens[tsens].append(thermal_interval)
                 last_temp = current_temp
                 last_timestamp = thermal_event.timestamp
                 last_threshold = current_threshold
@@ -101,18 +101,15 @@ class Thermal(FTraceComponent):
                 ),
                 mitigated=last_threshold,
             )
-            self._thermal_intervals_by_tsens[tsens].append(end_interval)
+            thermal_intervals_by_tsens[tsens].append(end_interval)
 
+        self._thermal_intervals_by_tsens = build_lists(thermal_intervals_by_tsens,
+                                                       cls=IntervalList)
         return self._thermal_intervals_by_tsens
 
     def _parse_thermal_events(self):
         """Parse thermal intervals"""
-        self._thermal_events_by_tsens = defaultdict(EventList)
-
-        def thermal_events_gen():
-            filter_func = lambda event: event.tracepoint in ['tsens_read', 'tsens_threshold_hit', 'tsens_threshold_clear']
-            for event in filter(filter_func, self._events):
-                yield event
-
-        for event in thermal_events_gen():
-            self._thermal_events_by_tsens[event.data.sensor].append(event)
\ No newline at end of file
+        thermal_events = self._trace.events_for(['tsens_read', 'tsens_threshold_hit',
+                                                 'tsens_threshold_clear'])
+        self._thermal_events_by_tsens = group_by(thermal_events,
+                                                 key=lambda event: event.data.sensor)
\ No newline at end of file
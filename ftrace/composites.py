@@ -19,6 +19,7 @@
 #       Chuk Orakwue <chuk.orakwue@huawei.com>
 
 import heapq
+from collections import defaultdict
 from .event import EventList
 from .interval import IntervalList
 from .common import FtraceError
@@ -38,4 +39,24 @@ def sorted_items(iterables):
     sorted_iterable = heapq.merge(*(_decorate_items(s) for s in iterables))
 
     for _, item in sorted_iterable:
-        yield item
\ No newline at end of file
+        yield item
+
+def group_by(iterable, key, cls=EventList, presorted=True):
+    """
+    Returns defaultdict of `cls` (EventList or IntervalList) with items
+    in iterable grouped by `key(item)`. Lists are bulk-constructed.
+    """
+    items_by_key = defaultdict(list)
+    for item in iterable:
+        items_by_key[key(item)].append(item)
+    return build_lists(items_by_key, cls=cls, presorted=presorted)
+
+def build_lists(items_by_key, cls=EventList, presorted=False):
+    """
+    Returns defaultdict of `cls` (EventList or IntervalList) bulk-constructed
+    from dict of lists in `items_by_key`.
+    """
+    rv = defaultdict(cls)
+    for key, items in items_by_key.iteritems():
+        rv[key] = cls.from_iterable(items, presorted=presorted)
+    return rv
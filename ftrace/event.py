@@ -20,18 +20,25 @@
 
 """
     Event: Each event written to trace buffer.
+    LazyData: Event payload, parsed on first access.
     EventList: List with events with timestamps, sorted/sliceable by interval.
+    EventListView: EventList of (contiguous) events of parent list, sharing
+                   its timestamps.
 """
-from .interval import Interval
-from collections import namedtuple
-from bisect import bisect_left, bisect
+import sys
+from .interval import Interval, _ListView, _detach_views
+from .parsers import parse, bulk_parse
+from collections import namedtuple, defaultdict
+from itertools import islice, izip
+from operator import attrgetter
+from bisect import bisect_left, bisect_right, bisect
 
 Eventbase = namedtuple("Event",
     [
     'task',
     'cpu', # CPU id which the process was running on.
-    'raw_timestamp',
-    'timestamp', # Timestamp
+    'raw_timestamp_ns', # Timestamp (integer ns) as in trace
+    'timestamp', # Timestamp (seconds) since start of trace
     'irqs_off', # IRQs enable/disabled flag, 'd' interrupts are disabled. '.' otherwise.
     'need_resched', # task needs resched flag. 'N' task is set, '.' otherwise.
     'irq_type', # IRQ type (hard or soft)
@@ -49,16 +56,22 @@ class Event(Eventbase):
 
     __slots__ = ()
 
-    def __new__(cls, task, cpu, timestamp, raw_timestamp, irqs_off, need_resched,
-        irq_type, preempt_depth, tracepoint, data, **kwargs):
+    def __new__(cls, task, cpu, timestamp, raw_timestamp_ns=None, irqs_off=None,
+        need_resched=None, irq_type=None, preempt_depth=None, tracepoint=None,
+        data=None, **kwargs):
+            # raw timestamp was (float) seconds, callers may still pass that
+            raw_timestamp = kwargs.get('raw_timestamp')
+            if raw_timestamp_ns is None and raw_timestamp is None:
+                raise TypeError('Event needs raw_timestamp_ns (or raw_timestamp)')
+            if raw_timestamp_ns is None or isinstance(raw_timestamp_ns, float):
+                seconds = raw_timestamp if raw_timestamp_ns is None else raw_timestamp_ns
+                raw_timestamp_ns = int(round(seconds * 1e9))
             cpu = int(cpu)
-            raw_timestamp = float(raw_timestamp)
-            timestamp = float(timestamp)
             return super(Event, cls).__new__(
                 cls, task=task,
                 cpu=cpu,
                 timestamp=timestamp,
-                raw_timestamp=raw_timestamp,
+                raw_timestamp_ns=raw_timestamp_ns,
                 irqs_off=irqs_off,
                 need_resched=need_resched,
                 irq_type=irq_type,
@@ -67,25 +80,138 @@ class Event(Eventbase):
                 data=data,
             )
 
+    def __getnewargs__(self):
+        # Pickle (e.g. from worker processes) in `__new__` argument order.
+        return (self.task, self.cpu, self.timestamp, self.raw_timestamp_ns,
+                self.irqs_off, self.need_resched, self.irq_type,
+                self.preempt_depth, self.tracepoint, self.data)
+
+    @property
+    def raw_timestamp(self):
+        """Timestamp (seconds) as in trace"""
+        return self.raw_timestamp_ns / 1e9
+
     def __repr__(self):
         return "Event(task={}, cpu={}, timestamp={:.4}, data={}".format(
         self.task, self.cpu, self.timestamp, self.data,
         )
 
 
+class LazyData(object):
+    """
+    Raw payload of event, parsed with registered parser for tracepoint
+    on first access (of any attribute) and cached thereafter. Failures to
+    parse are recorded to `errors` (e.g. `Ftrace.parse_errors`), if given.
+    """
+    __slots__ = ('tracepoint', '_errors', '_payload', '_data')
+
+    def __init__(self, tracepoint, payload, errors=None):
+        self.tracepoint = tracepoint
+        self._errors = errors
+        self._payload = payload
+        self._data = None
+
+    def __getstate__(self):
+        # errors aren't pickled, owner (e.g. trace) re-attaches its own.
+        return (self.tracepoint, self._payload, self._data)
+
+    def __setstate__(self, state):
+        self.tracepoint, self._payload, self._data = state
+        self._errors = None
+
+    @property
+    def decoded(self):
+        """True if payload has been parsed"""
+        return self._data is not None
+
+    @property
+    def data(self):
+        """Parsed payload (or raw payload, if it can't be parsed)"""
+        if self._data is None:
+            self._set_data(parse(self.tracepoint, self._payload, self._errors))
+        return self._data
+
+    def _set_data(self, data):
+        self._data, self._payload = data, None # drop raw payload
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.data, name)
+
+    def __repr__(self):
+        return repr(self.data)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyData):
+            other = other.data
+        return self.data == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+
+def decode(events):
+    """
+    Parse lazy payloads (see `LazyData`) of events in bulk, per tracepoint.
+    Useful prior to consuming all events for tracepoint(s) at once.
+    """
+    decode_data(event.data for event in events)
+    return events
+
+def decode_data(datas):
+    """
+    Parse lazy payloads (see `LazyData`) in bulk, per tracepoint.
+    Payloads that are already parsed (or aren't lazy) are ignored.
+    """
+    pending_by_tracepoint = defaultdict(list)
+    for data in datas:
+        if isinstance(data, LazyData) and not data.decoded:
+            pending_by_tracepoint[(data.tracepoint, data._errors)].append(data)
+    for (tracepoint, errors), pending in pending_by_tracepoint.iteritems():
+        parsed = bulk_parse(tracepoint, [pending_data._payload for pending_data in pending],
+                            errors)
+        for data, parsed_data in izip(pending, parsed):
+            data._set_data(parsed_data)
+
+
 class EventList(list):
     """
     List with objects with timestamps, sorted and sliceable by interval.
     """
-    def __init__(self, iterable=None):
+    def __init__(self, iterable=None, presorted=False):
         self._timestamps = []
         if iterable:
-            for item in iterable:
-                self.append(item)
+            self.__extend(iterable, presorted=presorted)
+
+    @classmethod
+    def from_iterable(cls, iterable, presorted=False):
+        """
+        Bulk-construct list from iterable of objects with timestamps.
+        If `presorted`, items are assumed to be in timestamp order,
+        otherwise they are sorted (once) if found out of order.
+        """
+        return cls(iterable, presorted=presorted)
 
     def __repr__(self):
         return '\n'.join([item.__repr__() for item in self])
 
+    def __sizeof__(self):
+        # timestamps (references to items' timestamps)
+        return super(EventList, self).__sizeof__() + sys.getsizeof(self._timestamps)
+
     @property
     def start(self):
         """First timestamp in list"""
@@ -109,11 +235,37 @@ class EventList(list):
         """Duration of events in seconds"""
         return self.interval.duration if self.interval else None
 
+    def __extend(self, iterable, presorted=False):
+        """Extend (empty) list with items, sorting once if required."""
+        items = list(iterable)
+        try:
+            timestamps = [item.timestamp for item in items]
+        except AttributeError:
+            raise TypeError("Must have timestamp attribute")
+        if not presorted and any(ts_a > ts_b for ts_a, ts_b in
+                                 izip(timestamps, islice(timestamps, 1, None))):
+            items.sort(key=attrgetter('timestamp')) # stable, as with bisect
+            timestamps.sort()
+        super(EventList, self).extend(items)
+        self._timestamps.extend(timestamps)
+
+    def extend(self, iterable):
+        """Extend list with objects (with timestamps), kept sorted"""
+        items = list(iterable)
+        if self._timestamps and items and \
+            min(item.timestamp for item in items) < self._timestamps[-1]:
+            for item in items:
+                self.append(item)
+        else:
+            self.__extend(items)
+
     def __add_timestamp(self, obj):
         """Insert (sorted) object with timestamp attribute to timestamps list.
         """
         ts = obj.timestamp
         idx = bisect(self._timestamps, ts)
+        if idx < len(self._timestamps):
+            _detach_views(self)
         self._timestamps.insert(idx, ts) # insert items sorted
         return idx
 
@@ -123,7 +275,23 @@ class EventList(list):
             obj.timestamp
         except AttributeError:
             raise TypeError("Must have timestamp attribute")
-        super(self.__class__, self).insert(self.__add_timestamp(obj), obj)
+        super(EventList, self).insert(self.__add_timestamp(obj), obj)
+
+    def evict(self, timestamp, keep_current=False, keep=()):
+        """
+        Drop objects with timestamps before `timestamp` (e.g. older than
+        rolling window). If `keep_current`, last of these (i.e. state in
+        effect at timestamp) is kept, as are those at (sorted) indices `keep`.
+        """
+        idx = bisect_left(self._timestamps, timestamp)
+        if keep_current:
+            idx = max(idx - 1, 0)
+        keep = [i for i in keep if i < idx]
+        if idx == len(keep):
+            return # nothing (else) before timestamp
+        _detach_views(self)
+        self[:idx] = [self[i] for i in keep]
+        self._timestamps[:idx] = [self._timestamps[i] for i in keep]
 
     def slice(self, interval, closed=None):
         """
@@ -154,15 +322,26 @@ class EventList(list):
         else:
             raise ValueError("Closed has to be either 'left', 'right' or None")
 
-        idx_left = bisect_left(self._timestamps, start)
-        idx_right = bisect(self._timestamps, end)
-
-        if start in self._timestamps and not left_closed:
-            idx_left = idx_left + 1
-        if end in self._timestamps and not right_closed:
-            idx_right = idx_right - 1
+        # open ends exclude (all) objects at start/end timestamp
+        idx_left = (bisect_left if left_closed else bisect_right)(self._timestamps, start)
+        idx_right = (bisect_right if right_closed else bisect_left)(self._timestamps, end)
 
         left_adjust = idx_left < len(self)
 
-        return EventList(self[idx_left:idx_right]) if left_adjust else EventList()
+        return EventListView(self, idx_left, max(idx_left, idx_right)) \
+            if left_adjust else EventList()
+
+
+class EventListView(_ListView, EventList):
+    """
+    EventList of events `start` to `stop` of (parent) EventList, sharing
+    its timestamps (see `EventList.slice`).
+    """
+    base = EventList
+
+    @property
+    def _timestamps(self):
+        return self._shared(self._root._timestamps)
 
+    def _copy_arrays(self):
+        return dict(_timestamps=list(self._timestamps))
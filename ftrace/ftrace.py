@@ -22,6 +22,14 @@ import os
 import sys
 import re
 import abc
+import mmap
+import heapq
+from bisect import bisect_left
+from importlib import import_module
+from itertools import islice, izip
+from collections import defaultdict
+from contextlib import contextmanager
+from multiprocessing import Pool, cpu_count
 from six import with_metaclass
 
 try:
@@ -31,13 +39,28 @@ except ImportError:
     logging.basicConfig()
     from logging import getLogger as Logger
 
-from .parsers import PARSERS
-from .task import Task
-from .event import Event, EventList
+from .parsers import PARSERS, PARSER_VERSION, parse
+from .components import API_MODULES
+from .utils.cache import LRUCache, DiskCache
+from .utils.compression import (
+    compression,
+    strip_compression,
+    zip_member,
+    read_blocks,
+    prefetch,
+    gzip_member_ranges,
+    decompress_members,
+)
+from .version import VERSION
+from .systrace import TraceData, TraceDataReader, find_sections
+from .task import TaskTable
+from .interval import Interval
+from .event import Event, EventList, LazyData
 from .common import (
     ConstantBase,
+    FtraceError,
     is_list_like,
-    ParserError,
+    ParseErrors,
 )
 
 __all__ = ['Ftrace']
@@ -48,6 +71,7 @@ class Filetype(ConstantBase):
     UNKNOWN = ()
     FTRACE = ()
     SYSTRACE = ()
+    TRACE_CMD = ()
 
 #------------------------------------------------------------------------------
 # FTraceComponent
@@ -56,19 +80,75 @@ class FTraceComponent(with_metaclass(abc.ABCMeta)):
     """Abstract Base Class for FTrace Components APIs"""
 
     _initialized = False
+    _cache = None
 
     def __repr__(self):
         return "{}".format(self.__class__.__name__)
 
+    @property
+    def cache(self):
+        """LRU cache of results for this component (see `cached`)"""
+        if self._cache is None:
+            self._cache = LRUCache(max_entries=self._trace.cache_max_entries,
+                                   max_bytes=self._trace.cache_max_bytes)
+        return self._cache
+
     def _initialize(self):
         raise NotImplementedError
 
+    def _update(self, events):
+        """
+        Consume `events` newly appended to trace (in trace order), once
+        initialized. Components that keep their parse state override this
+        to update their intervals in place, by default component is reset
+        (dropping intervals derived so far) and rebuilt on next access.
+        """
+        trace, cache = self._trace, self._cache
+        self.__dict__.clear()
+        self.__init__(trace)
+        self._cache = cache
+
+    def _evict(self, timestamp):
+        """
+        Drop intervals before `timestamp` (see `Ftrace.window`), keeping
+        state in effect at timestamp. Components rebuilt on update (see
+        `_update`) need do nothing: they're rebuilt from retained events,
+        which include last event before timestamp of each tracepoint by cpu
+        (or by e.g. clock, see `Ftrace._STATE_FIELDS`). So state set by one
+        event (e.g. frequency) is kept, but not state built up from several
+        (e.g. nested slices), hence components that update in place are
+        initialized before events are evicted (see `Ftrace._WINDOW_APIS`).
+        """
+        pass
+
 #------------------------------------------------------------------------------
 # FTrace
 
 class Ftrace(object):
 
     _APIS = {}
+    _API_DEPENDENCIES = {}
+    # Components initialized before events are evicted from window, see `_evict`
+    _WINDOW_APIS = ('cpu', 'android', 'gpu')
+    # Payload field identifying what tracepoint sets state of (by cpu otherwise),
+    # last event of each is kept when evicting, see `_evict`.
+    _STATE_FIELDS = {
+        'cpu_frequency': 'cpu_id',
+        'cpu_frequency_switch_end': 'cpu_id',
+        'cpu_idle': 'cpu_id',
+        'clock_set_rate': 'clk',
+        'clock_enable': 'clk',
+        'clock_disable': 'clk',
+        'bus_update_request': 'name',
+        'cluster_enter': 'name',
+        'cluster_exit': 'name',
+        'tsens_read': 'sensor',
+        'tsens_threshold_hit': 'sensor',
+        'tsens_threshold_clear': 'sensor',
+        'kgsl_buslevel': 'd_name',
+        'kgsl_pwr_set_state': 'd_name',
+        'kgsl_pwrlevel': 'd_name',
+    }
     _TRACER_PATTERN = re.compile(r"""#\s+tracer:\s+(?P<tracer>.+)""")
     _BUFFER_PATTERN = re.compile(
         r"""
@@ -101,28 +181,94 @@ class Ftrace(object):
         re.X|re.M
     )
 
-    def __init__(self, filepath, tracepoints=None):
+    # Tracepoints whose payloads are needed at parse time (never lazy).
+    _EAGER_TRACEPOINTS = frozenset(['bus_update_request'])
+
+    # Smallest byte range handed to a worker process.
+    _MIN_CHUNK_SIZE = 1 << 22 # 4MB
+    # Smallest (gzip) byte range handed to a worker process.
+    _MIN_COMPRESSED_CHUNK_SIZE = 1 << 19 # 512KB
+    # Bytes of (memory-mapped) file split into lines at a time.
+    _BLOCK_SIZE = 1 << 24 # 16MB
+    # Bytes at start of file to check file type of (see `_sniff_filetype`).
+    _SNIFF_SIZE = 1 << 10 # 1KB
+
+    def __init__(self, filepath, tracepoints=None, workers=None,
+                 cache_max_entries=512, cache_max_bytes=None, lazy=False,
+                 columnar=False, cache_dir=None, cache_dir_max_bytes=None,
+                 follow=False, window=None):
         """
         Parser for ftrace output.
 
         Params:
         -------
         filepath : str
-            Path of file to parse
+            Path of file to parse: ftrace text (.txt), systrace (.html)
+            or trace-cmd (.dat) file. Text files can be compressed (.gz,
+            .bz2, .xz or .zip), these are decompressed as parsed.
         tracepoints : str or list-like (optional)
             List of tracepoints to parse - nothing more!
+        workers : int (optional)
+            Number of processes to parse file with. If > 1, file is split
+            into byte ranges (aligned to line boundaries) parsed in parallel.
+            Multi-member gzip files are split on member boundaries (and
+            decompressed in parallel), other compressed files aren't split.
+            At most one process per CPU is used: workers only pay off with
+            2+ (idle) CPUs, as events are pickled back to the parent.
+        cache_max_entries : int (optional)
+            Max. number of results cached per component (None for unbounded).
+        cache_max_bytes : int (optional)
+            Max. (approximate) size of results cached per component in bytes
+            (None for unbounded). Least recently used results are evicted.
+        lazy : bool (optional)
+            If True, payloads (`event.data`) are parsed on first access,
+            rather than for every event upfront (see `LazyData`).
+        columnar : bool (optional)
+            If True, events are stored column-wise in typed arrays (see
+            `EventStore`) and `events` is a read-only `ColumnarEventList`.
+        cache_dir : str (optional)
+            Directory to cache parsed events in. Entries are keyed by file
+            fingerprint (path, size, mtime, hash of head & tail), tracepoints
+            and parser version, so unchanged files are only parsed once.
+        cache_dir_max_bytes : int (optional)
+            Max. size of `cache_dir` in bytes (None for unbounded).
+            Least recently used entries are evicted.
+        follow : bool (optional)
+            If True, file is expected to grow (e.g. `trace_pipe` written
+            to file): trailing partial line is left unparsed, header is
+            optional, and `refresh()` parses data appended since.
+        window : float (optional)
+            If set, only the last `window` seconds of events (and component
+            intervals) are kept, so memory stays flat however long a
+            followed trace grows (see `ftrace.live.LiveMetrics`).
         """
         self.filepath = filepath
+        self.workers = workers
+        self.cache_max_entries = cache_max_entries
+        self.cache_max_bytes = cache_max_bytes
+        self.lazy = lazy
+        self.columnar = columnar
+        self.cache_dir = cache_dir
+        self.cache_dir_max_bytes = cache_dir_max_bytes
+        self.follow = follow
+        self.window = window
 
         self._initial_tps = tracepoints if (is_list_like(tracepoints) or tracepoints is None) else [tracepoints]
+        self.compression = compression(filepath)
         self.filetype = self._check_filetype()
 
         self.duration = 0.0
         self._raw_start_timestamp = None
         self.events = None
+        self._rows_by_tracepoint = None
+        self._events_by_tracepoint = None
         self.interval = None
         self.tracepoints = set()
         self.seen_cpus = set()
+        self.tasks = TaskTable()
+        self.parse_errors = ParseErrors()
+        # end of (text) data parsed so far, for `refresh()`
+        self._parsed_offset = None
 
         # tracer metadata
         self.tracer = None
@@ -133,7 +279,8 @@ class Ftrace(object):
         success = self._parse_file()
         if success:
             self.interval = self.events.interval
-            self._initiate_apis()
+            if self.window is not None and len(self.events):
+                self._evict(self.events.end - self.window)
 
     def __repr__(self):
         return "Trace(filepath={}, tracer={}, lost_entries={})".format(
@@ -154,44 +301,422 @@ class Ftrace(object):
         """
         return self.entries_written - self.entries_in
 
+    def clear_caches(self):
+        """
+        Drop results cached by all apis.
+        """
+        for api in self.apis.itervalues():
+            if api._cache is not None:
+                api._cache.clear()
+
+    def cache_info(self):
+        """
+        Returns dict of CacheInfo (hits, misses, evictions etc.) by api name.
+        """
+        return {name: api.cache.info for name, api in self.apis.iteritems()}
+
+    @property
+    def apis(self):
+        """
+        Returns dict of apis instantiated (on first access) so far, by name.
+        """
+        return {name: self.__dict__[name] for name in self._APIS
+                if name in self.__dict__}
+
     def _parse_file(self):
         """
         Parse input file (lazily), return True if successful, False otherwise.
         """
         try:
-            self.events = EventList(self._parse_lines())
+            # key of file as parsed, in case it changes while being parsed
+            cache_key = self._cache_key() if self.cache_dir else None
+            if cache_key is not None and self._load_cached(cache_key):
+                return True
+            if self.filetype is Filetype.TRACE_CMD:
+                if self.compression:
+                    raise FtraceError('Compressed trace.dat files not supported')
+                events = self._parse_dat()
+            elif self._num_workers > 1 and \
+                (self.compression is None or (self.compression == 'gzip' and
+                                              self.filetype is not Filetype.SYSTRACE)):
+                events = self._parse_chunks()
+            else:
+                events = self._parse_lines()
+            if self.columnar:
+                from .store import EventStore, ColumnarEventList # needs numpy
+                self.events = ColumnarEventList(EventStore.from_events(events))
+            else:
+                self.events = EventList.from_iterable(events)
+            if self.parse_errors:
+                log.warn("{num} payloads failed to parse, see `parse_errors`: {errors}".format(
+                    num=len(self.parse_errors), errors=self.parse_errors))
+            if cache_key is not None:
+                self._save_cached(cache_key)
             return True
         except Exception, e:
             log.exception(e)
             return False
 
-    def _parse_lines(self):
+    def _index_tracepoints(self):
+        """
+        Index (rows of) events by tracepoint, in a single pass.
+        """
+        if self.columnar:
+            self._rows_by_tracepoint = defaultdict(list, self.events.store.rows_by_tracepoint())
+            return
+        self._rows_by_tracepoint = defaultdict(list)
+        for row, event in enumerate(self.events):
+            self._rows_by_tracepoint[event.tracepoint].append(row)
+
+    @property
+    def events_by_tracepoint(self):
+        """
+        Returns dict of EventList keyed by tracepoint.
+        """
+        if self._events_by_tracepoint is None:
+            if self._rows_by_tracepoint is None:
+                self._index_tracepoints()
+            self._events_by_tracepoint = defaultdict(EventList)
+            for tracepoint, rows in self._rows_by_tracepoint.iteritems():
+                self._events_by_tracepoint[tracepoint] = EventList.from_iterable(
+                    (self.events[row] for row in rows), presorted=True)
+        return self._events_by_tracepoint
+
+    def events_for(self, tracepoints):
+        """
+        Generator that yields events for tracepoint(s), in trace order.
+        Only events for the tracepoint(s) are visited (see `events_by_tracepoint`).
+        """
+        tracepoints = tracepoints if is_list_like(tracepoints) else [tracepoints]
+        if self._rows_by_tracepoint is None:
+            self._index_tracepoints()
+        rows = [self._rows_by_tracepoint[tp] for tp in set(tracepoints)
+                if tp in self._rows_by_tracepoint]
+        for row in (rows[0] if len(rows) == 1 else heapq.merge(*rows)):
+            yield self.events[row]
+
+    @property
+    def _disk_cache(self):
+        return DiskCache(self.cache_dir, max_bytes=self.cache_dir_max_bytes)
+
+    def _cache_key(self):
+        tracepoints = sorted(self._initial_tps) if self._initial_tps is not None else None
+        return self._disk_cache.key(self.filepath, tracepoints, self.follow, VERSION,
+                                    PARSER_VERSION, PARSERS.tracepoints())
+
+    def _load_cached(self, key):
+        """
+        Load parsed events (cached under `key`) from `cache_dir`,
+        return True if found.
+        """
+        try:
+            state = self._disk_cache.get(key)
+        except KeyError:
+            return False
+        log.info("Loaded {filename} from cache.".format(filename=self.filename))
+        from .store import ColumnarEventList # needs numpy
+        store = state.pop('store')
+        for attr, value in state.iteritems():
+            setattr(self, attr, value)
+        self.events = ColumnarEventList(store)
+        if not self.columnar:
+            self.events = EventList.from_iterable(self.events, presorted=True)
+        return True
+
+    def _save_cached(self, key):
+        """
+        Save parsed events (as `EventStore`) to `cache_dir` under `key`,
+        unless file changed since (key was computed).
+        """
+        if self._cache_key() != key:
+            log.warn("{filename} changed while parsed, not cached.".format(
+                filename=self.filename))
+            return
+        from .store import EventStore # needs numpy
+        store = self.events.store if self.columnar else EventStore.from_events(self.events)
+        state = dict(store=store)
+        for attr in ('duration', '_raw_start_timestamp', 'tracepoints',
+                     'seen_cpus', 'tracer', 'entries_in', 'entries_written',
+                     'parse_errors', '_parsed_offset'):
+            state[attr] = getattr(self, attr)
+        try:
+            self._disk_cache.put(key, state)
+        except Exception, e:
+            log.warn("Failed to cache {filename}: {e}".format(filename=self.filename, e=e))
+
+    def invalidate_cache(self):
+        """Remove cached (parsed) entries for this file from `cache_dir`"""
+        if self.cache_dir:
+            self._disk_cache.invalidate(self.filepath)
+
+    def _parse_chunks(self):
+        """
+        Parse file in parallel (`workers` processes), yielding events
+        from each chunk in file order.
+        """
+        if self.compression:
+            ranges = self._member_ranges()
+            if len(ranges) < 2:
+                log.info("{filename} has single gzip member, parsing as stream.".format(
+                    filename=self.filename))
+                for event in self._parse_lines():
+                    yield event
+                return
+            lines = self._line_gen()
+        else:
+            with self._mmap() as buf:
+                start, end = 0, len(buf)
+                if self.filetype is Filetype.SYSTRACE:
+                    sections = [(compressed, section_start, section_end) for
+                                kind, compressed, section_start, section_end in find_sections(buf)
+                                if kind is TraceData.FTRACE]
+                    if len(sections) > 1 or any(compressed for compressed, _, _ in sections):
+                        log.info("{filename} has compressed/multiple ftrace sections, "
+                                 "parsing as stream.".format(filename=self.filename))
+                        for event in self._parse_lines():
+                            yield event
+                        return
+                    if sections:
+                        _, start, end = sections[0]
+                offset = self._start_offset(buf, start, end)
+                end = self._parse_end(buf, offset, end)
+            ranges = self._chunk_ranges(offset, end)
+            lines = self._range_line_gen(offset, end)
+        log.info("Parsing {filename} with {workers} workers.".format(
+            filename=self.filename, workers=self._num_workers))
+        # Needed upfront so all chunks are normalized alike.
+        for line in lines:
+            match = re.match(self._LINE_PATTERN, line)
+            if match:
+                self._raw_start_timestamp = _timestamp_ns(match.groupdict()['timestamp'])
+                break
+        lines.close()
+
+        pool = Pool(processes=self._num_workers)
+        try:
+            state = self._chunk_state()
+            chunks = ((state, start, end) for start, end in ranges)
+            # line split across chunks (of decompressed members)
+            partial_line = ''
+            for events, tracepoints, seen_cpus, duration, parse_errors, head, tail in \
+                pool.imap(_parse_chunk, chunks):
+                if tail is None: # no line ends in chunk
+                    partial_line += head
+                    continue
+                if (partial_line + head).strip():
+                    for event in self._parse_lines([(partial_line + head).strip()]):
+                        yield event
+                partial_line = tail
+                self.parse_errors.update(parse_errors)
+                self.tracepoints.update(tracepoints)
+                self.seen_cpus.update(seen_cpus)
+                self.duration = duration if duration is not None else self.duration
+                shared_tasks = {} # by id of (unpickled) task of chunk
+                for event in events:
+                    task = event.task
+                    shared = shared_tasks.get(id(task))
+                    if shared is None:
+                        shared = shared_tasks[id(task)] = self.tasks.add(task)
+                    if shared is not task:
+                        event = tuple.__new__(Event, (shared,) + event[1:])
+                    if type(event.data) is LazyData: # report to this trace
+                        event.data._errors = self.parse_errors
+                    yield event
+            if partial_line.strip():
+                for event in self._parse_lines([partial_line.strip()]):
+                    yield event
+            if not self.compression:
+                self._parsed_offset = end
+        finally:
+            pool.close()
+            pool.join()
+
+    @property
+    def _num_workers(self):
+        """Number of processes to parse file with (at most one per CPU)"""
+        return min(self.workers or 1, cpu_count())
+
+    def _chunk_state(self):
+        """
+        Returns (picklable) state needed to parse chunks of file in worker
+        processes (see `_chunk_parser`), rather than the whole trace.
+        """
+        return (self.filepath, self.compression, self._initial_tps,
+                self._raw_start_timestamp, self.lazy)
+
+    @classmethod
+    def _chunk_parser(cls, filepath, compression, tracepoints, raw_start_timestamp, lazy):
+        """
+        Returns (unparsed) trace with just the state to parse chunks of
+        file (see `_chunk_state`).
+        """
+        trace = cls.__new__(cls)
+        trace.filepath, trace.compression, trace.lazy = filepath, compression, lazy
+        trace.filedir, trace.filename = os.path.split(filepath)
+        trace._initial_tps = tracepoints
+        trace._raw_start_timestamp = raw_start_timestamp
+        trace.duration = None
+        trace.tracepoints, trace.seen_cpus = set(), set()
+        trace.tasks, trace.parse_errors = TaskTable(), ParseErrors()
+        trace.tracer, trace.entries_in, trace.entries_written = None, 0, 0
+        return trace
+
+    def _member_ranges(self):
+        """
+        Returns list of (start, end) byte ranges of gzip file, each of
+        whole members (see `gzip_member_ranges`).
+        """
+        with self._mmap() as buf:
+            chunk_size = max(len(buf) // (self._num_workers * 4), self._MIN_COMPRESSED_CHUNK_SIZE)
+            return gzip_member_ranges(buf, chunk_size)
+
+    def _member_lines(self, start, end):
+        """
+        Returns (head, lines, tail) of gzip members in [start, end) byte
+        range, where head and tail are partial lines at either end (to be
+        joined with those of adjacent ranges). Tail is None if no line ends
+        in range.
+        """
+        with self._mmap() as buf:
+            text = decompress_members(buf, start, end)
+        head = ''
+        if start == 0:
+            text = text[self._trace_offset(text):]
+        else:
+            idx = text.find('\n')
+            if idx == -1:
+                return text, [], None
+            head, text = text[:idx], text[idx + 1:]
+        idx = text.rfind('\n') + 1
+        text, tail = text[:idx], text[idx:]
+        return head, (line.strip() for line in text.splitlines()), tail
+
+    def _chunk_ranges(self, offset, size=None):
         """
-        Parse systrace lines in file.
+        Returns list of (start, end) byte ranges from `offset` to `size`
+        (end of file by default), with each boundary moved to start of next line.
+        """
+        with self._mmap() as buf:
+            size = len(buf) if size is None else size
+            chunk_size = max((size - offset) // (self._num_workers * 4), self._MIN_CHUNK_SIZE)
+            boundaries = [offset]
+            while boundaries[-1] + chunk_size < size:
+                idx = buf.find('\n', boundaries[-1] + chunk_size, size)
+                boundaries.append(size if idx == -1 else idx + 1)
+        boundaries.append(size)
+        return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+    @contextmanager
+    def _mmap(self):
+        """
+        Context manager for read-only memory map of file.
+        """
+        with open(self.filepath, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                yield '' # can't mmap empty file.
+                return
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield buf
+            finally:
+                buf.close()
+
+    def _trace_offset(self, buf=None, start=0, end=None):
+        """
+        Returns byte offset of first trace line (after `TASK-PID` header),
+        parsing tracer metadata in header region. Only [start, end) bytes
+        of buffer are searched, if specified.
+        """
+        if buf is None:
+            with self._mmap() as buf:
+                return self._trace_offset(buf, start, end)
+
+        end = len(buf) if end is None else end
+        idx = buf.find('TASK-PID', start, end)
+        if idx == -1:
+            return end
+        header = buf[start:idx]
+        for line in header.splitlines():
+            if self.tracer is None and 'tracer:' in line:
+                self.tracer = self._check_tracer(line.strip())
+            if not (self.entries_in or self.entries_written) and \
+                'entries-in-buffer' in line:
+                self.entries_in, self.entries_written = \
+                    self._check_buffer_entries(line.strip())
+        # skip `TASK-PID` line and the line after.
+        for _ in range(2):
+            idx = buf.find('\n', idx, end)
+            if idx == -1:
+                return end
+            idx += 1
+        return idx
+
+    def _range_line_gen(self, start, end, buf=None):
+        """
+        Generator that yields ftrace lines in [start, end) byte range of file.
+        Memory-mapped file is split into lines a block at a time.
+        """
+        if buf is None:
+            with self._mmap() as buf:
+                for line in self._range_line_gen(start, end, buf=buf):
+                    yield line
+            return
+
+        pos = start
+        while pos < end:
+            stop = min(pos + self._BLOCK_SIZE, end)
+            if stop < end:
+                # end block on last newline (first, if line outgrows block)
+                idx = buf.rfind('\n', pos, stop)
+                if idx == -1:
+                    idx = buf.find('\n', stop, end)
+                stop = end if idx == -1 else idx + 1
+            for line in buf[pos:stop].splitlines():
+                yield line.strip()
+            pos = stop
+
+    def _parse_lines(self, lines=None):
+        """
+        Parse systrace lines in file (or `lines` if specified).
         """
         num_events = 0
+        event = None
+        skipped_timestamp = None
+        wanted_tps = None if self._initial_tps is None else set(self._initial_tps)
         log.info("Parsing {filename}.".format(filename=self.filename))
-        for line in self._line_gen():
+        for line in (self._line_gen() if lines is None else lines):
+            # Cheaply skip unwanted tracepoints (once normalization is known).
+            if wanted_tps is not None and self._raw_start_timestamp is not None:
+                tokens = _split_line(line)
+                if tokens is not None and tokens[2] not in wanted_tps:
+                    self.seen_cpus.add(int(tokens[0]))
+                    skipped_timestamp = tokens[1]
+                    continue
             match = re.match(self._LINE_PATTERN, line)
             if match:
+                skipped_timestamp = None
                 match_dict = match.groupdict()
-                match_dict['raw_timestamp'] = float(match_dict['timestamp'])
-                match_dict['timestamp'] = float(match_dict['timestamp'])
+                raw_timestamp = _timestamp_ns(match_dict['timestamp'])
                 if self._raw_start_timestamp is None:
-                    self._raw_start_timestamp = match_dict['raw_timestamp']
+                    self._raw_start_timestamp = raw_timestamp
+                match_dict['raw_timestamp_ns'] = raw_timestamp
                 # Normalize timestamp
-                match_dict['timestamp'] -= self._raw_start_timestamp
-                match_dict['task'] = Task(**match_dict)
+                match_dict['timestamp'] = (raw_timestamp - self._raw_start_timestamp) / 1e9
+                match_dict['task'] = self.tasks.get(match_dict['name'], match_dict['pid'],
+                                                    tgid=match_dict['tgid'])
 
-                parsed_data = self._parse_data(
-                    match_dict['tracepoint'],
-                    match_dict['data'],
-                )
+                tracepoint = match_dict['tracepoint']
+                if self.lazy and tracepoint in PARSERS and \
+                    tracepoint not in self._EAGER_TRACEPOINTS:
+                    parsed_data = LazyData(tracepoint, match_dict['data'], self.parse_errors)
+                else:
+                    parsed_data = self._parse_data(tracepoint, match_dict['data'])
                 match_dict['data']= parsed_data
                 event = Event(**match_dict)
                 # Special treatment, adjust timestamp
                 if event.tracepoint in ('bus_update_request'):
-                    event = event._replace(data=event.data._replace(timestamp=event.data.timestamp - self._raw_start_timestamp))
+                    event = event._replace(data=event.data._replace(timestamp=(
+                        int(round(event.data.timestamp * 1e9)) - self._raw_start_timestamp) / 1e9))
                     event = event._replace(timestamp=event.data.timestamp)
                 # add to seen cpus
                 self.seen_cpus.add(event.cpu)
@@ -203,48 +728,285 @@ class Ftrace(object):
                     sys.stdout.write('.')
                     
         # Properly calculate duration (even if _initial_tps is used)
-        self.duration = event.timestamp
+        if skipped_timestamp is not None:
+            self.duration = (_timestamp_ns(skipped_timestamp) - self._raw_start_timestamp) / 1e9
+        elif event is not None:
+            self.duration = event.timestamp
+
+    def _parse_dat(self):
+        """
+        Parse trace-cmd `trace.dat` file, decoding (binary) records as per
+        their format descriptors (see `TraceDat`).
+        """
+        from .tracedat import TraceDat, RecordFactory, common_flags, FTRACE_TRACEPOINTS
+        log.info("Parsing {filename}.".format(filename=self.filename))
+        dat = TraceDat(self.filepath)
+        self.entries_in, self.entries_written = dat.entries
+        self.seen_cpus.update(cpu for cpu, (_, size) in enumerate(dat.cpu_data) if size)
+        tracepoints = dict((event_format.id,
+                            FTRACE_TRACEPOINTS.get(event_format.name, event_format.name)
+                            if event_format.system == 'ftrace' else event_format.name)
+                           for event_format in dat.formats.itervalues())
+        ids = None if self._initial_tps is None else \
+            set(id_ for id_, tp in tracepoints.iteritems() if tp in self._initial_tps)
+        record_factory = RecordFactory()
+        tasks = {}
+        for timestamp, cpu, event_format, record in dat.records(ids):
+            if self._raw_start_timestamp is None:
+                self._raw_start_timestamp = dat.first_timestamp
+            tracepoint = tracepoints[event_format.id]
+            try:
+                values = event_format.decode(record)
+                if tracepoint in PARSERS and event_format.system == 'ftrace':
+                    data = self._parse_data(tracepoint, values['buf'].rstrip('\n'))
+                else:
+                    data = record_factory(event_format, values)
+            except Exception, e:
+                self.parse_errors.add(tracepoint, repr(record), e)
+                continue
+            pid = values['common_pid']
+            try:
+                task = tasks[pid]
+            except KeyError:
+                name = dat.cmdlines.get(pid, '<idle>' if pid == 0 else '<...>')
+                task = tasks[pid] = self.tasks.get(name, pid)
+            yield tuple.__new__(Event, (task, cpu, timestamp,
+                                        (timestamp - self._raw_start_timestamp) / 1e9) +
+                                common_flags(values['common_flags'],
+                                             values['common_preempt_count']) +
+                                (tracepoint, data))
+            self.tracepoints.add(tracepoint)
+        if dat.last_timestamp is not None:
+            self.duration = (dat.last_timestamp - dat.first_timestamp) / 1e9
 
     def _line_gen(self):
         """
         Generator that yields ftrace lines in file.
         """
-        yield_trace = False
-        with open(self.filepath, 'rU') as f:
-            num_lines = os.fstat(f.fileno()).st_size
-            while True:
-                line = f.readline().strip()
-                if self.filetype is Filetype.SYSTRACE:
-                    line = line.rstrip() # line[:-3]
-                if self.tracer is None and 'tracer:' in line:
-                    self.tracer = self._check_tracer(line)
-                if not (self.entries_in or self.entries_written) and \
-                    'entries-in-buffer' in line:
-                    self.entries_in, self.entries_written = \
-                        self._check_buffer_entries(line)
-                if not yield_trace and 'TASK-PID' in line:
-                    yield_trace = True
-                    _ = f.readline()
-                    continue
-                if yield_trace:
-                    yield line
-                if not line and f.tell() == num_lines:
-                    break
+        if self.filetype is Filetype.SYSTRACE:
+            blocks = self._systrace_blocks()
+        elif self.compression:
+            blocks = self._blocks()
+        else:
+            blocks = None
+        if blocks is not None:
+            for line in self._stream_line_gen(blocks):
+                yield line
+            return
+        with self._mmap() as buf:
+            offset = self._start_offset(buf)
+            end = self._parse_end(buf, offset)
+            for line in self._range_line_gen(offset, end, buf=buf):
+                yield line
+            self._parsed_offset = end
 
-    def _parse_data(self, tracepoint, data):
+    def _start_offset(self, buf, start=0, end=None):
         """
-        Parse payload(data) for tracepoint - if we have it.
+        Returns byte offset of first trace line (see `_trace_offset`).
+        Followed files may have no header (e.g. from `trace_pipe`).
+        """
+        end = len(buf) if end is None else end
+        offset = self._trace_offset(buf, start, end)
+        if self.follow and buf.find('TASK-PID', start, end) == -1:
+            return start
+        return offset
+
+    def _parse_end(self, buf, start=0, end=None):
+        """
+        Returns byte offset to parse (text) file to: end, or end of last
+        complete line for followed files.
+        """
+        end = len(buf) if end is None else end
+        if not self.follow:
+            return end
+        return max(buf.rfind('\n', start, end) + 1, start)
+
+    def refresh(self):
+        """
+        Parse data appended to (uncompressed text) file since it was last
+        parsed, extending `events`, `duration` etc. Components consume just
+        the new events where they can, otherwise they're rebuilt on next access.
+        Returns number of new events.
+        """
+        if self.compression or self.filetype in (Filetype.SYSTRACE, Filetype.TRACE_CMD):
+            raise FtraceError('Only uncompressed ftrace text files can be refreshed')
+        with self._mmap() as buf:
+            if self._parsed_offset is None:
+                offset = self._start_offset(buf)
+            else:
+                offset = self._parsed_offset
+            end = self._parse_end(buf, offset)
+            if end <= offset:
+                return 0
+            events = list(self._parse_lines(self._range_line_gen(offset, end, buf=buf)))
+        self._parsed_offset = end
+        if events:
+            self._extend_events(events)
+        return len(events)
+
+    def _extend_events(self, events):
+        """
+        Extend `events` (and indexes) with newly parsed events, and update
+        components (see `FTraceComponent._update`).
+        """
+        num_events = len(self.events) if self.events is not None else 0
+        in_order = (not num_events or self.events.end <= events[0].timestamp) and \
+            all(event_a.timestamp <= event_b.timestamp for event_a, event_b in
+                izip(events, islice(events, 1, None)))
+        appended = in_order
+        if self.events is None:
+            self.events = EventList()
+        if self.columnar:
+            from .store import EventStore, ColumnarEventList # needs numpy
+            if in_order and num_events:
+                store = self.events.store
+                store.append(events) # in place, rows so far unchanged
+            else:
+                store = EventStore.from_events(list(self.events) + events)
+                in_order = False # re-index from store
+            self.events = ColumnarEventList(store)
+        else:
+            self.events.extend(events)
+
+        if not in_order:
+            self._rows_by_tracepoint = self._events_by_tracepoint = None
+        else:
+            if self._rows_by_tracepoint is not None:
+                for row, event in enumerate(events, num_events):
+                    self._rows_by_tracepoint[event.tracepoint].append(row)
+            if self._events_by_tracepoint is not None:
+                for event in events:
+                    self._events_by_tracepoint[event.tracepoint].append(event)
+        if self.window is None or self.interval is None:
+            self.interval = self.events.interval
+        else: # events before window are evicted, trace interval is kept
+            self.interval = Interval(min(self.interval.start, self.events.start),
+                                     self.events.end)
+
+        for api in self.apis.itervalues():
+            api._events = self.events
+            if api._cache is not None:
+                api._cache.clear()
+            if not appended:
+                api._initialized = False
+            elif api._initialized:
+                api._update(events)
+
+        if self.window is not None:
+            self._evict(self.events.end - self.window)
+
+    def _current_indices(self, events, timestamp):
+        """
+        Returns (sorted) indices of last event before `timestamp` of each
+        tracepoint by cpu, or by payload field (see `_STATE_FIELDS`).
+        """
+        indices = {}
+        for idx in xrange(bisect_left(events._timestamps, timestamp)):
+            event = events[idx]
+            field = self._STATE_FIELDS.get(event.tracepoint)
+            if field is not None and hasattr(event.data, field):
+                indices[event.tracepoint, getattr(event.data, field)] = idx
+            else:
+                indices[event.tracepoint, event.cpu] = idx
+        return sorted(indices.itervalues())
+
+    def _evict(self, timestamp):
+        """
+        Drop events (and component intervals) before `timestamp`, see
+        `window`, but for last of each tracepoint (see `_current_indices`).
+        Components that update in place (see `_WINDOW_APIS`) are initialized
+        first, so they keep state in effect at timestamp.
+        """
+        if not len(self.events) or self.events.start >= timestamp:
+            return
+        for name in self._WINDOW_APIS:
+            getattr(self, name)
+        for api in self.apis.itervalues():
+            updates = type(api)._update.im_func is not FTraceComponent._update.im_func
+            if updates and not api._initialized:
+                api._initialize()
+                api._initialized = True
+
+        if self.columnar:
+            from .store import ColumnarEventList # needs numpy
+            idx = bisect_left(self.events._timestamps, timestamp)
+            keep = self.events.store.current_rows(idx, self._STATE_FIELDS)
+            if idx > len(keep): # not just events kept so far
+                self.events = ColumnarEventList(self.events.store.truncate(idx, keep))
+                self._rows_by_tracepoint = None # rows moved
+        else:
+            self.events.evict(timestamp, keep=self._current_indices(self.events, timestamp))
+            self._rows_by_tracepoint = None # rows moved
+        if self._events_by_tracepoint is not None:
+            for events in self._events_by_tracepoint.itervalues():
+                events.evict(timestamp, keep=self._current_indices(events, timestamp))
+
+        for api in self.apis.itervalues():
+            api._events = self.events
+            if api._initialized:
+                api._evict(timestamp)
+
+    def _blocks(self):
+        """
+        Generator that yields blocks of file. Compressed files are
+        decompressed a block at a time in worker thread (overlapping parsing).
+        """
+        if self.compression:
+            blocks = prefetch(read_blocks(self.filepath, self._BLOCK_SIZE))
+            try:
+                for block in blocks:
+                    yield block
+            finally:
+                blocks.close()
+            return
+        with self._mmap() as buf:
+            for pos in xrange(0, len(buf), self._BLOCK_SIZE):
+                yield buf[pos:pos + self._BLOCK_SIZE]
+
+    def _systrace_blocks(self):
+        """
+        Generator that yields ftrace text (blocks) of systrace HTML, from
+        its trace-data sections (see `TraceDataReader`) or, for HTML
+        without these, all of it.
+        """
+        reader = TraceDataReader(self._blocks())
+        for block in reader:
+            yield block
+        if not reader.sections:
+            for block in self._blocks():
+                yield block
+
+    def _stream_line_gen(self, blocks):
+        """
+        Generator that yields ftrace lines in blocks (of text), skipping
+        header (see `_trace_offset`).
         """
-        rv = data
         try:
-            rv = PARSERS[tracepoint](data)
-        except Exception, e:
-            rv = PARSERS[tracepoint](data)
-        except ParserError, e:
-            log.exception(e)
-            log.warn('Error parsing {tp} with {data}'.format(tp=tracepoint, data=data))
+            pending, header_pos = '', 0
+            for block in blocks:
+                pending += block
+                if header_pos is not None:
+                    # header (up to `TASK-PID` line and the line after)
+                    idx = pending.find('TASK-PID', max(header_pos - 8, 0))
+                    if idx == -1 or pending.count('\n', idx) < 2:
+                        header_pos = len(pending)
+                        continue
+                    pending = pending[self._trace_offset(pending):]
+                    header_pos = None
+                idx = pending.rfind('\n') + 1
+                for line in pending[:idx].splitlines():
+                    yield line.strip()
+                pending = pending[idx:]
+            if header_pos is None and pending.strip():
+                yield pending.strip()
         finally:
-            return rv if rv else data
+            blocks.close()
+
+    def _parse_data(self, tracepoint, data):
+        """
+        Parse payload(data) for tracepoint - if we have it.
+        """
+        return parse(tracepoint, data, self.parse_errors)
 
     def _check_tracer(self, line):
         """
@@ -267,23 +1029,122 @@ class Ftrace(object):
 
     def _check_filetype(self):
         """
-        Return file type.
+        Return file type, by extension (of file within zip archives) or,
+        failing that, content.
         """
-        if self.filepath.endswith('.html'):
+        if self.compression == 'zip':
+            filepath = zip_member(self.filepath) or ''
+        else:
+            filepath = strip_compression(self.filepath)
+        filepath = filepath.lower()
+        if filepath.endswith(('.html', '.htm')):
             return Filetype.SYSTRACE
-        elif self.filepath.endswith('.txt'):
+        elif filepath.endswith('.txt'):
             return Filetype.FTRACE
+        elif filepath.endswith('.dat'):
+            return Filetype.TRACE_CMD
+        return self._sniff_filetype()
+
+    def _sniff_filetype(self):
+        """
+        Return file type from start of (decompressed) file.
+        """
+        from .tracedat import MAGIC
+        try:
+            if self.compression:
+                blocks = read_blocks(self.filepath, self._SNIFF_SIZE)
+                try:
+                    head = next(blocks, '')
+                finally:
+                    blocks.close()
+            else:
+                with open(self.filepath, 'rb') as f:
+                    head = f.read(self._SNIFF_SIZE)
+        except (IOError, EnvironmentError):
+            return Filetype.UNKNOWN
+        if head.startswith(MAGIC):
+            return Filetype.TRACE_CMD
+        head = head[:self._SNIFF_SIZE].lstrip().lower()
+        if head.startswith(('<!doctype html', '<html')):
+            return Filetype.SYSTRACE
         return Filetype.UNKNOWN
 
-    def _initiate_apis(self):
-        """Start initialized all registered apis after parsing events in file"""
-        for name, cls in self._APIS.iteritems():
-            setattr(self, name, cls(self))
+def _timestamp_ns(timestamp):
+    """
+    Returns integer nanoseconds of `<seconds>.<fraction>` timestamp string
+    (exact, unlike float seconds).
+    """
+    seconds, _, fraction = timestamp.partition('.')
+    return int(seconds) * 1000000000 + int((fraction + '00000000')[:9])
+
+def _split_line(line):
+    """
+    Returns (cpu, timestamp, tracepoint) string tokens of ftrace line
+    without running `_LINE_PATTERN`, or None if these aren't found.
+    Relies on tracepoint following timestamp i.e. `<timestamp>: <tracepoint>:`
+    """
+    idx = line.find(': ')
+    while idx != -1:
+        ts_idx = line.rfind(' ', 0, idx) + 1
+        timestamp = line[ts_idx:idx]
+        if timestamp.replace('.', '', 1).isdigit():
+            tp_idx = line.find(':', idx + 2)
+            cpu_idx = line.rfind('[', 0, ts_idx) + 1
+            cpu = line[cpu_idx:line.find(']', cpu_idx)]
+            if tp_idx == -1 or not cpu.isdigit():
+                return None
+            return cpu, timestamp, line[idx + 2:tp_idx]
+        idx = line.find(': ', idx + 2)
+    return None
 
-def register_api(name):
-    """Decorator for registering api methods"""
+def _parse_chunk(args):
+    """
+    Parse (state, start, end) byte range in worker process, where state
+    is as returned by `Ftrace._chunk_state`.
+    Returns tuple of (events, tracepoints, seen_cpus, duration, parse_errors,
+    head, tail), where head/tail are partial lines of gzip ranges (see
+    `Ftrace._member_lines`), empty otherwise.
+    """
+    state, start, end = args
+    trace = Ftrace._chunk_parser(*state)
+    if trace.compression:
+        head, lines, tail = trace._member_lines(start, end)
+    else:
+        head, lines, tail = '', trace._range_line_gen(start, end), ''
+    events = list(trace._parse_lines(lines))
+    return (events, trace.tracepoints, trace.seen_cpus, trace.duration,
+            trace.parse_errors, head, tail)
+
+class _ApiDescriptor(object):
+    """
+    Instantiates api (and apis it depends on) on first access
+    of `trace.<name>`, and caches it on trace.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, trace, owner):
+        if trace is None:
+            return self
+        if self.name not in owner._APIS:
+            import_module(API_MODULES[self.name], 'ftrace.components')
+        for dependency in owner._API_DEPENDENCIES[self.name]:
+            getattr(trace, dependency)
+        api = trace.__dict__[self.name] = owner._APIS[self.name](trace)
+        return api
+
+def register_api(name, depends_on=()):
+    """
+    Decorator for registering api methods. Api is instantiated on first
+    access of `trace.<name>`, along with apis it `depends_on` (by name).
+    """
     def wrapped(cls):
         Ftrace._APIS[name] = cls
+        Ftrace._API_DEPENDENCIES[name] = tuple(depends_on)
+        setattr(Ftrace, name, _ApiDescriptor(name))
         log.info("Registering {name} api to trace".format(name=name))
         return cls
     return wrapped
+
+for _name in API_MODULES:
+    setattr(Ftrace, _name, _ApiDescriptor(_name))
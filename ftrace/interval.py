@@ -20,9 +20,13 @@
 
 """ Interval:  Represents an interval of time defined by two timestamps.
     IntervalList: List with objects with interval, sorted/sliceable by interval.
+    IntervalListView: IntervalList of (contiguous) objects of parent list,
+                      sharing its intervals and index.
 """
-from bisect import bisect, insort
-from .common import memoize
+import sys
+from bisect import bisect, bisect_left, bisect_right, insort
+from itertools import islice, izip, imap
+from weakref import WeakValueDictionary
 
 class Interval(object):
     """
@@ -53,32 +57,70 @@ class Interval(object):
         """Returns float"""
         return self.end - self.start
 
-    @memoize
     def within(self, timestamp):
         """Returns true if timestamp falls within interval"""
         return True if (timestamp >= self.start) and \
             (timestamp <= self.end) else False
 
 
+class _SequenceView(object):
+    """
+    Read-only view of items `start` to `stop` of sequence (e.g. timestamps
+    of parent list, for bisect), without copying.
+    """
+    __slots__ = ('_seq', '_start', '_stop')
+
+    def __init__(self, seq, start, stop):
+        self._seq, self._start, self._stop = seq, start, stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __iter__(self):
+        return imap(self._seq.__getitem__, xrange(self._start, self._stop))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            return self._seq[self._start + start:self._start + stop:step]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('list index out of range')
+        return self._seq[self._start + key]
+
+
 class IntervalList(list):
     """
     List with objects with intervals, sorted and sliceable by interval.
     """
     
-    def __init__(self, iterable=None):
+    def __init__(self, iterable=None, presorted=False):
         self._intervals = []
         self._start_timestamps = []
         self._end_timestamps = []
+        self._containment = None
         if iterable:
-            for item in iterable:
-                if hasattr(item, 'interval'):
-                    self.append(item)
-                else:
-                    raise AttributeError('{} object has no attribute `interval`'.format(type(item)))
+            self.__extend(iterable, presorted=presorted)
+
+    @classmethod
+    def from_iterable(cls, iterable, presorted=False):
+        """
+        Bulk-construct list from iterable of objects with intervals.
+        If `presorted`, items are assumed to be in start timestamp order,
+        otherwise they are sorted (once) if found out of order.
+        """
+        return cls(iterable, presorted=presorted)
 
     def __repr__(self):
         return '\n'.join([item.__repr__() for item in self])
 
+    def __sizeof__(self):
+        # parallel arrays (of references to items' intervals/timestamps)
+        return super(IntervalList, self).__sizeof__() + sum(
+            sys.getsizeof(array) for array in
+            (self._intervals, self._start_timestamps, self._end_timestamps))
+
     @property
     def _start_times(self):
         return self._start_timestamps
@@ -92,13 +134,36 @@ class IntervalList(list):
         """Duration of events in seconds"""
         return sum(interval.duration for interval in self._intervals)
 
+    def __extend(self, iterable, presorted=False):
+        """Extend (empty) list with items, sorting once if required."""
+        items = list(iterable)
+        for item in items:
+            if not hasattr(item, 'interval'):
+                raise AttributeError('{} object has no attribute `interval`'.format(type(item)))
+        intervals = [item.interval for item in items]
+        starts = [interval.start for interval in intervals]
+        if not presorted and any(start_a > start_b for start_a, start_b in
+                                 izip(starts, islice(starts, 1, None))):
+            order = sorted(xrange(len(items)), key=starts.__getitem__) # stable
+            items = [items[idx] for idx in order]
+            intervals = [intervals[idx] for idx in order]
+            starts = [starts[idx] for idx in order]
+        super(IntervalList, self).extend(items)
+        self._intervals.extend(intervals)
+        self._start_timestamps.extend(starts)
+        self._end_timestamps.extend(sorted(interval.end for interval in intervals))
+        self._containment = None
+
     def __add_interval(self, obj):
         """Add interval to (sorted) intervals list"""
         start, end = obj.interval.start, obj.interval.end
         idx = bisect(self._start_timestamps, start)
+        if idx < len(self._start_timestamps):
+            _detach_views(self)
         insort(self._end_timestamps, end)
         self._start_timestamps.insert(idx, start) # insert into self based on start
         self._intervals.insert(idx, obj.interval)
+        self._containment = None
         return idx
 
     def append(self, obj):
@@ -107,12 +172,119 @@ class IntervalList(list):
             obj.interval
         except AttributeError:
             raise TypeError("Must have interval attribute")
-        super(self.__class__, self).insert(self.__add_interval(obj), obj)
+        super(IntervalList, self).insert(self.__add_interval(obj), obj)
+
+    def remove(self, obj):
+        """Remove (first occurrence of) object from list"""
+        start = obj.interval.start
+        idx = bisect_left(self._start_timestamps, start)
+        while idx < len(self) and self._start_timestamps[idx] == start:
+            if self[idx] == obj:
+                break
+            idx += 1
+        else:
+            raise ValueError('IntervalList.remove(x): x not in list')
+        _detach_views(self)
+        del self._end_timestamps[bisect_left(self._end_timestamps, obj.interval.end)]
+        del self._start_timestamps[idx]
+        del self._intervals[idx]
+        super(IntervalList, self).__delitem__(idx)
+        self._containment = None
+
+    def evict(self, timestamp):
+        """
+        Drop objects whose interval ends by `timestamp` (e.g. older than
+        rolling window). Objects overlapping timestamp are kept.
+        """
+        idx = bisect(self._start_timestamps, timestamp)
+        keep = [pos for pos in xrange(idx) if self._intervals[pos].end > timestamp]
+        if len(keep) == idx:
+            return
+        _detach_views(self)
+        items, intervals = list(self[:idx]), self._intervals[:idx]
+        del self[:idx]
+        del self._start_timestamps[:idx]
+        del self._intervals[:idx]
+        self[:0] = [items[pos] for pos in keep]
+        self._start_timestamps[:0] = [intervals[pos].start for pos in keep]
+        self._intervals[:0] = [intervals[pos] for pos in keep]
+        del self._end_timestamps[:bisect(self._end_timestamps, timestamp)]
+        self._containment = None
+
+    def _containment_index(self):
+        """
+        Returns nested containment list (built on first query after list
+        changed) as (top-level, children by parent), where each is list of
+        (indexes, end timestamps) of intervals not contained in each other.
+        Within each, starts and ends both increase, so intervals overlapping
+        a window are a contiguous run found by bisecting ends.
+        """
+        if self._containment is None:
+            ends = [interval.end for interval in self._intervals]
+            top, children, stack = [], {}, []
+            for idx, end in enumerate(ends):
+                # (start order) contained if it ends by enclosing interval end
+                while stack and ends[stack[-1]] < end:
+                    stack.pop()
+                if stack:
+                    children.setdefault(stack[-1], []).append(idx)
+                else:
+                    top.append(idx)
+                stack.append(idx)
+            self._containment = (
+                (top, [ends[idx] for idx in top]),
+                dict((parent, (indexes, [ends[idx] for idx in indexes]))
+                     for parent, indexes in children.iteritems())
+            )
+        return self._containment
+
+    def _overlapping(self, start, end, closed=False, lo=0, hi=None):
+        """
+        Returns indexes (in start order) of objects whose interval overlaps
+        [start, end], i.e. ends after start and starts before end. If
+        `closed`, objects starting at end and zero-length objects at start
+        count too, so zero-length objects at either bound count (or neither,
+        if not `closed`). Only indexes in [lo, hi) are visited, so it's
+        O(log n + k) for k objects, in range.
+        """
+        hi = len(self._intervals) if hi is None else hi
+        starts = self._start_timestamps
+        top, children = self._containment_index()
+        rv, pending = [], [top]
+        while pending:
+            indexes, ends = pending.pop()
+            # (if closed) from objects ending at start, as zero-length ones
+            # at start count, and objects containing them are visited.
+            pos = (bisect_left if closed else bisect_right)(ends, start)
+            # objects (in start order) before `lo` may contain ones from it.
+            # Only the last does: later siblings start after its contents.
+            pos = max(pos, bisect_left(indexes, lo) - 1)
+            while pos < len(indexes):
+                idx = indexes[pos]
+                if idx >= hi or starts[idx] > end or (starts[idx] == end and not closed):
+                    break
+                if idx >= lo and (ends[pos] > start or starts[idx] == start):
+                    rv.append(idx)
+                if idx in children: # contained intervals may overlap too
+                    pending.append(children[idx])
+                pos += 1
+        rv.sort()
+        return rv
+
+    def at(self, timestamp):
+        """
+        Returns list of objects whose interval contains timestamp
+        i.e. start <= timestamp < end (e.g. frequency at timestamp),
+        and zero-length ones at timestamp.
+        """
+        return self._select(self._overlapping(timestamp, timestamp, closed=True))
 
     def slice(self, interval, trimmed=True):
         """
-        Returns list of objects whose interval fall
-        between the specified interval.
+        Returns list of objects whose interval overlaps the specified
+        interval (ends after its start and starts before its end), including
+        those starting before (or ending after) it. Zero-length objects are
+        included only if strictly within it, at neither bound.
 
         Parameters:
         -----------
@@ -124,26 +296,122 @@ class IntervalList(list):
             return self
 
         start, end = interval.start, interval.end
-        idx_left = bisect(self._start_timestamps, start)
-        idx_right = bisect(self._start_timestamps, end)
-        idx_left = idx_left - 1 if idx_left >= len(self) else idx_left
-        idx_right = None if idx_right > len(self) else idx_right
-        idx = slice(idx_left, idx_right) if idx_left != idx_right else slice(idx_left - 1, idx_left)
-
-        ll = self[idx]
-        rv = IntervalList()
-        
-        if trimmed and len(ll):
-            for item in ll:
-                trim = False
-                item_start, item_end = item.interval.start, item.interval.end
-                if item_start < start:
-                    trim, item_start = True, start
-                if item_end > end:
-                    trim, item_end = True, end
-                if trim:
-                    rv.append(item._replace(interval=Interval(item_start, item_end)))
-                else:
-                    rv.append(item)
+        indexes = self._overlapping(start, end)
+        intervals = self._intervals
+        if not trimmed or all(start <= intervals[idx].start and intervals[idx].end <= end
+                              for idx in indexes):
+            return self._select(indexes)
+
+        rv = []
+        for idx in indexes:
+            item = self[idx]
+            item_start, item_end = item.interval.start, item.interval.end
+            if item_start < start or item_end > end:
+                item = item._replace(interval=Interval(max(item_start, start),
+                                                       min(item_end, end)))
+            rv.append(item)
+
+        # trimming only moves leading starts up to `start`, so order holds.
+        return IntervalList.from_iterable(rv, presorted=True)
+
+    def _select(self, indexes):
+        """
+        Returns list of objects at (sorted) indexes, as view (see
+        `IntervalListView`) if contiguous, copied otherwise.
+        """
+        if indexes and indexes[-1] - indexes[0] + 1 == len(indexes):
+            return IntervalListView(self, indexes[0], indexes[-1] + 1)
+        return IntervalList.from_iterable((self[idx] for idx in indexes), presorted=True)
+
+
+def _detach_views(parent):
+    """Copy views (see `_ListView`) of list, before objects move under them"""
+    for view in getattr(parent, '_views', {}).values():
+        view._own()
+
+
+class _ListView(object):
+    """
+    List (mixin) of objects `start` to `stop` of parent list, sharing its
+    (sorted) arrays e.g. timestamps, rather than rebuilding them. Arrays
+    are copied on write, by view if modified (becoming `base` list), or
+    before parent moves objects from under it.
+    """
+    base = list
+
+    def __init__(self, parent, start, stop):
+        list.__init__(self, list.__getitem__(parent, slice(start, stop)))
+        if isinstance(parent, _ListView):
+            parent, start = parent._root, parent._offset + start
+        self._root, self._offset = parent, start
+        try:
+            parent._views[id(self)] = self
+        except AttributeError:
+            parent._views = WeakValueDictionary({id(self): self})
+
+    def __reduce__(self):
+        return (self.base, (list(self), True))
+
+    def _shared(self, array):
+        """View of (shared) array of parent, for objects in view"""
+        return _SequenceView(array, self._offset, self._offset + len(self))
+
+    def _own(self):
+        """Copy shared arrays (see `_copy_arrays`), becoming `base` list"""
+        arrays, root = self._copy_arrays(), self._root
+        self.__class__ = self.base
+        del self._root, self._offset
+        self.__dict__.update(arrays)
+        root._views.pop(id(self), None)
+
+    def _writer(name):
+        def method(self, *args, **kwargs):
+            self._own()
+            return getattr(self, name)(*args, **kwargs)
+        method.__name__ = name
+        return method
+
+    append = _writer('append')
+    extend = _writer('extend')
+    remove = _writer('remove')
+    evict = _writer('evict')
+    del _writer
+
+
+class IntervalListView(_ListView, IntervalList):
+    """
+    IntervalList of objects `start` to `stop` of (parent) IntervalList,
+    sharing its intervals, timestamps and index (see `IntervalList.slice`).
+    """
+    base = IntervalList
+
+    @property
+    def _intervals(self):
+        return self._shared(self._root._intervals)
+
+    @property
+    def _start_timestamps(self):
+        return self._shared(self._root._start_timestamps)
+
+    @property
+    def _end_timestamps(self):
+        # sorted once (objects in view don't change, see `_ListView`)
+        try:
+            return self._sorted_ends
+        except AttributeError:
+            self._sorted_ends = sorted(interval.end for interval in self._intervals)
+            return self._sorted_ends
+
+    def _copy_arrays(self):
+        arrays = dict(_intervals=list(self._intervals),
+                      _start_timestamps=list(self._start_timestamps),
+                      _end_timestamps=self._end_timestamps,
+                      _containment=None)
+        del self._sorted_ends # owned by list, from now on
+        return arrays
 
-        return rv
\ No newline at end of file
+    def _overlapping(self, start, end, closed=False, lo=0, hi=None):
+        hi = len(self) if hi is None else hi
+        offset = self._offset
+        return [idx - offset for idx in self._root._overlapping(
+            start, end, closed=closed, lo=offset + lo, hi=offset + hi)]
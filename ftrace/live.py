@@ -0,0 +1,153 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    Rolling-window metrics of a followed (growing) trace e.g. for long
+    device soaks.
+
+    trace = Ftrace('trace.txt', follow=True, window=10.0)
+    live = LiveMetrics(trace, period=1.0, callback=on_snapshot)
+    live.run()
+
+    Trace keeps only the last `window` seconds of events (and component
+    intervals), so memory stays flat. Components consume just the new
+    events on each refresh, and metrics are computed over the window with
+    the same APIs as for whole traces (e.g. `CPU.busy_time`).
+"""
+import time
+from collections import namedtuple, defaultdict
+from .interval import Interval
+from .common import FtraceError
+
+__all__ = ['Snapshot', 'LiveMetrics']
+
+Snapshot = namedtuple('Snapshot',
+    [
+    'interval', # Window metrics are computed over
+    'cpu_busy', # Busy % by cpu
+    'cpu_frequency_residency', # Time (s) by frequency, by cpu
+    'framerate', # FPS (see `Android.framerate`)
+    'janks', # Number of janks (see `Android.num_janks`)
+    'gpu_busy', # GPU busy %
+    'gpu_pwrstate_residency', # Time (s) by GPU pwr state
+    ]
+)
+
+def _residency(intervals, key):
+    """Returns dict of total duration of intervals, by key(interval)"""
+    rv = defaultdict(float)
+    for item in intervals:
+        rv[key(item)] += item.interval.duration
+    return dict(rv)
+
+
+class LiveMetrics(object):
+    """
+    Periodic snapshots (see `Snapshot`) of metrics over last `window`
+    seconds of followed trace (see `Ftrace.window`).
+
+    Parameters:
+    -----------
+    trace : Ftrace
+        Trace opened with `follow=True` and `window`.
+    period : float
+        Trace time (in seconds) between snapshots.
+    callback : callable (optional)
+        Called with each snapshot taken by `update()`.
+    """
+    def __init__(self, trace, period=1.0, callback=None):
+        if not trace.follow or trace.window is None:
+            raise FtraceError('LiveMetrics needs followed trace with window')
+        self.trace = trace
+        self.period = period
+        self.callback = callback
+        self._next_snapshot = None
+
+    @property
+    def interval(self):
+        """Window (interval) metrics are computed over"""
+        if self.trace.interval is None:
+            return None
+        end = self.trace.interval.end
+        return Interval(max(self.trace.interval.start, end - self.trace.window), end)
+
+    def snapshot(self):
+        """Returns Snapshot of metrics over current window"""
+        trace, interval = self.trace, self.interval
+        if interval is None or not interval.duration:
+            raise FtraceError('No events in window')
+        tracepoints, duration = trace.tracepoints, interval.duration
+
+        cpu_busy, cpu_frequency_residency = {}, {}
+        if 'sched_switch' in tracepoints:
+            for cpu in sorted(trace.seen_cpus):
+                busy_time = trace.cpu.busy_time(cpu=cpu, interval=interval)
+                cpu_busy[cpu] = 100.0 * busy_time / duration
+        if tracepoints.intersection(['cpu_frequency', 'cpu_frequency_switch_start']):
+            for cpu in sorted(trace.seen_cpus):
+                cpu_frequency_residency[cpu] = _residency(
+                    trace.cpu.frequency_intervals(cpu=cpu, interval=interval),
+                    key=lambda freq_interval: freq_interval.frequency)
+
+        framerate, janks = float('nan'), 0
+        if 'tracing_mark_write' in tracepoints:
+            framerate = trace.android.framerate(interval=interval)
+            janks = trace.android.num_janks(interval=interval)
+
+        gpu_busy, gpu_pwrstate_residency = float('nan'), {}
+        if 'kgsl_pwr_set_state' in tracepoints:
+            gpu_busy = 100.0 * trace.gpu.busy_time(interval=interval) / duration
+            gpu_pwrstate_residency = _residency(
+                trace.gpu.pwrstate_intervals(interval=interval),
+                key=lambda idle_interval: idle_interval.state)
+
+        return Snapshot(interval=interval,
+                        cpu_busy=cpu_busy,
+                        cpu_frequency_residency=cpu_frequency_residency,
+                        framerate=framerate,
+                        janks=janks,
+                        gpu_busy=gpu_busy,
+                        gpu_pwrstate_residency=gpu_pwrstate_residency)
+
+    def update(self):
+        """
+        Parse data appended to trace, and take snapshot if `period` has
+        elapsed (in trace time) since last one. Returns snapshot taken,
+        if any (also passed to `callback`).
+        """
+        self.trace.refresh()
+        interval = self.interval
+        if interval is None or not interval.duration:
+            return None
+        if self._next_snapshot is not None and interval.end < self._next_snapshot:
+            return None
+        self._next_snapshot = interval.end + self.period
+        snapshot = self.snapshot()
+        if self.callback is not None:
+            self.callback(snapshot)
+        return snapshot
+
+    def run(self, poll_interval=1.0, max_snapshots=None):
+        """
+        Follow trace (polling every `poll_interval` seconds), taking
+        snapshots until `max_snapshots` (if any) are taken.
+        """
+        num_snapshots = 0
+        while max_snapshots is None or num_snapshots < max_snapshots:
+            if self.update() is not None:
+                num_snapshots += 1
+            else:
+                time.sleep(poll_interval)
@@ -77,9 +77,33 @@ block_rq_complete_pattern = re.compile(
         re.X|re.M
 )
 
-@register_parser
-def block_rq_complete(payload):
-    """Parser for `block_rq_complete` tracepoint"""
+def _parse_fast(payload):
+    """
+    Split-based parser for well-formed payloads, returns None otherwise.
+    """
+    dev, _, rest = payload.partition(' ')
+    dev_major, _, dev_minor = dev.partition(',')
+    rwbs_command, _, rest = rest.partition(' (')
+    cmd, sep, rest = rest.rpartition(') ')
+    sector, sep_plus, rest = rest.partition(' + ')
+    nr_sector, sep_errors, errors = rest.partition(' [')
+    if not (sep and sep_plus and sep_errors and errors.endswith(']')):
+        return None
+    errors = errors[:-1]
+    if not (dev_major.isdigit() and dev_minor.isdigit() and sector.isdigit() and
+            nr_sector.isdigit() and errors.isdigit() and rwbs_command.isalnum()):
+        return None
+    try:
+        io_type = DiskIOTypeMapping[rwbs_command[0]]
+        commands = set(DiskCommandMapping[c] for c in rwbs_command[1:])
+    except KeyError:
+        return None
+    return tuple.__new__(BlockRQComplete, (int(dev_major), int(dev_minor), int(sector),
+                                           int(nr_sector), cmd, int(errors),
+                                           RWBS(io_type=io_type, commands=commands)))
+
+def _parse_regex(payload):
+    """Regex-based parser (handles any whitespace)"""
     try:
         match = re.match(block_rq_complete_pattern, payload)
         if match:
@@ -91,3 +115,8 @@ def block_rq_complete(payload):
             return BlockRQComplete(**match_group_dict)
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def block_rq_complete(payload):
+    """Parser for `block_rq_complete` tracepoint"""
+    return _parse_fast(payload) or _parse_regex(payload)
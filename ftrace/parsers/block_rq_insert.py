@@ -77,9 +77,37 @@ block_rq_insert_pattern = re.compile(
         re.X|re.M
 )
 
-@register_parser
-def block_rq_insert(payload):
-    """Parser for `block_rq_insert` tracepoint"""
+def _parse_fast(payload):
+    """
+    Split-based parser for well-formed payloads, returns None otherwise.
+    """
+    dev, _, rest = payload.partition(' ')
+    dev_major, _, dev_minor = dev.partition(',')
+    rwbs_command, _, rest = rest.partition(' ')
+    nr_bytes, _, rest = rest.partition(' (')
+    cmd, sep, rest = rest.rpartition(') ')
+    sector, sep_plus, rest = rest.partition(' + ')
+    nr_sector, sep_comm, comm = rest.partition(' [')
+    if not (sep and sep_plus and sep_comm and comm[:-1] and comm.endswith(']')):
+        return None
+    if not (dev_major.isdigit() and dev_minor.isdigit() and nr_bytes.isdigit() and
+            sector.isdigit() and nr_sector.isdigit() and rwbs_command.isalnum()):
+        return None
+    commands = set()
+    if rwbs_command[0] == 'F' and len(rwbs_command) > 1:
+        commands.add(DiskCommand.FLUSH)
+        rwbs_command = rwbs_command[1:]
+    try:
+        io_type = DiskIOTypeMapping[rwbs_command[0]]
+        commands.update(DiskCommandMapping[c] for c in rwbs_command[1:])
+    except KeyError:
+        return None
+    return tuple.__new__(BlockRQInsert, (int(dev_major), int(dev_minor), int(sector),
+                                int(nr_sector), cmd, comm[:-1],
+                                RWBS(io_type=io_type, commands=commands)))
+
+def _parse_regex(payload):
+    """Regex-based parser (handles any whitespace)"""
     try:
         match = re.match(block_rq_insert_pattern, payload)
         if match:
@@ -94,3 +122,8 @@ def block_rq_insert(payload):
             return BlockRQInsert(**match_group_dict)
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def block_rq_insert(payload):
+    """Parser for `block_rq_insert` tracepoint"""
+    return _parse_fast(payload) or _parse_regex(payload)
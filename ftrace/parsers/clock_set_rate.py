@@ -61,9 +61,18 @@ clock_set_rate_pattern = re.compile(
         re.X|re.M
 )
 
-@register_parser
-def clock_set_rate(payload):
-    """Parser for `clock_set_rate` tracepoint"""
+def _parse_fast(payload):
+    """
+    Split-based parser for well-formed payloads, returns None otherwise.
+    """
+    clk, sep, rest = payload.rpartition(' state=')
+    state, sep_cpu, cpu_id = rest.partition(' cpu_id=')
+    if not (clk and sep and sep_cpu and state.isdigit() and cpu_id.isdigit()):
+        return None
+    return tuple.__new__(ClockSetRate, (clk, int(state), int(cpu_id)))
+
+def _parse_regex(payload):
+    """Regex-based parser (handles any whitespace)"""
     try:
         match = re.match(clock_set_rate_pattern, payload)
         if match:
@@ -71,3 +80,8 @@ def clock_set_rate(payload):
             return ClockSetRate(**match_group_dict)
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def clock_set_rate(payload):
+    """Parser for `clock_set_rate` tracepoint"""
+    return _parse_fast(payload) or _parse_regex(payload)
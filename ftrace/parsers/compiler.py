@@ -0,0 +1,286 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    Compiles parsers from kernel tracepoint format descriptors i.e.
+    /sys/kernel/debug/tracing/events/<subsys>/<name>/format
+
+    name: sched_wakeup
+    ID: 70
+    format:
+        field:unsigned short common_type;   offset:0;   size:2; signed:0;
+        ...
+        field:pid_t pid;    offset:24;  size:4; signed:1;
+
+    print fmt: "comm=%s pid=%d prio=%d target_cpu=%03d", REC->comm, REC->pid, ...
+
+    Payload (text) is decoded by splitting on literals in `print fmt`,
+    with values converted as per their conversion specifiers.
+"""
+import os
+import re
+import hashlib
+from collections import namedtuple
+from ftrace.common import ParserError
+from ftrace.utils.cache import DiskCache
+from .register import PARSERS, register_parser
+
+__all__ = ['compile_format', 'load_formats', 'parse_format', 'generate_source']
+
+# Bump whenever generated source changes (invalidates cached parsers).
+COMPILER_VERSION = 1
+
+FormatSpec = namedtuple('FormatSpec',
+    [
+    'name', # Tracepoint name
+    'fields', # List of (type, name) of (non-common) fields
+    'print_fmt', # printf-style format string
+    'args', # List of arguments (C expressions) to print_fmt
+    ]
+)
+
+_NAME_PATTERN = re.compile(r"""^name:\s*(?P<name>\w+)\s*$""", re.M)
+_FIELD_PATTERN = re.compile(r"""^\s*field:(?P<field>[^;]+);""", re.M)
+_PRINT_FMT_PATTERN = re.compile(r"""^print fmt:\s*(?P<print_fmt>.+)$""", re.M|re.S)
+_CONVERSION_PATTERN = re.compile(
+    r"""
+    %(?P<flags>[-+ #0]*)
+    (?P<width>\d*|\*)
+    (?:\.(?P<precision>\d+|\*))?
+    (?P<length>hh|h|ll|l|z|j|t|L)?
+    (?P<conversion>p[A-Za-z0-9]*|[diouxXcs%])
+    """,
+    re.X
+)
+_REC_PATTERN = re.compile(r"""REC->(?P<field>\w+)""")
+_STR_PATTERN = re.compile(r"""__get_(?:str|bitmask)\((?P<field>\w+)\)""")
+_KEY_PATTERN = re.compile(r"""(?P<key>\w+)[=:]\s*$""")
+
+# Python conversion of value (string) by printf conversion
+_CONVERTERS = {
+    'd': 'int({})', 'i': 'int({})', 'u': 'int({})',
+    'x': 'int({}, 16)', 'X': 'int({}, 16)', 'o': 'int({}, 8)',
+}
+
+def _read_c_string(text):
+    """Returns (string, rest) for C string literal at start of text"""
+    if not text.startswith('"'):
+        raise ParserError('Expected string literal in print fmt')
+    chars, idx = [], 1
+    escapes = {'n': '\n', 't': '\t', '"': '"', '\\': '\\'}
+    while idx < len(text) and text[idx] != '"':
+        if text[idx] == '\\' and idx + 1 < len(text):
+            chars.append(escapes.get(text[idx + 1], text[idx + 1]))
+            idx += 2
+        else:
+            chars.append(text[idx])
+            idx += 1
+    return ''.join(chars), text[idx + 1:]
+
+def _split_args(text):
+    """Split comma separated C expressions (top-level commas only)"""
+    args, depth, current, quoted = [], 0, [], False
+    for idx, char in enumerate(text):
+        if char == '"' and (idx == 0 or text[idx - 1] != '\\'):
+            quoted = not quoted
+        elif not quoted and char in '([{':
+            depth += 1
+        elif not quoted and char in ')]}':
+            depth -= 1
+        elif not quoted and not depth and char == ',':
+            args.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if ''.join(current).strip():
+        args.append(''.join(current).strip())
+    return args
+
+def parse_format(text):
+    """
+    Returns FormatSpec for kernel tracepoint format descriptor (text).
+    Inline spec can be just name and print fmt lines e.g.
+
+        name: my_tracepoint
+        print fmt: "value=%d", REC->value
+    """
+    name_match = re.search(_NAME_PATTERN, text)
+    print_fmt_match = re.search(_PRINT_FMT_PATTERN, text)
+    if not name_match or not print_fmt_match:
+        raise ParserError('Format needs name and print fmt')
+    fields = []
+    for field in re.findall(_FIELD_PATTERN, text):
+        field_type, _, field_name = field.strip().rpartition(' ')
+        field_name = field_name.split('[')[0]
+        if not field_name.startswith('common_'):
+            fields.append((field_type, field_name))
+    print_fmt, rest = _read_c_string(print_fmt_match.group('print_fmt').strip())
+    args = _split_args(rest.strip().lstrip(','))
+    return FormatSpec(name=name_match.group('name'), fields=fields,
+                      print_fmt=print_fmt, args=args)
+
+def _arg_name(arg, literal, idx):
+    """Field name for argument: REC->field, literal `key=` or argN"""
+    for pattern in (_STR_PATTERN, _REC_PATTERN):
+        match = re.search(pattern, arg or '')
+        if match:
+            return match.group('field')
+    match = re.search(_KEY_PATTERN, literal)
+    if match:
+        return match.group('key')
+    return 'arg{}'.format(idx)
+
+def _segments(spec):
+    """
+    Returns (leading literal, [(name, conversion, trailing literal), ...])
+    for print fmt. Adjacent conversions (no literal to split on in between)
+    are merged into single string value.
+    """
+    print_fmt, args = spec.print_fmt, spec.args
+    literals, conversions, pos, arg_idx = [], [], 0, 0
+    literal = []
+    for match in re.finditer(_CONVERSION_PATTERN, print_fmt):
+        literal.append(print_fmt[pos:match.start()])
+        pos = match.end()
+        conversion = match.group('conversion')
+        if conversion == '%':
+            literal.append('%')
+            continue
+        # '*' width/precision consume an argument each.
+        arg_idx += (match.group('width') == '*') + (match.group('precision') == '*')
+        arg = args[arg_idx] if arg_idx < len(args) else None
+        arg_idx += 1
+        literal = ''.join(literal)
+        if conversions and not literal:
+            name = conversions[-1][0]
+            conversions[-1] = (name, 's') # merged, e.g. "%s%s"
+        else:
+            literals.append(literal)
+            conversions.append((_arg_name(arg, literal, len(conversions)), conversion[0]))
+        literal = []
+    literals.append(''.join(literal) + print_fmt[pos:])
+    names = namedtuple('Record', [arg_name for arg_name, _ in conversions], rename=True)._fields
+    return literals[0], zip(names, [kind for _, kind in conversions], literals[1:])
+
+def generate_source(spec):
+    """
+    Returns Python source of record class and split-based decoder for spec.
+    Decoder returns None if payload doesn't match print fmt.
+    """
+    leading, segments = _segments(spec)
+    names = [name for name, _, _ in segments]
+    lines = [
+        '{}Base = namedtuple({!r}, {!r})'.format(spec.name, spec.name, names),
+        '',
+        'class Record({}Base):'.format(spec.name),
+        '    __slots__ = ()',
+        '',
+        'def decode(payload):',
+        '    """Decoder for `{}` tracepoint (compiled from print fmt)"""'.format(spec.name),
+    ]
+    if leading:
+        lines.extend([
+            '    if not payload.startswith({!r}):'.format(leading),
+            '        return None',
+        ])
+    lines.append('    pos = {}'.format(len(leading)))
+    for idx, (_, conversion, literal) in enumerate(segments):
+        converter = _CONVERTERS.get(conversion, '{}')
+        if literal and idx < len(segments) - 1:
+            lines.extend([
+                '    end = payload.find({!r}, pos)'.format(literal),
+                '    if end == -1:',
+                '        return None',
+                '    value{} = {}'.format(idx, converter.format('payload[pos:end]')),
+                '    pos = end + {}'.format(len(literal)),
+            ])
+        elif literal: # trailing literal
+            lines.extend([
+                '    if not payload.endswith({!r}):'.format(literal),
+                '        return None',
+                '    value{} = {}'.format(idx, converter.format(
+                    'payload[pos:len(payload) - {}]'.format(len(literal)))),
+            ])
+        else:
+            lines.append('    value{} = {}'.format(idx, converter.format('payload[pos:]')))
+    lines.append('    return _new(Record, ({}))'.format(
+        ''.join('value{}, '.format(idx) for idx in xrange(len(segments)))))
+    return '\n'.join(lines) + '\n'
+
+def _load_source(spec, cache_dir=None):
+    """Generated source for spec, from (and saved to) cache_dir if given"""
+    if not cache_dir:
+        return generate_source(spec)
+    cache = DiskCache(cache_dir)
+    key = 'parser-{}-{}'.format(spec.name, hashlib.sha1(
+        repr((COMPILER_VERSION, spec))).hexdigest())
+    try:
+        return cache.get(key)
+    except KeyError:
+        source = generate_source(spec)
+        cache.put(key, source)
+        return source
+
+def compile_format(descriptor, register=True, override=False, cache_dir=None):
+    """
+    Compile parser from kernel tracepoint format descriptor - path to
+    `format` file, or its text (see `parse_format`). Parser is registered
+    in PARSERS unless there's one for tracepoint already (or `override`).
+    Generated source is cached in `cache_dir` if given.
+
+    Returns parser, with `Record` (namedtuple of fields) and `source`.
+    """
+    if os.path.isfile(descriptor):
+        with open(descriptor) as f:
+            descriptor = f.read()
+    spec = parse_format(descriptor)
+    source = _load_source(spec, cache_dir=cache_dir)
+    namespace = dict(namedtuple=namedtuple, _new=tuple.__new__)
+    exec compile(source, '<format: {}>'.format(spec.name), 'exec') in namespace
+    decode = namespace['decode']
+
+    def parser(payload):
+        try:
+            return decode(payload)
+        except ValueError, e:
+            raise ParserError(e.message)
+
+    parser.__name__ = spec.name
+    parser.__doc__ = "Parser for `{}` tracepoint (compiled)".format(spec.name)
+    parser.Record = namespace['Record']
+    parser.source = source
+    if register and (override or spec.name not in PARSERS):
+        register_parser(parser)
+    return parser
+
+def load_formats(events_dir, tracepoints=None, **kwargs):
+    """
+    Compile parsers for all format descriptors in events directory e.g.
+    /sys/kernel/debug/tracing/events (or copy of it), optionally only
+    for `tracepoints`. Returns dict of parsers by tracepoint.
+    """
+    rv = {}
+    for root, dirs, files in os.walk(events_dir):
+        if 'format' not in files:
+            continue
+        if tracepoints is not None and os.path.basename(root) not in tracepoints:
+            continue
+        try:
+            parser = compile_format(os.path.join(root, 'format'), **kwargs)
+        except ParserError:
+            continue
+        rv[parser.__name__] = parser
+    return rv
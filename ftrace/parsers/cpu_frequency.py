@@ -20,7 +20,7 @@
 
 import re
 from ftrace.common import ParserError
-from .register import register_parser
+from .register import register_parser, register_bulk_parser
 from collections import namedtuple
 #from ftrace.third_party.cnamedtuple import namedtuple
 
@@ -58,9 +58,18 @@ cpu_frequency_pattern = re.compile(
         re.X|re.M
 )
 
-@register_parser
-def cpu_frequency(payload):
-    """Parser for `cpu_frequency` tracepoint"""
+def _parse_fast(payload):
+    """
+    Split-based parser for well-formed payloads, returns None otherwise.
+    """
+    state, sep, cpu_id = payload.partition(' cpu_id=')
+    state = state[6:] if state.startswith('state=') else ''
+    if not (sep and state.isdigit() and cpu_id.isdigit()):
+        return None
+    return tuple.__new__(CpuFrequency, (int(state), int(cpu_id)))
+
+def _parse_regex(payload):
+    """Regex-based parser (handles any whitespace)"""
     try:
         match = re.match(cpu_frequency_pattern, payload)
         if match:
@@ -68,3 +77,23 @@ def cpu_frequency(payload):
             return CpuFrequency(**match_group_dict)
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def cpu_frequency(payload):
+    """Parser for `cpu_frequency` tracepoint"""
+    return _parse_fast(payload) or _parse_regex(payload)
+
+cpu_frequency_bulk_pattern = re.compile(
+        r"""
+        ^state=(\d+)[ \t]+
+        cpu_id=(\d+)$
+        """,
+        re.X|re.M
+)
+
+@register_bulk_parser(TRACEPOINT)
+def cpu_frequency_bulk(payloads):
+    """Bulk parser for `cpu_frequency` tracepoint"""
+    matches = cpu_frequency_bulk_pattern.findall('\n'.join(payloads))
+    if len(matches) == len(payloads):
+        return [CpuFrequency(*groups) for groups in matches]
@@ -20,7 +20,7 @@
 
 import re
 from ftrace.common import ParserError
-from .register import register_parser
+from .register import register_parser, register_bulk_parser
 from collections import namedtuple
 #from ftrace.third_party.cnamedtuple import namedtuple
 
@@ -58,9 +58,18 @@ cpu_idle_pattern = re.compile(
         re.X|re.M
 )
 
-@register_parser
-def cpu_idle(payload):
-    """Parser for `cpu_idle` tracepoint"""
+def _parse_fast(payload):
+    """
+    Split-based parser for well-formed payloads, returns None otherwise.
+    """
+    state, sep, cpu_id = payload.partition(' cpu_id=')
+    state = state[6:] if state.startswith('state=') else ''
+    if not (sep and state.isdigit() and cpu_id.isdigit()):
+        return None
+    return tuple.__new__(CpuIdle, (int(state), int(cpu_id)))
+
+def _parse_regex(payload):
+    """Regex-based parser (handles any whitespace)"""
     try:
         match = re.match(cpu_idle_pattern, payload)
         if match:
@@ -68,3 +77,23 @@ def cpu_idle(payload):
             return CpuIdle(**match_group_dict)
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def cpu_idle(payload):
+    """Parser for `cpu_idle` tracepoint"""
+    return _parse_fast(payload) or _parse_regex(payload)
+
+cpu_idle_bulk_pattern = re.compile(
+        r"""
+        ^state=(\d+)[ \t]+
+        cpu_id=(\d+)$
+        """,
+        re.X|re.M
+)
+
+@register_bulk_parser(TRACEPOINT)
+def cpu_idle_bulk(payloads):
+    """Bulk parser for `cpu_idle` tracepoint"""
+    matches = cpu_idle_bulk_pattern.findall('\n'.join(payloads))
+    if len(matches) == len(payloads):
+        return [CpuIdle(*groups) for groups in matches]
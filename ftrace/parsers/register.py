@@ -14,6 +14,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from importlib import import_module
+
 try:
     
     from logbook import Logger
@@ -24,7 +26,44 @@ except ImportError:
 
 log = Logger('Parser')
 
-PARSERS = {}
+# Bump whenever output of (any) parser changes, so cached traces are
+# re-parsed (see `Ftrace(..., cache_dir=...)`).
+PARSER_VERSION = 4
+
+
+class ParserRegistry(dict):
+    """
+    Dict of parsers by tracepoint. Parsers declared in `modules` (module
+    by tracepoint) are imported, and so registered, on first lookup.
+    """
+    def __init__(self):
+        super(ParserRegistry, self).__init__()
+        self.modules = {}
+
+    def __missing__(self, tracepoint):
+        try:
+            module = self.modules[tracepoint]
+        except (KeyError, TypeError):
+            raise KeyError(tracepoint)
+        import_module(module, __name__.rpartition('.')[0])
+        return dict.__getitem__(self, tracepoint)
+
+    def __contains__(self, tracepoint):
+        return dict.__contains__(self, tracepoint) or tracepoint in self.modules
+
+    def get(self, tracepoint, default=None):
+        try:
+            return self[tracepoint]
+        except KeyError:
+            return default
+
+    def tracepoints(self):
+        """Returns sorted list of all (registered or declared) tracepoints"""
+        return sorted(set(self.keys()).union(self.modules))
+
+
+PARSERS = ParserRegistry()
+BULK_PARSERS = {}
 
 def register_parser(func):
     """Decorator to register ftrace parser"""
@@ -34,3 +73,59 @@ def register_parser(func):
     PARSERS[name] = func
     return func
 
+def register_bulk_parser(name):
+    """
+    Decorator to register bulk parser for `name` tracepoint. Bulk parsers
+    take list of payloads and return list of parsed payloads (same length),
+    or None if payloads can't be parsed in bulk.
+    """
+    def wrapped(func):
+        global BULK_PARSERS
+        log.info("Registering {name} bulk parser".format(name=name))
+        BULK_PARSERS[name] = func
+        return func
+    return wrapped
+
+def parse(tracepoint, payload, errors=None):
+    """
+    Parse payload for tracepoint with registered parser. Returns payload
+    if parser is N/A or fails (failures are recorded to `errors`, if
+    specified, see `ParseErrors`).
+    """
+    try:
+        parser = PARSERS[tracepoint]
+    except KeyError:
+        return payload
+    try:
+        rv = parser(payload)
+    except Exception, e:
+        if errors is not None:
+            errors.add(tracepoint, payload, e)
+        return payload
+    if not rv:
+        if errors is not None:
+            errors.add(tracepoint, payload)
+        return payload
+    return rv
+
+def bulk_parse(tracepoint, payloads, errors=None):
+    """
+    Parse list of payloads for tracepoint, with registered bulk parser if
+    any. Returns list of parsed payloads (or payload, where parser fails).
+    Failures are recorded to `errors`, if specified.
+    """
+    rv = None
+    PARSERS.get(tracepoint) # imports module (with bulk parser, if any)
+    if tracepoint in BULK_PARSERS:
+        try:
+            rv = BULK_PARSERS[tracepoint](payloads)
+        except Exception:
+            rv = None
+    if rv is None or len(rv) != len(payloads):
+        return [parse(tracepoint, payload, errors) for payload in payloads]
+    if errors is not None:
+        for parsed, payload in zip(rv, payloads):
+            if not parsed:
+                errors.add(tracepoint, payload)
+    return [parsed if parsed else payload for parsed, payload in zip(rv, payloads)]
+
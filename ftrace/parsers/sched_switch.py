@@ -78,9 +78,31 @@ sched_switch_pattern = re.compile(
         re.X|re.M
 )
 
-@register_parser
-def sched_switch(payload):
-    """Parser for `sched_switch` tracepoint"""
+def _parse_fast(payload):
+    """
+    Split-based parser for well-formed payloads, returns None otherwise.
+    """
+    prev_task, sep, next_task = payload.partition(' ==> ')
+    if not sep or not prev_task.startswith('prev_comm=') or '==>' in next_task:
+        return None
+    prev_comm, sep, rest = prev_task[10:].rpartition(' prev_pid=')
+    prev_pid, sep_prio, rest = rest.partition(' prev_prio=')
+    prev_prio, sep_state, prev_state = rest.partition(' prev_state=')
+    if not (sep and sep_prio and sep_state and prev_state and
+            prev_pid.isdigit() and prev_prio.isdigit()):
+        return None
+    if not next_task.startswith('next_comm='):
+        return None
+    next_comm, sep, rest = next_task[10:].rpartition(' next_pid=')
+    next_pid, sep_prio, next_prio = rest.partition(' next_prio=')
+    if not (sep and sep_prio and next_pid.isdigit() and next_prio.isdigit()):
+        return None
+    return tuple.__new__(SchedSwitch, (prev_comm, int(prev_pid), int(prev_prio),
+                                       TaskStateMapping[prev_state], next_comm,
+                                       int(next_pid), int(next_prio)))
+
+def _parse_regex(payload):
+    """Regex-based parser (handles any whitespace)"""
     try:
         match = re.match(sched_switch_pattern, payload)
         if match:
@@ -89,3 +111,8 @@ def sched_switch(payload):
             return SchedSwitch(**match_group_dict)
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def sched_switch(payload):
+    """Parser for `sched_switch` tracepoint"""
+    return _parse_fast(payload) or _parse_regex(payload)
@@ -69,9 +69,28 @@ sched_wakeup_pattern = re.compile(
         re.X|re.M
 )
 
-@register_parser
-def sched_wakeup(payload):
-    """Parser for `sched_wakeup` tracepoint"""
+def _parse_fast(payload):
+    """
+    Split-based parser for well-formed payloads, returns None otherwise.
+    """
+    if not payload.startswith('comm='):
+        return None
+    comm, sep, rest = payload[5:].rpartition(' pid=')
+    fields = rest.split(' ')
+    if not sep or len(fields) not in (3, 4):
+        return None
+    pid, prio, target_cpu = fields[0], fields[1][5:], fields[-1][11:]
+    success = fields[2][8:] if len(fields) == 4 else '1'
+    if not (fields[1].startswith('prio=') and fields[-1].startswith('target_cpu=') and
+            (len(fields) == 3 or fields[2].startswith('success='))):
+        return None
+    if not (pid.isdigit() and prio.isdigit() and success.isdigit() and target_cpu.isdigit()):
+        return None
+    return tuple.__new__(SchedWakeup, (comm, int(pid), int(prio), int(success),
+                                       int(target_cpu)))
+
+def _parse_regex(payload):
+    """Regex-based parser (handles any whitespace)"""
     try:
         match = re.match(sched_wakeup_pattern, payload)
         if match:
@@ -79,3 +98,8 @@ def sched_wakeup(payload):
             return SchedWakeup(**match_group_dict)
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def sched_wakeup(payload):
+    """Parser for `sched_wakeup` tracepoint"""
+    return _parse_fast(payload) or _parse_regex(payload)
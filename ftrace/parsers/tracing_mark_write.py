@@ -130,9 +130,38 @@ class TracingMarkWriteCounter(CounterBase):
             value=value,
         )
 
-@register_parser
-def tracing_mark_write(payload):
-    """Parser for `tracing_mark_write` tracepoint"""
+_FAST_PARSERS = {
+    # tag: (namedtuple, number of fields, integer fields)
+    'B': (TracingMarkWriteContextBegin, 3, (1,)),
+    'S': (TracingMarkWriteAsyncEvent, 4, (1, 3)),
+    'F': (TracingMarkWriteAsyncEvent, 4, (1, 3)),
+    'C': (TracingMarkWriteCounter, 4, (1, 3)),
+}
+
+def _parse_fast(payload):
+    """
+    Positional parser for well-formed payloads, returns None otherwise.
+    """
+    if payload == 'E' or payload.startswith('E|'):
+        return tuple.__new__(TracingMarkWriteContextEnd, (AtraceTag.CONTEXT_END,))
+    split_payload = payload.split('|')
+    try:
+        cls, num_fields, int_fields = _FAST_PARSERS[split_payload[0]]
+    except KeyError:
+        return None
+    if len(split_payload) < num_fields:
+        return None
+    values = split_payload[:num_fields]
+    values[0] = AtraceTagMapping[values[0]]
+    try:
+        for idx in int_fields:
+            values[idx] = int(values[idx])
+    except ValueError:
+        return None
+    return tuple.__new__(cls, values)
+
+def _parse_split(payload):
+    """Generic parser (handles malformed payloads)"""
     try:
         split_payload = payload.split('|')
         atrace_tag = AtraceTagMapping[split_payload[0]]
@@ -154,3 +183,8 @@ def tracing_mark_write(payload):
             raise ParserError('Unknown tracing_mark_write format')
     except Exception, e:
         raise ParserError(e.message)
+
+@register_parser
+def tracing_mark_write(payload):
+    """Parser for `tracing_mark_write` tracepoint"""
+    return _parse_fast(payload) or _parse_split(payload)
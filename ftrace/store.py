@@ -0,0 +1,605 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    EventStore: Columnar (struct-of-arrays) store of events.
+    ColumnarEventList: Read-only EventList of rows in EventStore.
+"""
+import operator
+import numpy as np
+from collections import defaultdict
+from .event import Event, EventList, LazyData, decode_data
+from .task import Task
+
+__all__ = ['EventStore', 'ColumnarEventList']
+
+# Strings longer than this are kept as (interned) objects,
+# rather than padded to fixed width.
+_MAX_FIXED_WIDTH = 16
+
+def _column(values):
+    """
+    Returns typed array for values of single (int, float, bool or str)
+    type, object array otherwise.
+    """
+    kinds = set(type(value) for value in values)
+    if kinds and kinds <= set([int, long]):
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif kinds == set([float]):
+        return np.array(values, dtype=np.float64)
+    elif kinds == set([bool]):
+        return np.array(values, dtype=np.bool_)
+    elif kinds == set([str]):
+        if max(len(value) for value in values) <= _MAX_FIXED_WIDTH:
+            return np.array(values, dtype=str)
+        values = [intern(value) for value in values]
+    column = np.empty(len(values), dtype=object)
+    for idx, value in enumerate(values):
+        column[idx] = value
+    return column
+
+def _concat_dtype(array, values):
+    """Returns dtype for values appended to array (as `_column` would pick)"""
+    if not len(array) or array.dtype == values.dtype:
+        return values.dtype if not len(array) else array.dtype
+    if array.dtype.kind == values.dtype.kind == 'S' and \
+        max(array.dtype.itemsize, values.dtype.itemsize) <= _MAX_FIXED_WIDTH:
+        return max(array.dtype, values.dtype, key=lambda dtype: dtype.itemsize)
+    return np.dtype(object)
+
+def _extend(array, buffer, values):
+    """
+    Returns (array, buffer) with values appended to array. Values are
+    written to spare capacity of buffer (of which array is a prefix), or to
+    new buffer of twice the size once full, so appends are amortized
+    O(len(values)). buffer is None if array has no spare capacity.
+    """
+    size, total = len(array), len(array) + len(values)
+    dtype = _concat_dtype(array, values)
+    if buffer is None or buffer.dtype != dtype or total > len(buffer):
+        buffer = np.empty(2 * total, dtype=dtype)
+        buffer[:size] = array
+    buffer[size:total] = values
+    return buffer[:total], buffer
+
+
+class _Table(object):
+    """
+    Parsed payloads of single tracepoint, as array per field. Payloads
+    that aren't (all) of one namedtuple type are kept as object array.
+    """
+    def __init__(self, values):
+        decode_data(values)
+        values = [value.data if isinstance(value, LazyData) else value
+                  for value in values]
+        kinds = set(type(value) for value in values)
+        self.cls = kinds.pop() if len(kinds) == 1 else None
+        if self.cls is not None and hasattr(self.cls, '_fields'):
+            self.fields = self.cls._fields
+            self.columns = [_column([value[idx] for value in values])
+                            for idx in xrange(len(self.fields))]
+        else:
+            self.cls, self.fields = None, ('data',)
+            self.columns = [_column(values)]
+        self.rows = None # global row of each payload, set by store.
+        self._buffers = None # spare capacity of columns & rows, see `extend`.
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_buffers'] = None
+        return state
+
+    def __len__(self):
+        return len(self.rows)
+
+    def extend(self, other, rows):
+        """
+        Append payloads of table `other`, at (global) rows, in place.
+        Payloads of mixed types are kept as object array.
+        """
+        if not len(self):
+            self.cls, self.fields = other.cls, other.fields
+            self.columns = [column[:0] for column in other.columns]
+        elif (self.cls, self.fields) != (other.cls, other.fields):
+            for table in (self, other):
+                table._to_objects()
+        buffers = self._buffers or [None] * (len(self.columns) + 1)
+        arrays = self.columns + [self.rows]
+        for idx, values in enumerate(other.columns + [rows]):
+            arrays[idx], buffers[idx] = _extend(arrays[idx], buffers[idx], values)
+        self.columns, self.rows, self._buffers = arrays[:-1], arrays[-1], buffers
+
+    def truncate(self, idx, row):
+        """
+        Returns table of payloads from `idx` on (views of this table's
+        arrays), with rows renumbered from `row`.
+        """
+        table = object.__new__(_Table)
+        table.cls, table.fields = self.cls, self.fields
+        table.columns = [column[idx:] for column in self.columns]
+        table.rows = self.rows[idx:] - row
+        # spare capacity (of columns) passes to truncated table
+        table._buffers = self._buffers and \
+            [buffer[idx:] for buffer in self._buffers[:-1]] + [None]
+        self._buffers = None
+        return table
+
+    def _to_objects(self):
+        """Keep payloads as (single) object array"""
+        if self.cls is None:
+            return
+        values = [self.row(idx) for idx in xrange(len(self))]
+        self.cls, self.fields = None, ('data',)
+        self.columns, self._buffers = [_column(values)], None
+
+    def select(self, indices, rows):
+        """
+        Returns table of payloads at `indices` (copies of this table's
+        arrays), at (global) rows.
+        """
+        table = object.__new__(_Table)
+        table.cls, table.fields = self.cls, self.fields
+        table.columns = [column[indices] for column in self.columns]
+        table.rows, table._buffers = rows, None
+        return table
+
+    def take(self, indices):
+        """Reorder payloads by indices"""
+        self.columns = [column[indices] for column in self.columns]
+        self.rows = self.rows[indices]
+
+    def row(self, idx):
+        """Returns payload in row"""
+        if self.cls is None:
+            return self.columns[0].item(idx)
+        return tuple.__new__(self.cls, [column.item(idx) for column in self.columns])
+
+
+class EventStore(object):
+    """
+    Events (sorted by timestamp) stored column-wise in typed arrays:
+
+        timestamp : float64 (seconds since start of trace)
+        raw_timestamp_ns : int64 (ns, as in trace)
+        cpu : int16
+        pid, prio, tgid, ppid : int32 (task)
+        comm_id : int32 (task name, index into `comms`)
+        task_id : int32 (index into `tasks`, shared by rows)
+        tracepoint_id : int16 (index into `tracepoints`)
+        irqs_off, need_resched, irq_type, preempt_depth : str
+
+    Parsed payloads are stored per tracepoint, see `fields()`.
+    Rows are returned as `Event` (built on access). Followed traces
+    extend stores in place, see `append` and `truncate`.
+    """
+
+    _TASK_COLUMNS = ('pid', 'prio', 'tgid', 'ppid')
+    _FLAG_COLUMNS = ('irqs_off', 'need_resched', 'irq_type', 'preempt_depth')
+
+    def __init__(self):
+        self.comms = []
+        self.tasks = []
+        self.tracepoints = []
+        self._others = [] # non-integer task attributes (e.g. None)
+        self._tables = []
+        self._buffers = {} # spare capacity of columns, see `append`.
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_buffers'] = {}
+        return state
+
+    @classmethod
+    def from_events(cls, events):
+        """Build store from iterable of events"""
+        store = cls()
+        store._build(events)
+        return store
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, idx):
+        return self.row(idx)
+
+    def __repr__(self):
+        return "EventStore(events={}, tracepoints={}, nbytes={})".format(
+            len(self), len(self.tracepoints), self.nbytes)
+
+    @property
+    def nbytes(self):
+        """Size of typed arrays in bytes (excludes objects referenced)"""
+        arrays = [getattr(self, name) for name in self._column_names()]
+        arrays.extend(column for table in self._tables for column in table.columns)
+        arrays.extend(table.rows for table in self._tables)
+        return sum(array.nbytes for array in arrays)
+
+    def _column_names(self):
+        return ('timestamp', 'raw_timestamp_ns', 'cpu', 'comm_id', 'task_id',
+                'tracepoint_id', 'data_row') + self._TASK_COLUMNS + self._FLAG_COLUMNS
+
+    def column(self, name):
+        """Returns array for column name e.g. 'timestamp'"""
+        if name not in self._column_names():
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def fields(self, tracepoint):
+        """
+        Returns dict of arrays for parsed payloads of tracepoint, keyed by
+        field name. Extra 'row' key holds index (into store) of each payload.
+        """
+        table = self._tables[self.tracepoints.index(tracepoint)]
+        rv = dict(zip(table.fields, table.columns))
+        rv['row'] = table.rows
+        return rv
+
+    def rows_by_tracepoint(self):
+        """Returns dict of (list of) rows keyed by tracepoint"""
+        return dict((tracepoint, table.rows.tolist()) for tracepoint, table
+                    in zip(self.tracepoints, self._tables))
+
+    def mask(self, tracepoints):
+        """Returns boolean array for rows with (any of) tracepoints"""
+        ids = [idx for idx, tp in enumerate(self.tracepoints) if tp in tracepoints]
+        return np.in1d(self.tracepoint_id, ids)
+
+    def row(self, idx):
+        """Returns event in row"""
+        task = self.tasks[self.task_id.item(idx)]
+        tracepoint_id = self.tracepoint_id.item(idx)
+        data = self._tables[tracepoint_id].row(self.data_row.item(idx))
+        return tuple.__new__(Event, (task,
+                                     self.cpu.item(idx),
+                                     self.raw_timestamp_ns.item(idx),
+                                     self.timestamp.item(idx),
+                                     self.irqs_off.item(idx),
+                                     self.need_resched.item(idx),
+                                     self.irq_type.item(idx),
+                                     self.preempt_depth.item(idx),
+                                     self.tracepoints[tracepoint_id],
+                                     data))
+
+    def append(self, events):
+        """
+        Append events (sorted, none before end of store) in place. Columns
+        grow geometrically, so appends are amortized O(len(events)), and
+        rows already in store (and lists of them) are unchanged.
+        """
+        other = EventStore.from_events(events)
+        if not len(other):
+            return
+        if len(self) and other.timestamp[0] < self.timestamp[-1]:
+            raise ValueError('Appended events must not precede end of store')
+        num_rows = len(self)
+
+        def remap(values, index, key=lambda value: value):
+            ids = dict((key(value), idx) for idx, value in enumerate(values))
+            mapping = []
+            for value in index:
+                if key(value) not in ids:
+                    ids[key(value)] = len(values)
+                    values.append(value)
+                mapping.append(ids[key(value)])
+            return np.array(mapping, dtype=np.int32)
+
+        comm_map = remap(self.comms, other.comms)
+        task_map = remap(self.tasks, other.tasks, key=tuple)
+        tracepoint_map = remap(self.tracepoints, other.tracepoints)
+        other_map = remap(self._others, other._others,
+                          key=lambda value: (type(value), value))
+
+        columns = {}
+        columns['comm_id'] = comm_map[other.comm_id]
+        columns['task_id'] = task_map[other.task_id]
+        columns['tracepoint_id'] = tracepoint_map[other.tracepoint_id].astype(np.int16)
+        for name in self._TASK_COLUMNS: # (negative) indices into others
+            values = getattr(other, name).copy()
+            encoded = values < 0
+            values[encoded] = -other_map[-values[encoded] - 1] - 1
+            columns[name] = values
+        while len(self._tables) < len(self.tracepoints):
+            self._tables.append(_Table([]))
+            self._tables[-1].rows = np.array([], dtype=np.intp)
+        # payloads follow those already in (tracepoint's) table
+        offsets = np.array([len(table) for table in self._tables], dtype=np.int32)
+        columns['data_row'] = other.data_row + offsets[columns['tracepoint_id']]
+        for table_id, table in zip(tracepoint_map, other._tables):
+            self._tables[table_id].extend(table, table.rows + num_rows)
+
+        for name in self._column_names():
+            values = columns.get(name)
+            values = getattr(other, name) if values is None else values
+            array, self._buffers[name] = _extend(getattr(self, name),
+                                                 self._buffers.get(name), values)
+            setattr(self, name, array)
+
+    def current_rows(self, idx, fields=None):
+        """
+        Returns (sorted) rows before `idx` of last event of each tracepoint
+        by cpu, or by payload field for tracepoints in `fields` (dict of
+        field name by tracepoint e.g. clock name), i.e. state in effect.
+        """
+        fields = fields or {}
+        rows = [np.array([], dtype=np.intp)]
+        for tracepoint, table in zip(self.tracepoints, self._tables):
+            stop = np.searchsorted(table.rows, idx).item()
+            if not stop:
+                continue
+            field = fields.get(tracepoint)
+            if field in table.fields:
+                keys = table.columns[table.fields.index(field)][:stop]
+            else:
+                keys = self.cpu[table.rows[:stop]]
+            _, last = np.unique(keys[::-1], return_index=True)
+            rows.append(table.rows[stop - 1 - last])
+        return np.sort(np.concatenate(rows))
+
+    def truncate(self, idx, keep=()):
+        """
+        Returns store of rows from `idx` on, as views of this store's
+        arrays (which, with lists of its rows, are unchanged). Spare
+        capacity passes to returned store, so it can be appended to.
+        Rows before `idx` in (sorted) `keep` are also kept, as copies.
+        """
+        store = EventStore()
+        store.comms, store.tasks, store.tracepoints = self.comms, self.tasks, self.tracepoints
+        store._others = self._others
+        keep = np.asarray(keep, dtype=np.intp)
+        keep = keep[keep < idx]
+        if len(keep):
+            rows = np.concatenate([keep, np.arange(idx, len(self))])
+            for name in self._column_names():
+                setattr(store, name, getattr(self, name)[rows])
+            store._tables = []
+            for tracepoint_id, table in enumerate(self._tables):
+                table_rows = np.flatnonzero(store.tracepoint_id == tracepoint_id)
+                store._tables.append(table.select(store.data_row[table_rows], table_rows))
+                store.data_row[table_rows] = np.arange(len(table_rows), dtype=np.int32)
+            return store
+        starts = [np.searchsorted(table.rows, idx).item() for table in self._tables]
+        store._tables = [table.truncate(start, idx)
+                         for table, start in zip(self._tables, starts)]
+        for name in self._column_names():
+            setattr(store, name, getattr(self, name)[idx:])
+            if name in self._buffers:
+                store._buffers[name] = self._buffers[name][idx:]
+        # payloads before `idx` dropped from tables
+        store.data_row = store.data_row - np.array(starts, dtype=np.int32)[store.tracepoint_id]
+        store._buffers.pop('data_row', None)
+        self._buffers = {}
+        return store
+
+    def _encode(self, value, index):
+        """Integer as is, anything else as (negative) index into others"""
+        if type(value) in (int, long) and 0 <= value < (1 << 31):
+            return value
+        key = (type(value), value)
+        if key not in index:
+            index[key] = -len(self._others) - 1
+            self._others.append(value)
+        return index[key]
+
+    def _decode(self, value):
+        return value if value >= 0 else self._others[-value - 1]
+
+    def _build(self, events):
+        comm_index, task_index, tracepoint_index, other_index = {}, {}, {}, {}
+        columns = defaultdict(list)
+        payloads = []
+        for event in events:
+            task = event.task
+            comm_id = comm_index.get(task.name)
+            if comm_id is None:
+                comm_id = comm_index[task.name] = len(self.comms)
+                self.comms.append(intern(task.name) if type(task.name) is str else task.name)
+            # by all attributes (Task compares by pid only)
+            task_key = tuple(task)
+            task_id = task_index.get(task_key)
+            if task_id is None:
+                task_id = task_index[task_key] = len(self.tasks)
+                self.tasks.append(tuple.__new__(Task, (self.comms[comm_id],) + task_key[1:]))
+            tracepoint_id = tracepoint_index.get(event.tracepoint)
+            if tracepoint_id is None:
+                tracepoint_id = tracepoint_index[event.tracepoint] = len(self.tracepoints)
+                self.tracepoints.append(event.tracepoint)
+                payloads.append([])
+            columns['comm_id'].append(comm_id)
+            columns['task_id'].append(task_id)
+            columns['tracepoint_id'].append(tracepoint_id)
+            columns['data_row'].append(len(payloads[tracepoint_id]))
+            payloads[tracepoint_id].append(event.data)
+            columns['timestamp'].append(event.timestamp)
+            columns['raw_timestamp_ns'].append(event.raw_timestamp_ns)
+            columns['cpu'].append(event.cpu)
+            for name in self._TASK_COLUMNS:
+                columns[name].append(self._encode(getattr(task, name), other_index))
+            for name in self._FLAG_COLUMNS:
+                columns[name].append(getattr(event, name))
+
+        self.timestamp = np.array(columns.pop('timestamp', []), dtype=np.float64)
+        self.raw_timestamp_ns = np.array(columns.pop('raw_timestamp_ns', []), dtype=np.int64)
+        self.cpu = np.array(columns.pop('cpu', []), dtype=np.int16)
+        self.tracepoint_id = np.array(columns.pop('tracepoint_id', []), dtype=np.int16)
+        for name in ('comm_id', 'task_id', 'data_row') + self._TASK_COLUMNS:
+            setattr(self, name, np.array(columns.pop(name, []), dtype=np.int32))
+        for name in self._FLAG_COLUMNS:
+            setattr(self, name, _column(columns.pop(name, [])) if len(self) else
+                    np.array([], dtype=str))
+
+        self._tables = [_Table(values) for values in payloads]
+        for tracepoint_id, table in enumerate(self._tables):
+            table.rows = np.flatnonzero(self.tracepoint_id == tracepoint_id)
+
+        # Stable sort by timestamp (if out of order), as with EventList.
+        if len(self) and (np.diff(self.timestamp) < 0).any():
+            order = np.argsort(self.timestamp, kind='mergesort')
+            for name in self._column_names():
+                setattr(self, name, getattr(self, name)[order])
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            for table in self._tables:
+                table.rows = inverse[table.rows]
+                table.take(np.argsort(table.rows, kind='mergesort'))
+                self.data_row[table.rows] = np.arange(len(table), dtype=np.int32)
+
+
+class ColumnarEventList(EventList):
+    """
+    Read-only EventList of rows `start` to `stop` in EventStore.
+    Events are built on access, and slices share the store.
+    """
+    def __init__(self, store=None, start=0, stop=None):
+        list.__init__(self)
+        self.store = store if store is not None else EventStore.from_events([])
+        self._start = start
+        self._stop = len(self.store) if stop is None else max(start, stop)
+
+    def __reduce__(self):
+        return (self.__class__, (self.store, self._start, self._stop))
+
+    @property
+    def _timestamps(self):
+        return self.store.timestamp[self._start:self._stop]
+
+    @property
+    def start(self):
+        """First timestamp in list"""
+        return self._timestamps[0].item()
+
+    @property
+    def end(self):
+        """Last timestamp in list"""
+        return self._timestamps[-1].item()
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __iter__(self):
+        row = self.store.row
+        for idx in xrange(self._start, self._stop):
+            yield row(idx)
+
+    def __reversed__(self):
+        row = self.store.row
+        for idx in xrange(self._stop - 1, self._start - 1, -1):
+            yield row(idx)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return ColumnarEventList(self.store, self._start + start, self._start + stop)
+            return EventList.from_iterable((self[idx] for idx in xrange(start, stop, step)),
+                                           presorted=step > 0)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('list index out of range')
+        return self.store.row(self._start + key)
+
+    def __getslice__(self, start, stop):
+        return self.__getitem__(slice(start, stop))
+
+    def __contains__(self, obj):
+        return any(event == obj for event in self)
+
+    def count(self, obj):
+        return sum(1 for event in self if event == obj)
+
+    def index(self, obj, start=0, stop=None):
+        start, stop, _ = slice(start, stop).indices(len(self))
+        for idx in xrange(start, stop):
+            if self[idx] == obj:
+                return idx
+        raise ValueError('{} is not in list'.format(obj))
+
+    # Operators of (empty) list storage would ignore rows, so events are
+    # listed (built) as for iteration. Results are plain lists, as for list.
+
+    def __add__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(other) + list(self)
+
+    def __mul__(self, num):
+        return list(self) * num
+
+    __rmul__ = __mul__
+
+    def _compare(op):
+        def compare(self, other):
+            if not isinstance(other, list):
+                return NotImplemented
+            return op(list(self), list(other))
+        return compare
+
+    __eq__ = _compare(operator.eq)
+    __ne__ = _compare(operator.ne)
+    __lt__ = _compare(operator.lt)
+    __le__ = _compare(operator.le)
+    __gt__ = _compare(operator.gt)
+    __ge__ = _compare(operator.ge)
+    __hash__ = None
+    del _compare
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('ColumnarEventList is read-only')
+
+    append = extend = insert = pop = remove = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = _read_only
+    __iadd__ = __imul__ = _read_only
+
+    def slice(self, interval, closed=None):
+        """
+        Returns list of objects whose timestamps fall
+        between the specified interval.
+
+        Parameters:
+        -----------
+        closed : string or None, default None
+            Make the interval closed with respect to the given interval to
+            the 'left', 'right', or both sides (None)
+
+        """
+        if interval is None:
+            return self
+        else:
+            start, end = interval.start, interval.end
+
+        if closed not in (None, 'left', 'right'):
+            raise ValueError("Closed has to be either 'left', 'right' or None")
+        left_closed = closed in (None, 'left')
+        right_closed = closed in (None, 'right')
+
+        timestamps = self._timestamps
+        # open ends exclude (all) rows at start/end timestamp
+        idx_left = np.searchsorted(timestamps, start,
+                                   side='left' if left_closed else 'right').item()
+        idx_right = np.searchsorted(timestamps, end,
+                                    side='right' if right_closed else 'left').item()
+
+        if idx_left >= len(self):
+            return EventList()
+        return ColumnarEventList(self.store, self._start + idx_left, self._start + idx_right)
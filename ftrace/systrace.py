@@ -0,0 +1,178 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    Streaming extraction of ftrace text from systrace HTML i.e.
+
+    <script class="trace-data" type="application/text">
+    # tracer: nop
+    ...
+    </script>
+
+    Sections are ftrace text (as is, or zlib compressed and base64
+    encoded), JSON (e.g. chrome trace events) or other text (e.g.
+    process dumps). Only ftrace text is extracted, other sections are
+    skipped a block at a time (never held in memory).
+"""
+import re
+import zlib
+import binascii
+from .common import ConstantBase
+
+__all__ = ['TraceData', 'TraceDataReader', 'find_sections']
+
+_OPEN_TAG = '<script'
+_CLOSE_TAG = '</script>'
+_TRACE_DATA_CLASS = 'trace-data'
+# Characters of section classified by.
+_HEAD_SIZE = 4096
+_BASE64_PATTERN = re.compile(r"""^[A-Za-z0-9+/=\s]+$""")
+
+
+class TraceData(ConstantBase):
+    FTRACE = ()
+    JSON = ()
+    OTHER = ()
+
+def _classify_text(head):
+    """Returns TraceData of (decoded) text head of section"""
+    head = head.lstrip()
+    if head.startswith('{') or head.startswith('['):
+        return TraceData.JSON
+    if head.startswith('# tracer') or 'TASK-PID' in head:
+        return TraceData.FTRACE
+    return TraceData.OTHER
+
+def classify(head):
+    """
+    Returns (TraceData, compressed) of section, by its (raw) head.
+    Compressed sections are base64 encoded zlib streams.
+    """
+    stripped = head.strip()
+    if stripped and re.match(_BASE64_PATTERN, stripped[:_HEAD_SIZE]):
+        decoder = _Inflater()
+        try:
+            text = decoder.feed(stripped[:_HEAD_SIZE])
+        except (binascii.Error, zlib.error):
+            pass
+        else:
+            return _classify_text(text), True
+    return _classify_text(head), False
+
+
+class _Inflater(object):
+    """Incremental base64 decode and zlib decompress"""
+    def __init__(self):
+        self._pending = ''
+        self._decompressor = zlib.decompressobj()
+
+    def feed(self, data):
+        data = self._pending + ''.join(data.split())
+        idx = len(data) - len(data) % 4
+        data, self._pending = data[:idx], data[idx:]
+        return self._decompressor.decompress(binascii.a2b_base64(data))
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class TraceDataReader(object):
+    """
+    Iterable of ftrace text (blocks) in trace-data sections of systrace
+    HTML, read from (HTML) blocks.
+
+    `sections` lists (TraceData, compressed) of sections seen so far.
+    """
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.sections = []
+
+    def __iter__(self):
+        buf = ''
+        in_section = classified = False
+        inflater = None
+        wanted = False
+        try:
+            for block in self.blocks:
+                buf += block
+                while buf:
+                    if not in_section:
+                        idx = buf.find(_OPEN_TAG)
+                        if idx == -1:
+                            buf = buf[-len(_OPEN_TAG):]
+                            break
+                        end = buf.find('>', idx)
+                        if end == -1:
+                            buf = buf[idx:]
+                            break
+                        # other scripts are skipped (unclassified)
+                        in_section, wanted = True, False
+                        classified = _TRACE_DATA_CLASS not in buf[idx:end]
+                        buf = buf[end + 1:]
+                        continue
+                    close = buf.find(_CLOSE_TAG)
+                    if not classified:
+                        if close == -1 and len(buf) < _HEAD_SIZE:
+                            break
+                        kind, compressed = classify(buf[:_HEAD_SIZE if close == -1 else close])
+                        self.sections.append((kind, compressed))
+                        wanted = kind is TraceData.FTRACE
+                        inflater = _Inflater() if compressed else None
+                        classified = True
+                    if close == -1:
+                        # keep what may be start of closing tag
+                        data, buf = buf[:-len(_CLOSE_TAG)], buf[-len(_CLOSE_TAG):]
+                    else:
+                        data, buf = buf[:close], buf[close + len(_CLOSE_TAG):]
+                    if wanted and data:
+                        text = inflater.feed(data) if inflater else data
+                        if text:
+                            yield text
+                    if close == -1:
+                        break
+                    if wanted and inflater:
+                        text = inflater.flush()
+                        if text:
+                            yield text
+                    in_section = False
+            if in_section and wanted and buf: # truncated section
+                text = inflater.feed(buf) if inflater else buf
+                if text:
+                    yield text
+        finally:
+            if hasattr(self.blocks, 'close'):
+                self.blocks.close()
+
+def find_sections(buf):
+    """
+    Returns list of (TraceData, compressed, start, end) of trace-data
+    sections in (memory-mapped) HTML, where [start, end) is content.
+    """
+    sections, pos = [], 0
+    while True:
+        idx = buf.find(_OPEN_TAG, pos)
+        if idx == -1:
+            return sections
+        end = buf.find('>', idx)
+        if end == -1:
+            return sections
+        close = buf.find(_CLOSE_TAG, end)
+        if close == -1:
+            close = len(buf)
+        if _TRACE_DATA_CLASS in buf[idx:end]:
+            kind, compressed = classify(buf[end + 1:min(end + 1 + _HEAD_SIZE, close)])
+            sections.append((kind, compressed, end + 1, close))
+        pos = close + len(_CLOSE_TAG)
@@ -21,6 +21,7 @@
 """
     TaskState: Possible task states from linux/sched.h
     Task: Runnable thread (process) executed on CPU.
+    TaskTable: Shared Task instances (of trace), by their attributes.
 """
 from six import integer_types
 from collections import namedtuple, defaultdict
@@ -126,6 +127,46 @@ class Task(TaskBase):
         except:
             return
 
+
+class TaskTable(object):
+    """
+    Table of Task instances, shared by all events (and intervals) of
+    trace with same task attributes, with interned task names.
+
+    Tasks are keyed by attributes as given (i.e. before conversion, see
+    `Task`), as the same few thousand tasks recur in millions of events.
+    """
+    def __init__(self):
+        self._tasks = {} # by attributes (after conversion)
+        self._keys = {} # by attributes as given
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def get(self, name, pid, prio=None, tgid=None, ppid=None):
+        """Returns (shared) Task with attributes"""
+        key = (pid, name, prio, tgid, ppid)
+        try:
+            return self._keys[key]
+        except KeyError:
+            task = self._keys[key] = self.add(Task(name, pid, prio, tgid, ppid))
+            return task
+
+    def add(self, task):
+        """
+        Returns (shared) Task equal to task in all attributes, adding task
+        if new (e.g. tasks of events parsed in worker processes).
+        """
+        key = tuple(task)
+        try:
+            return self._tasks[key]
+        except KeyError:
+            if type(task.name) is str and intern(task.name) is not task.name:
+                task = tuple.__new__(Task, (intern(task.name),) + key[1:])
+            self._tasks[key] = task
+            return task
+
+
 ##normal scheduling policies
 ##    range: 0
 ##    (SCHED_OTHER, SCHED_IDLE, SCHED_BATCH)
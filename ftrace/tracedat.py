@@ -0,0 +1,503 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    Reader for trace-cmd `trace.dat` (binary) files, version 6 i.e.
+
+    header:         magic, version, endianness, long size, page size
+    header_page:    format of ring-buffer page header
+    header_event:   format of ring-buffer event header
+    ftrace events:  format descriptors of ftrace (internal) events
+    events:         format descriptors of events, by system
+    kallsyms, trace_printk, saved cmdlines
+    options:        cpu stats, clock offset etc. (optional)
+    flyrecord:      (offset, size) of ring-buffer pages for each CPU
+
+    Events are decoded straight from ring-buffer pages, as per their format
+    descriptors (no text rendering or regex parsing).
+"""
+import re
+import mmap
+import heapq
+import struct
+from importlib import import_module
+from collections import namedtuple
+from contextlib import contextmanager
+from .common import FtraceError
+from .parsers import PARSERS
+from .parsers.compiler import parse_format
+from .task import TaskStateMapping
+
+__all__ = ['TraceDat', 'EventFormat', 'Field']
+
+MAGIC = '\x17\x08\x44tracing'
+
+# Ring-buffer event types (type_len), see linux/ring_buffer.h
+_TYPE_PADDING = 29
+_TYPE_TIME_EXTEND = 30
+_TYPE_TIME_STAMP = 31
+_TS_SHIFT = 27
+# Flags in (upper bits of) page commit.
+_MISSED_EVENTS = 1 << 31
+_MISSED_STORED = 1 << 30
+_COMMIT_MASK = _MISSED_STORED - 1
+
+# Flags in common_flags, see kernel/trace/trace.h
+_FLAG_IRQS_OFF = 0x01
+_FLAG_IRQS_NOSUPPORT = 0x02
+_FLAG_NEED_RESCHED = 0x04
+_FLAG_HARDIRQ = 0x08
+_FLAG_SOFTIRQ = 0x10
+_FLAG_PREEMPT_RESCHED = 0x20
+
+_OPTION_CPUSTAT = 2
+_OPTION_OFFSET = 7
+
+Field = namedtuple('Field',
+    [
+    'name', # Field name
+    'type', # C type
+    'offset', # Byte offset in record
+    'size', # Size in bytes
+    'signed', # True if signed
+    ]
+)
+
+_FIELD_PATTERN = re.compile(
+    r"""
+    field:(?P<declaration>[^;]+);\s*
+    offset:(?P<offset>\d+);\s*
+    size:(?P<size>\d+);\s*
+    (?:signed:(?P<signed>\d+);)?
+    """,
+    re.X
+)
+_ID_PATTERN = re.compile(r"""^ID:\s*(?P<id>\d+)\s*$""", re.M)
+_FLAGS_PATTERN = re.compile(r"""\{\s*(?P<mask>0x[0-9a-fA-F]+|\d+)\s*,\s*"(?P<flag>[^"]*)"\s*\}""")
+_INT_CODES = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+
+# Layout of common fields, for formats without these.
+_COMMON_FIELDS = [
+    Field(name='common_type', type='unsigned short', offset=0, size=2, signed=False),
+    Field(name='common_flags', type='unsigned char', offset=2, size=1, signed=False),
+    Field(name='common_preempt_count', type='unsigned char', offset=3, size=1, signed=False),
+    Field(name='common_pid', type='int', offset=4, size=4, signed=True),
+]
+
+def _parse_fields(text):
+    """Returns list of Field in format descriptor (text)"""
+    fields = []
+    for match in re.finditer(_FIELD_PATTERN, text):
+        declaration = match.group('declaration').strip()
+        field_type, _, name = declaration.rpartition(' ')
+        if '[' in name:
+            name, _, length = name.partition('[')
+            field_type = '{}[{}'.format(field_type, length)
+        fields.append(Field(name=name, type=field_type,
+                            offset=int(match.group('offset')),
+                            size=int(match.group('size')),
+                            signed=match.group('signed') == '1'))
+    return fields
+
+
+class EventFormat(object):
+    """
+    Format of event (by ID), with decoder of its (binary) records to
+    dict of field values.
+    """
+    def __init__(self, text, system, endian='<'):
+        spec = parse_format(text)
+        match = re.search(_ID_PATTERN, text)
+        if not match:
+            raise FtraceError('Format of {} has no ID'.format(spec.name))
+        self.id = int(match.group('id'))
+        self.name = spec.name
+        self.system = system
+        self.spec = spec
+        fields = _parse_fields(text)
+        self.payload_fields = [f for f in fields if not f.name.startswith('common_')]
+        self.common_fields = [f for f in fields if f.name.startswith('common_')] or _COMMON_FIELDS
+        self.fields = self.common_fields + self.payload_fields
+        self._compile(endian)
+
+    def __repr__(self):
+        return "EventFormat(id={}, system={}, name={})".format(
+            self.id, self.system, self.name)
+
+    def _compile(self, endian):
+        """
+        All integer fields are read with a single struct (padded between
+        fields), strings and arrays are sliced out of record.
+        """
+        codes, names, pos = [], [], 0
+        self._strings, self._dynamic, self._arrays = [], [], []
+        for field in sorted(self.fields, key=lambda f: f.offset):
+            if field.type.startswith('__data_loc'):
+                self._dynamic.append(field)
+            elif '[' in field.type:
+                element = field.type.split('[')[0].split()[-1]
+                if element == 'char':
+                    self._strings.append(field)
+                else:
+                    self._arrays.append(field)
+            elif field.size in _INT_CODES and field.offset >= pos:
+                code = _INT_CODES[field.size]
+                codes.append('{}x'.format(field.offset - pos) if field.offset > pos else '')
+                codes.append(code if field.signed else code.upper())
+                names.append(field.name)
+                pos = field.offset + field.size
+        self._struct = struct.Struct(endian + ''.join(codes))
+        self._struct_names = names
+        self._endian = endian
+        self.size = pos
+
+    def decode(self, record):
+        """Returns dict of field values in (binary) record"""
+        values = dict(zip(self._struct_names, self._struct.unpack_from(record)))
+        for field in self._strings:
+            end = field.offset + field.size if field.size else len(record) # e.g. `char buf[]`
+            values[field.name] = record[field.offset:end].split('\0', 1)[0]
+        for field in self._dynamic:
+            loc, = struct.unpack_from(self._endian + 'I', record, field.offset)
+            offset, length = loc & 0xffff, loc >> 16
+            values[field.name] = record[offset:offset + length].split('\0', 1)[0]
+        for field in self._arrays:
+            values[field.name] = record[field.offset:field.offset + field.size]
+        return values
+
+    def flags(self, field):
+        """
+        Returns list of (mask, flag) printed for field by `__print_flags`
+        in print fmt (e.g. task state letters for sched_switch), if any.
+        """
+        for arg in self.spec.args:
+            if '__print_flags' in arg and 'REC->{}'.format(field) in arg:
+                return [(int(mask, 0), flag) for mask, flag in re.findall(_FLAGS_PATTERN, arg)]
+        return []
+
+
+class TraceDat(object):
+    """
+    Reader for trace-cmd `trace.dat` file.
+
+    Params:
+    -------
+    filepath : str
+        Path of trace.dat file
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.formats = {} # EventFormat by ID
+        self.cmdlines = {} # comm by pid
+        self.cpu_stats = {} # dict of stats by cpu
+        self.offset = 0 # added to all timestamps (ns)
+        self.cpu_data = [] # (offset, size) of pages by cpu
+        self.first_timestamp = None # of all records (ns), once read
+        self.last_timestamp = None
+        with self._mmap() as buf:
+            self._read_headers(buf)
+
+    def __repr__(self):
+        return "TraceDat(filepath={}, version={}, cpus={})".format(
+            self.filepath, self.version, self.cpus)
+
+    @contextmanager
+    def _mmap(self):
+        """Context manager for read-only memory map of file"""
+        with open(self.filepath, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield buf
+            finally:
+                buf.close()
+
+    def _read_headers(self, buf):
+        """Read everything up to (and including) flyrecord section"""
+        if buf[:len(MAGIC)] != MAGIC:
+            raise FtraceError('{} is not a trace-cmd file'.format(self.filepath))
+        self._buf, self._pos = buf, len(MAGIC)
+        self.version = int(self._read_string())
+        if self.version != 6:
+            raise FtraceError('trace.dat version {} not supported'.format(self.version))
+        self.endian = '>' if ord(self._read(1)) else '<'
+        self.long_size = ord(self._read(1))
+        self.page_size = self._unpack('I')
+
+        self._read_section_name('header_page')
+        self.header_page = dict((f.name, f) for f in _parse_fields(self._read(self._unpack('Q'))))
+        self._read_section_name('header_event')
+        self._read(self._unpack('Q'))
+
+        for _ in xrange(self._unpack('I')):
+            self._add_format(self._read(self._unpack('Q')), 'ftrace')
+        for _ in xrange(self._unpack('I')):
+            system = self._read_string()
+            for _ in xrange(self._unpack('I')):
+                self._add_format(self._read(self._unpack('Q')), system)
+
+        self._read(self._unpack('I')) # kallsyms
+        self._read(self._unpack('I')) # trace_printk formats
+        for line in self._read(self._unpack('Q')).splitlines():
+            pid, _, comm = line.partition(' ')
+            if pid.isdigit():
+                self.cmdlines[int(pid)] = comm
+        self.cpus = self._unpack('I')
+
+        section = self._read(10).rstrip('\0 ')
+        if section == 'options':
+            self._read_options()
+            section = self._read(10).rstrip('\0 ')
+        if section != 'flyrecord':
+            raise FtraceError('trace.dat `{}` data not supported'.format(section))
+        self.cpu_data = [(self._unpack('Q'), self._unpack('Q')) for cpu in xrange(self.cpus)]
+        del self._buf
+
+    def _read(self, size):
+        data = self._buf[self._pos:self._pos + size]
+        if len(data) != size:
+            raise FtraceError('Unexpected end of {}'.format(self.filepath))
+        self._pos += size
+        return data
+
+    def _unpack(self, code):
+        return struct.unpack(self.endian + code, self._read(struct.calcsize(code)))[0]
+
+    def _read_string(self):
+        end = self._buf.find('\0', self._pos)
+        if end == -1:
+            raise FtraceError('Unexpected end of {}'.format(self.filepath))
+        rv, self._pos = self._buf[self._pos:end], end + 1
+        return rv
+
+    def _read_section_name(self, name):
+        if self._read_string() != name:
+            raise FtraceError('Expected `{}` section in {}'.format(name, self.filepath))
+
+    def _read_options(self):
+        while True:
+            option = self._unpack('H')
+            if not option:
+                return
+            data = self._read(self._unpack('I'))
+            if option == _OPTION_OFFSET:
+                self.offset = int(data.rstrip('\0'), 0)
+            elif option == _OPTION_CPUSTAT:
+                stats = dict((key.strip(), value.strip()) for key, _, value in
+                             (line.partition(':') for line in data.splitlines()))
+                if stats.get('CPU', '').isdigit():
+                    self.cpu_stats[int(stats.pop('CPU'))] = stats
+
+    def _add_format(self, text, system):
+        event_format = EventFormat(text, system, endian=self.endian)
+        self.formats[event_format.id] = event_format
+
+    @property
+    def entries(self):
+        """Returns (entries in buffer, entries written), from cpu stats"""
+        entries = overrun = 0
+        for stats in self.cpu_stats.itervalues():
+            entries += int(stats.get('entries', 0))
+            overrun += int(stats.get('overrun', 0))
+        return entries, entries + overrun
+
+    def records(self, ids=None):
+        """
+        Generator that yields (timestamp (ns), cpu, EventFormat, record) of
+        all CPUs in timestamp order, optionally only for format `ids`.
+        `first_timestamp` (of all records) is set by first record yielded,
+        `last_timestamp` once done.
+        """
+        with self._mmap() as buf:
+            cpus = [self._cpu_records(buf, cpu, offset, size, ids)
+                    for cpu, (offset, size) in enumerate(self.cpu_data) if size]
+            for record in heapq.merge(*cpus):
+                yield record
+
+    def _cpu_records(self, buf, cpu, offset, size, ids):
+        """
+        Generator that yields (timestamp, cpu, EventFormat, record) in
+        ring-buffer pages of cpu.
+        """
+        header = self.header_page
+        ts_offset, ts_size = header['timestamp'].offset, header['timestamp'].size
+        commit_offset, commit_size = header['commit'].offset, header['commit'].size
+        data_offset = header['data'].offset
+        ts_code = self.endian + _INT_CODES[ts_size].upper()
+        commit_code = self.endian + _INT_CODES[commit_size].upper()
+        u32 = struct.Struct(self.endian + 'I').unpack_from
+        formats, offset_ns = self.formats, self.offset
+        id_code = self.endian + 'H'
+        timestamp, first = None, True
+
+        for page in xrange(offset, offset + size, self.page_size):
+            timestamp, = struct.unpack_from(ts_code, buf, page + ts_offset)
+            commit, = struct.unpack_from(commit_code, buf, page + commit_offset)
+            pos = page + data_offset
+            end = pos + (commit & _COMMIT_MASK)
+            while pos < end:
+                word, = u32(buf, pos)
+                pos += 4
+                type_len, delta = word & 0x1f, word >> 5
+                if type_len == _TYPE_PADDING:
+                    if not delta:
+                        break # rest of page is padding
+                    timestamp += delta
+                    length, = u32(buf, pos)
+                    pos += length
+                    continue
+                elif type_len == _TYPE_TIME_EXTEND:
+                    extend, = u32(buf, pos)
+                    pos += 4
+                    timestamp += (extend << _TS_SHIFT) + delta
+                    continue
+                elif type_len == _TYPE_TIME_STAMP:
+                    extend, = u32(buf, pos)
+                    pos += 4
+                    timestamp = (extend << _TS_SHIFT) + delta
+                    continue
+                elif type_len == 0:
+                    length, = u32(buf, pos)
+                    length -= 4
+                    pos += 4
+                else:
+                    length = type_len * 4
+                timestamp += delta
+                if first:
+                    first = False
+                    if self.first_timestamp is None or timestamp + offset_ns < self.first_timestamp:
+                        self.first_timestamp = timestamp + offset_ns
+                record_id, = struct.unpack_from(id_code, buf, pos)
+                if ids is None or record_id in ids:
+                    event_format = formats.get(record_id)
+                    if event_format is not None:
+                        yield (timestamp + offset_ns, cpu, event_format,
+                               buf[pos:pos + length])
+                pos += (length + 3) & ~3
+        if timestamp is not None and (self.last_timestamp is None or
+                                      timestamp + offset_ns > self.last_timestamp):
+            self.last_timestamp = timestamp + offset_ns
+
+
+#------------------------------------------------------------------------------
+# Events (`Ftrace` view of) records
+
+# Tracepoint (as in ftrace text output) of ftrace (internal) events.
+FTRACE_TRACEPOINTS = {'print': 'tracing_mark_write'}
+
+# Field of records of text parsers -> (binary) format field, where these differ.
+_FIELD_ALIASES = {'clk': 'name'}
+
+def common_flags(flags, preempt_count):
+    """
+    Returns (irqs_off, need_resched, irq_type, preempt_depth) as in
+    ftrace text output, for common_flags and common_preempt_count.
+    """
+    if flags & _FLAG_IRQS_OFF:
+        irqs_off = 'd'
+    elif flags & _FLAG_IRQS_NOSUPPORT:
+        irqs_off = 'X'
+    else:
+        irqs_off = '.'
+    if flags & _FLAG_NEED_RESCHED:
+        need_resched = 'N' if flags & _FLAG_PREEMPT_RESCHED else 'n'
+    else:
+        need_resched = 'p' if flags & _FLAG_PREEMPT_RESCHED else '.'
+    if flags & _FLAG_HARDIRQ:
+        irq_type = 'H' if flags & _FLAG_SOFTIRQ else 'h'
+    else:
+        irq_type = 's' if flags & _FLAG_SOFTIRQ else '.'
+    depth = preempt_count & 0xf
+    return irqs_off, need_resched, irq_type, str(depth) if depth else '.'
+
+def _record_class(tracepoint):
+    """
+    Returns record (namedtuple) class of text parser for tracepoint,
+    i.e. most derived class based on namedtuple named after tracepoint.
+    """
+    parser = PARSERS.get(tracepoint)
+    if parser is None:
+        return None
+    if hasattr(parser, 'Record'): # compiled (see `compile_format`)
+        return parser.Record
+    module = import_module(parser.__module__)
+    classes = [obj for obj in vars(module).itervalues()
+               if isinstance(obj, type) and issubclass(obj, tuple) and
+               hasattr(obj, '_fields') and
+               any(base.__name__ == tracepoint for base in obj.__mro__)]
+    for cls in classes:
+        if not any(other is not cls and issubclass(other, cls) for other in classes):
+            return cls
+    return None
+
+def _task_state(event_format):
+    """
+    Returns function of (binary) prev_state to TaskState, with task state
+    letters as printed by sched_switch (see `TaskStateMapping`).
+    """
+    flags = event_format.flags('prev_state')
+    mask = reduce(lambda x, y: x | y, (flag_mask for flag_mask, _ in flags), 0)
+
+    def task_state(value):
+        if value & mask:
+            state = '|'.join(flag for flag_mask, flag in flags if value & flag_mask)
+        else:
+            state = 'R+' if value > mask else 'R'
+        return TaskStateMapping[state]
+    return task_state
+
+# Conversion of (binary) field values to those of text parsers, by tracepoint.
+_CONVERTERS = {
+    'sched_switch': {'prev_state': _task_state},
+}
+
+
+class RecordFactory(object):
+    """
+    Builds `data` of events from (decoded) records: record of text parser
+    for tracepoint if it has same fields (see `_FIELD_ALIASES`), namedtuple
+    of format fields otherwise.
+    """
+    def __init__(self):
+        self._factories = {}
+
+    def __call__(self, event_format, values):
+        try:
+            factory = self._factories[event_format.id]
+        except KeyError:
+            factory = self._factories[event_format.id] = self._factory(event_format)
+        return factory(values)
+
+    def _factory(self, event_format):
+        names = [field.name for field in event_format.payload_fields]
+        cls = _record_class(event_format.name)
+        if cls is not None:
+            fields = [_FIELD_ALIASES.get(name, name) if _FIELD_ALIASES.get(name) in names
+                      else name for name in cls._fields]
+            if all(field in names for field in fields):
+                converters = dict((name, converter(event_format)) for name, converter in
+                                  _CONVERTERS.get(event_format.name, {}).iteritems())
+                getters = [(field, converters.get(field)) for field in fields]
+
+                def factory(values):
+                    return tuple.__new__(cls, [
+                        converter(values[field]) if converter else values[field]
+                        for field, converter in getters])
+                return factory
+        cls = namedtuple(event_format.name, names, rename=True)
+
+        def factory(values):
+            return tuple.__new__(cls, [values[name] for name in names])
+        return factory
@@ -0,0 +1,266 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    LRUCache: Bounded (entries and/or bytes) least-recently-used cache.
+    DiskCache: Bounded (bytes) on-disk cache of pickled objects.
+"""
+import os
+import sys
+import errno
+import hashlib
+import tempfile
+import cPickle as pickle
+from itertools import islice
+from collections import namedtuple, OrderedDict
+
+__all__ = ['LRUCache', 'CacheInfo', 'DiskCache']
+
+CacheInfo = namedtuple('CacheInfo',
+    [
+    'hits',
+    'misses',
+    'evictions',
+    'entries', # Number of cached results
+    'bytes', # Approximate size of cached results
+    'max_entries',
+    'max_bytes',
+    ]
+)
+
+# Levels of references followed by `_sizeof` e.g.
+# dict -> IntervalList -> item -> Interval -> float.
+_SIZEOF_DEPTH = 5
+# Items (of list-likes) measured, to estimate size of all items.
+_SIZEOF_SAMPLES = 16
+
+_CONTAINERS = (list, tuple, set, frozenset)
+
+def _attributes(obj):
+    """Returns values of instance (dict and slot) attributes of obj"""
+    values = list(getattr(obj, '__dict__', {}).itervalues())
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            if hasattr(obj, name) and name != '__weakref__':
+                values.append(getattr(obj, name))
+    return values
+
+def _sizeof(obj, depth=_SIZEOF_DEPTH, seen=None):
+    """
+    Approximate (deep) size of obj in bytes: obj itself (see `__sizeof__`
+    e.g. IntervalList includes its parallel arrays), plus what it
+    references up to `depth` levels down: dict keys/values, items (as
+    stored, extrapolated from first few) and attributes. Objects
+    referenced more than once are counted once.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if depth <= 0:
+        return size
+    depth -= 1
+    if isinstance(obj, dict):
+        for key, value in obj.iteritems():
+            size += _sizeof(key, depth, seen) + _sizeof(value, depth, seen)
+    elif isinstance(obj, _CONTAINERS):
+        # items as stored (e.g. not rows built on access by ColumnarEventList)
+        base = next(cls for cls in _CONTAINERS if isinstance(obj, cls))
+        sizes = [_sizeof(item, depth, seen)
+                 for item in islice(base.__iter__(obj), _SIZEOF_SAMPLES)]
+        size += sum(sizes)
+        # rest like latter samples (objects shared by items already seen)
+        latter = sizes[len(sizes) // 2:]
+        if latter:
+            size += (base.__len__(obj) - len(sizes)) * sum(latter) // len(latter)
+        if base is list:
+            return size # extra state (e.g. shared by views) is in __sizeof__
+    for value in _attributes(obj):
+        size += _sizeof(value, depth, seen)
+    return size
+
+
+class LRUCache(object):
+    """
+    Least-recently-used cache bounded by number of entries and/or
+    (approximate) size in bytes. A budget of None is unbounded.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._bytes = 0
+
+    def __repr__(self):
+        return "LRUCache(entries={}, bytes={}, hits={}, misses={}, evictions={})".format(
+            len(self._data), self._bytes, self.hits, self.misses, self.evictions)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def info(self):
+        """Returns CacheInfo with counters and current usage"""
+        return CacheInfo(hits=self.hits, misses=self.misses,
+                         evictions=self.evictions, entries=len(self._data),
+                         bytes=self._bytes, max_entries=self.max_entries,
+                         max_bytes=self.max_bytes)
+
+    def get(self, key):
+        """Returns cached value for key, raises KeyError on miss"""
+        try:
+            value, size = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self._data[key] = (value, size) # most recently used
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Cache value for key, evicting least recently used as required"""
+        size = _sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return # would evict everything, and still not fit.
+        if key in self._data:
+            self._bytes -= self._data.pop(key)[1]
+        self._data[key] = (value, size)
+        self._bytes += size
+        while (self.max_entries is not None and len(self._data) > self.max_entries) or \
+            (self.max_bytes is not None and self._bytes > self.max_bytes):
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all cached values (counters are kept)"""
+        self._data.clear()
+        self._bytes = 0
+
+
+class DiskCache(object):
+    """
+    Cache of pickled objects in directory, bounded by total size in bytes
+    (None is unbounded). Entries are grouped by source file, so entries
+    for a file can be invalidated at once. Least recently used entries
+    are evicted first.
+    """
+
+    _SUFFIX = '.pkl'
+
+    def __init__(self, cache_dir, max_bytes=None):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(self.cache_dir)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def __repr__(self):
+        return "DiskCache(cache_dir={}, max_bytes={})".format(
+            self.cache_dir, self.max_bytes)
+
+    @staticmethod
+    def fingerprint(filepath, block_size=1 << 16):
+        """
+        Returns (size, mtime, sha1 of first and last `block_size` bytes)
+        of file. Cost is independent of file size: changes in place are
+        caught by mtime, content hash catches e.g. copies with mtime kept.
+        """
+        stat = os.stat(filepath)
+        digest = hashlib.sha1()
+        with open(filepath, 'rb') as f:
+            digest.update(f.read(block_size))
+            if stat.st_size > block_size:
+                f.seek(max(block_size, stat.st_size - block_size))
+                digest.update(f.read(block_size))
+        return stat.st_size, stat.st_mtime, digest.hexdigest()
+
+    def key(self, filepath, *params):
+        """Returns key for (fingerprint of) file and params"""
+        filepath = os.path.abspath(filepath)
+        params = repr((filepath, self.fingerprint(filepath)) + params)
+        return '{}-{}'.format(self._prefix(filepath),
+                              hashlib.sha1(params).hexdigest())
+
+    def _prefix(self, filepath):
+        return hashlib.sha1(os.path.abspath(filepath)).hexdigest()[:16]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self._SUFFIX)
+
+    def _entries(self):
+        return [os.path.join(self.cache_dir, name) for name in
+                os.listdir(self.cache_dir) if name.endswith(self._SUFFIX)]
+
+    def get(self, key):
+        """Returns cached value for key, raises KeyError on miss"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except IOError:
+            raise KeyError(key)
+        except Exception: # stale or truncated entry
+            self._remove(path)
+            raise KeyError(key)
+        os.utime(path, None) # most recently used
+        return value
+
+    def put(self, key, value):
+        """Cache value for key, evicting least recently used as required"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, self._path(key)) # atomic
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until within max_bytes"""
+        if self.max_bytes is None:
+            return
+        entries = sorted((os.stat(path).st_mtime, os.stat(path).st_size, path)
+                         for path in self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def invalidate(self, filepath=None):
+        """Remove entries for filepath (all entries, if None)"""
+        prefix = self._prefix(filepath) if filepath else ''
+        for path in self._entries():
+            if os.path.basename(path).startswith(prefix):
+                self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
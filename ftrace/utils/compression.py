@@ -0,0 +1,231 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    Streaming decompression of (gzip, bz2, xz and zip) trace files.
+
+    read_blocks: Generator of decompressed blocks of file.
+    zip_member: Name of file in zip archive read by `read_blocks`.
+    prefetch: Runs generator in worker thread, overlapping e.g.
+              decompression (which releases the GIL) with parsing.
+    gzip_member_ranges: Byte ranges of (whole) gzip members, which can be
+              decompressed independently (see `decompress_members`).
+"""
+import os
+import sys
+import zlib
+import bz2
+import zipfile
+import threading
+from Queue import Queue, Full
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+__all__ = ['compression', 'strip_compression', 'zip_member', 'read_blocks', 'prefetch',
+           'gzip_member_ranges', 'decompress_members']
+
+COMPRESSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zip': 'zip',
+}
+
+_GZIP_MAGIC = '\x1f\x8b\x08'
+# Compressed bytes decompressed at a time.
+_READ_SIZE = 1 << 21 # 2MB
+# Compressed bytes decompressed to validate start of gzip member.
+_PROBE_SIZE = 1 << 16 # 64KB
+
+def compression(filepath):
+    """Returns compression of file (by extension), None if uncompressed"""
+    return COMPRESSIONS.get(os.path.splitext(filepath)[1].lower())
+
+def strip_compression(filepath):
+    """Returns filepath without compression extension e.g. trace.txt.gz -> trace.txt"""
+    root, ext = os.path.splitext(filepath)
+    return root if ext.lower() in COMPRESSIONS else filepath
+
+def _largest_member(archive):
+    """Returns ZipInfo of largest file in (open) zip archive, None if empty"""
+    infos = [info for info in archive.infolist() if not info.filename.endswith('/')]
+    if not infos:
+        return None
+    return max(infos, key=lambda info: info.file_size)
+
+def zip_member(filepath):
+    """Returns name of (largest) file in zip archive, as read by `read_blocks`"""
+    with zipfile.ZipFile(filepath) as archive:
+        info = _largest_member(archive)
+        return info.filename if info is not None else None
+
+def _gzip_decompressor():
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+def _xz_decompressor():
+    if lzma is None:
+        raise ImportError('xz traces need lzma (pip install backports.lzma)')
+    return lzma.LZMADecompressor()
+
+_DECOMPRESSORS = {
+    'gzip': _gzip_decompressor,
+    'bz2': bz2.BZ2Decompressor,
+    'xz': _xz_decompressor,
+}
+
+def _stream_blocks(filepath, decompressor):
+    """
+    Generator of decompressed blocks of (concatenated) compressed streams
+    e.g. multi-member gzip, pbzip2 output.
+    """
+    with open(filepath, 'rb') as f:
+        obj = decompressor()
+        data = f.read(_READ_SIZE)
+        while data:
+            try:
+                block = obj.decompress(data)
+            except EOFError: # stream ended at end of previous read
+                if not data.strip('\0'):
+                    return # trailing padding
+                obj = decompressor()
+                continue
+            if block:
+                yield block
+            data = obj.unused_data
+            if data:
+                if not data.strip('\0'):
+                    return # trailing padding
+                obj = decompressor()
+                continue
+            data = f.read(_READ_SIZE)
+
+def _zip_blocks(filepath, size):
+    """Generator of decompressed blocks of (largest) file in zip archive"""
+    with zipfile.ZipFile(filepath) as archive:
+        info = _largest_member(archive)
+        if info is None:
+            return
+        f = archive.open(info)
+        try:
+            block = f.read(size)
+            while block:
+                yield block
+                block = f.read(size)
+        finally:
+            f.close()
+
+def read_blocks(filepath, size):
+    """
+    Generator of decompressed blocks of file, of roughly `size` bytes
+    (blocks are as decompressed, except for zip archives).
+    """
+    kind = compression(filepath)
+    if kind == 'zip':
+        return _zip_blocks(filepath, size)
+    try:
+        decompressor = _DECOMPRESSORS[kind]
+    except KeyError:
+        raise ValueError('{} is not compressed'.format(filepath))
+    return _stream_blocks(filepath, decompressor)
+
+def prefetch(iterable, depth=2):
+    """
+    Generator that yields items of iterable, as produced by worker thread
+    (at most `depth` items ahead). Exceptions are re-raised in consumer.
+    """
+    queue = Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((None, None))
+        except Exception:
+            put((None, sys.exc_info()))
+
+    worker = threading.Thread(target=produce, name='ftrace-prefetch')
+    worker.daemon = True
+    worker.start()
+    try:
+        while True:
+            item, exc_info = queue.get()
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            if item is None:
+                return
+            yield item
+    finally:
+        stop.set()
+
+def _is_gzip_member(buf, offset):
+    """True if (gzip) member starts at offset of buf"""
+    header = buf[offset:offset + 10]
+    if len(header) < 10 or not header.startswith(_GZIP_MAGIC):
+        return False
+    flags, os_ = ord(header[3]), ord(header[9])
+    if flags & 0xe0 or not (os_ <= 13 or os_ == 255):
+        return False
+    try:
+        _gzip_decompressor().decompress(buf[offset:offset + _PROBE_SIZE])
+    except zlib.error:
+        return False
+    return True
+
+def gzip_member_ranges(buf, chunk_size):
+    """
+    Returns list of (start, end) byte ranges of gzip (buf), at least
+    `chunk_size` each (except for last), with each boundary at start of a
+    member. Single range for single member gzip.
+    """
+    size = len(buf)
+    boundaries = [0]
+    while boundaries[-1] + chunk_size < size:
+        offset = buf.find(_GZIP_MAGIC, boundaries[-1] + chunk_size)
+        while offset != -1 and not _is_gzip_member(buf, offset):
+            offset = buf.find(_GZIP_MAGIC, offset + 1)
+        if offset == -1:
+            break
+        boundaries.append(offset)
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+def decompress_members(buf, start, end):
+    """Returns decompressed (whole) gzip members in [start, end) of buf"""
+    blocks, data = [], buf[start:end]
+    while data:
+        obj = _gzip_decompressor()
+        blocks.append(obj.decompress(data))
+        data = obj.unused_data
+        if not data.strip('\0'):
+            break
+    return ''.join(blocks)
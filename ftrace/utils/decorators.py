@@ -213,6 +213,25 @@ def getattr_(obj, name, default_thunk):
         setattr(obj, name, default)
         return default
 
+@decorator
+def cached(func, self, *args):
+    """
+    Memoize method results in LRU cache owned by (component) instance,
+    see `FTraceComponent.cache`. Unlike `memoize`, results are released
+    along with the instance and are bounded by trace's cache budget.
+    """
+    key = (func.__name__,) + args
+    cache = self.cache
+    try:
+        return cache.get(key)
+    except KeyError:
+        pass
+    except TypeError: # unhashable arguments
+        return func(self, *args)
+    result = func(self, *args)
+    cache.put(key, result)
+    return result
+
 @decorator
 def memoize(func, *args):
     dic = getattr_(func, "memoize_dic", dict)
@@ -0,0 +1,61 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+    Modules whose attributes are imported on first access e.g. component
+    classes re-exported by `ftrace` (see `ftrace.components`), so that
+    importing the package doesn't import every module it exposes.
+"""
+import sys
+from types import ModuleType
+from importlib import import_module
+
+__all__ = ['lazy_attributes']
+
+
+class _LazyModule(ModuleType):
+    """
+    Module (replacing original in sys.modules), with `attrs` mapping
+    attribute name to (module name, attribute name or None for module).
+    """
+    def __init__(self, module, attrs):
+        super(_LazyModule, self).__init__(module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        # Python 2 clears globals of module on deallocation.
+        self.__dict__['_original_module'] = module
+        self.__dict__['_lazy_attrs'] = attrs
+
+    def __getattr__(self, name):
+        try:
+            module_name, attr = self.__dict__['_lazy_attrs'][name]
+        except KeyError:
+            raise AttributeError("'module' object has no attribute '{}'".format(name))
+        value = import_module(module_name)
+        if attr is not None:
+            value = getattr(value, attr)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__).union(self.__dict__['_lazy_attrs']))
+
+def lazy_attributes(name, attrs):
+    """
+    Replace module `name` in sys.modules with one that imports `attrs`
+    (dict of attribute name to (module name, attribute name or None))
+    on first access. Call at end of module.
+    """
+    sys.modules[name] = _LazyModule(sys.modules[name], attrs)
@@ -0,0 +1,71 @@
+#!/usr/bin/python
+
+# Copyright 2015 Huawei Devices USA Inc. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming decompression of concatenated streams.
+
+    python -m unittest discover tests
+"""
+import bz2
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ftrace.utils import compression
+
+FIRST = 'line {}\n'.format('a' * 64) * 100
+SECOND = 'line {}\n'.format('b' * 64) * 100
+
+
+class TestStreamBlocks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.read_size = compression._READ_SIZE
+
+    def tearDown(self):
+        compression._READ_SIZE = self.read_size
+        shutil.rmtree(self.tmpdir)
+
+    def _read(self, data, read_size=None):
+        filepath = os.path.join(self.tmpdir, 'trace.txt.bz2')
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        if read_size is not None:
+            compression._READ_SIZE = read_size
+        return ''.join(compression._stream_blocks(filepath, bz2.BZ2Decompressor))
+
+    def test_concatenated(self):
+        data = bz2.compress(FIRST) + bz2.compress(SECOND)
+        self.assertEqual(self._read(data), FIRST + SECOND)
+
+    def test_stream_ends_at_read_boundary(self):
+        first = bz2.compress(FIRST)
+        data = first + bz2.compress(SECOND)
+        self.assertEqual(self._read(data, read_size=len(first)), FIRST + SECOND)
+
+    def test_trailing_padding_at_read_boundary(self):
+        first = bz2.compress(FIRST)
+        self.assertEqual(self._read(first + '\0' * 16, read_size=len(first)), FIRST)
+
+
+if __name__ == '__main__':
+    unittest.main()